@@ -1,63 +1,135 @@
+import asyncio
 import logging
-import time
-from uuid import uuid4
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Literal, Optional, Tuple, Union
+from uuid import UUID
 
-from data_classes import CommandRequest, CommandResponse, RobotStatus
-from database import get_async_session
-from fastapi import Depends, FastAPI, Request, Security
-from fastapi.responses import JSONResponse
+import numpy as np
+from archive import TRAJECTORY_DTYPE, delta_encode, direction_letters, trajectory_bytes
+from cache import robot_state_cache
+from data_classes import (
+    ActionPage,
+    CommandBatchRequest,
+    CommandBatchResponse,
+    CommandProgress,
+    CommandRequest,
+    CommandResponse,
+    PlanRequest,
+    PlanResponse,
+    RobotStatus,
+    SimulationResponse,
+    Trajectory,
+)
+from database import async_sessionmaker, get_async_session
+from exceptions import CommandArchived, NoPathFound, UnknownAction
+from fastapi import (
+    Depends,
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    Security,
+    WebSocket,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer
-from settings import API_TOKEN
-from utils import add_command, get_current_position
+from metrics import CONTENT_TYPE, REGISTRY
+from middleware import RequestMiddleware, token_valid
+from models import Statuses
+from notifications import listen
+from obstacles import obstacle_map, reload_obstacles
+from planner import plan_command
+from pydantic import UUID4, ValidationError
+from settings import (
+    ACTIONS_PAGE_MAX_SIZE,
+    ACTIONS_PAGE_SIZE,
+    DEFAULT_ROBOT_ID,
+    OBSTACLES_RELOAD_INTERVAL,
+    ROBOT_IDS,
+    ROBOT_STATE_CHANNEL,
+)
+from simulation import simulate_command
+from streams import forward_states, sse_events, state_broadcaster
+from utils import (
+    add_command,
+    add_commands,
+    decode_cursor,
+    get_command_actions,
+    get_command_progress,
+    get_command_trajectory,
+    get_current_position,
+    get_robot_trajectory,
+    has_pending_commands,
+)
 
-app = FastAPI()
+logger = logging.getLogger("api_logger")
 
-security = HTTPBearer(auto_error=False)
 
-logger = logging.getLogger("api_logger")
+async def reload_obstacles_periodically():
+    while True:
+        await asyncio.sleep(OBSTACLES_RELOAD_INTERVAL)
+        try:
+            await run_in_threadpool(reload_obstacles)
+        except Exception:
+            logger.exception("Reloading obstacles failed.")
 
 
-@app.middleware("http")
-async def token_middleware(request: Request, call_next):
-    if request.url.path in ("/docs", "/openapi.json"):
-        return await call_next(request)
+def on_robot_state(payload: str):
+    robot_state_cache.update(payload)
+    state_broadcaster.publish(payload)
 
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return JSONResponse(
-            status_code=401,
-            content={"detail": "Authorization header missing or invalid"},
-        )
 
-    token = auth_header.split("Bearer ")[1]
-    if token != API_TOKEN:
-        return JSONResponse(status_code=401, content={"detail": "Invalid token"})
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    tasks = [
+        asyncio.create_task(reload_obstacles_periodically()),
+        asyncio.create_task(
+            listen(
+                ROBOT_STATE_CHANNEL,
+                on_robot_state,
+                on_connect=robot_state_cache.enable,
+                on_disconnect=robot_state_cache.disable,
+            )
+        ),
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
 
-    response = await call_next(request)
-    return response
 
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestMiddleware)
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    uid = str(uuid4())
+security = HTTPBearer(auto_error=False)
 
-    start_time = time.time()
-    logger.info(f"Incoming request {uid}: {request.method} {request.url}")
 
-    response = await call_next(request)
+def websocket_authorized(websocket: WebSocket) -> bool:
+    # Browsers cannot set headers on WebSocket handshakes, hence the query parameter.
+    auth_header = websocket.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        token = auth_header.split("Bearer ")[1]
+    else:
+        token = websocket.query_params.get("token")
+    return token is not None and token_valid(token)
 
-    process_time = (time.time() - start_time) * 1000
-    logger.info(
-        f"Completed response {uid}: {request.method} {request.url} with status "
-        f"{response.status_code} in {process_time:.2f} ms"
-    )
 
-    return response
+def fleet_robot(robot_id: str) -> str:
+    if robot_id not in ROBOT_IDS:
+        raise HTTPException(status_code=404, detail="Unknown robot")
+    return robot_id
 
 
-@app.get("/status", response_model=RobotStatus, dependencies=[Security(security)])
-async def get_status(async_session=Depends(get_async_session)):
-    x, y, direction, status, command_id = await get_current_position(async_session)
+async def get_robot_status(robot_id: str, async_session) -> RobotStatus:
+    state = robot_state_cache.get(robot_id)
+    if state is None:
+        version = robot_state_cache.version
+        state = await get_current_position(async_session, robot_id)
+        robot_state_cache.set(robot_id, state, version)
+
+    x, y, direction, status, command_id = state
     return RobotStatus(
         x=x,
         y=y,
@@ -67,13 +139,375 @@ async def get_status(async_session=Depends(get_async_session)):
     )
 
 
+async def stream_robot_status(robot_id: str, async_session) -> StreamingResponse:
+    # Subscribe before reading the current status so no change is missed in between.
+    queue = state_broadcaster.subscribe(robot_id)
+    try:
+        robot_status = await get_robot_status(robot_id, async_session)
+    except BaseException:
+        state_broadcaster.unsubscribe(robot_id, queue)
+        raise
+
+    return StreamingResponse(
+        sse_events(robot_id, queue, robot_status.model_dump_json()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def watch_robot_status(websocket: WebSocket, robot_id: str):
+    if not websocket_authorized(websocket):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    queue = state_broadcaster.subscribe(robot_id)
+    try:
+        # A short-lived session, so that idle watchers do not hold pool connections.
+        async with async_sessionmaker() as async_session:
+            robot_status = await get_robot_status(robot_id, async_session)
+        await websocket.send_text(robot_status.model_dump_json())
+    except BaseException:
+        state_broadcaster.unsubscribe(robot_id, queue)
+        raise
+
+    await forward_states(websocket, robot_id, queue)
+
+
+async def run_simulation(
+    command: CommandRequest, robot_id: str, async_session
+) -> SimulationResponse:
+    x, y, direction, _, _ = await get_current_position(async_session, robot_id)
+    try:
+        x, y, direction, collision_index = await run_in_threadpool(
+            simulate_command, command.command, x, y, direction, obstacle_map
+        )
+    except UnknownAction as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return SimulationResponse(
+        x=x,
+        y=y,
+        direction=direction,
+        status=Statuses.COMPLETED if collision_index is None else Statuses.FAILED,
+        collision_index=collision_index,
+    )
+
+
+async def plan_robot_command(
+    plan: PlanRequest, robot_id: str, async_session
+) -> PlanResponse:
+    # Plans start from the last executed pose, which is only where an enqueued plan
+    # will run from if nothing is left to execute before it.
+    if plan.enqueue and await has_pending_commands(async_session, robot_id):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Robot {robot_id} still has commands to execute.",
+        )
+
+    x, y, direction, _, _ = await get_current_position(async_session, robot_id)
+    try:
+        command, actions = await run_in_threadpool(
+            plan_command, x, y, direction, plan.x, plan.y, plan.direction, obstacle_map
+        )
+    except NoPathFound as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    command_id = None
+    if plan.enqueue and actions:
+        try:
+            request = CommandRequest(command=command)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        command_id = (await add_command(async_session, request, robot_id)).id
+    return PlanResponse(command=command, actions=actions, id=command_id)
+
+
+async def register_robot_command(
+    command: CommandRequest, robot_id: str, dry_run: bool, async_session
+) -> Union[CommandResponse, SimulationResponse]:
+    if dry_run:
+        return await run_simulation(command, robot_id, async_session)
+
+    command = await add_command(async_session, command, robot_id)
+    return CommandResponse(id=command.id)
+
+
+def local_time(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored in local time without a zone.
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+def trajectory_response(
+    robot_id: str,
+    segments: List[Tuple[UUID, np.ndarray]],
+    next_from: Optional[datetime],
+    format: str,
+) -> Union[Trajectory, Response]:
+    trajectory = np.concatenate(
+        [poses for _command_id, poses in segments]
+        or [np.empty(0, dtype=TRAJECTORY_DTYPE)]
+    )
+    if format == "binary":
+        headers = {"X-Trajectory-Points": str(len(trajectory))}
+        if next_from is not None:
+            headers["X-Trajectory-Next-From"] = next_from.isoformat()
+        return Response(
+            trajectory_bytes(trajectory),
+            media_type="application/octet-stream",
+            headers=headers,
+        )
+
+    offsets, total = [], 0
+    for _command_id, poses in segments:
+        offsets.append(total)
+        total += len(poses)
+    return Trajectory(
+        robot_id=robot_id,
+        commands=[command_id for command_id, _poses in segments],
+        offsets=offsets,
+        x=delta_encode(trajectory["x"]),
+        y=delta_encode(trajectory["y"]),
+        directions=direction_letters(trajectory),
+        next_from=next_from,
+    )
+
+
+async def robot_trajectory(
+    robot_id: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    format: str,
+    async_session,
+) -> Union[Trajectory, Response]:
+    segments, next_from = await get_robot_trajectory(
+        async_session, robot_id, local_time(start), local_time(end)
+    )
+    return trajectory_response(robot_id, segments, next_from, format)
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Security(security)])
+async def get_metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/status", response_model=RobotStatus, dependencies=[Security(security)])
+async def get_status(async_session=Depends(get_async_session)):
+    return await get_robot_status(DEFAULT_ROBOT_ID, async_session)
+
+
+@app.get(
+    "/robots/{robot_id}/status",
+    response_model=RobotStatus,
+    dependencies=[Security(security)],
+)
+async def get_fleet_robot_status(
+    robot_id: str = Depends(fleet_robot), async_session=Depends(get_async_session)
+):
+    return await get_robot_status(robot_id, async_session)
+
+
+@app.get("/status/stream", dependencies=[Security(security)])
+async def stream_status(async_session=Depends(get_async_session)):
+    return await stream_robot_status(DEFAULT_ROBOT_ID, async_session)
+
+
+@app.get("/robots/{robot_id}/status/stream", dependencies=[Security(security)])
+async def stream_fleet_robot_status(
+    robot_id: str = Depends(fleet_robot), async_session=Depends(get_async_session)
+):
+    return await stream_robot_status(robot_id, async_session)
+
+
+@app.websocket("/status/ws")
+async def status_websocket(websocket: WebSocket):
+    await watch_robot_status(websocket, DEFAULT_ROBOT_ID)
+
+
+@app.websocket("/robots/{robot_id}/status/ws")
+async def fleet_robot_status_websocket(websocket: WebSocket, robot_id: str):
+    # Checked like fleet_robot on the HTTP routes, so only fleet routes require the
+    # robot to be listed in ROBOT_IDS.
+    if robot_id not in ROBOT_IDS:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await watch_robot_status(websocket, robot_id)
+
+
 @app.post(
     "/command",
-    response_model=CommandResponse,
+    response_model=Union[CommandResponse, SimulationResponse],
     dependencies=[Security(security)],
 )
 async def register_command(
+    command: CommandRequest,
+    dry_run: bool = False,
+    async_session=Depends(get_async_session),
+):
+    return await register_robot_command(
+        command, DEFAULT_ROBOT_ID, dry_run, async_session
+    )
+
+
+@app.post(
+    "/robots/{robot_id}/command",
+    response_model=Union[CommandResponse, SimulationResponse],
+    dependencies=[Security(security)],
+)
+async def register_fleet_robot_command(
+    command: CommandRequest,
+    dry_run: bool = False,
+    robot_id: str = Depends(fleet_robot),
+    async_session=Depends(get_async_session),
+):
+    return await register_robot_command(command, robot_id, dry_run, async_session)
+
+
+@app.post(
+    "/commands/batch",
+    response_model=CommandBatchResponse,
+    dependencies=[Security(security)],
+)
+async def register_commands(
+    batch: CommandBatchRequest, async_session=Depends(get_async_session)
+):
+    ids = await add_commands(async_session, batch.commands, DEFAULT_ROBOT_ID)
+    return CommandBatchResponse(ids=ids)
+
+
+@app.post(
+    "/robots/{robot_id}/commands/batch",
+    response_model=CommandBatchResponse,
+    dependencies=[Security(security)],
+)
+async def register_fleet_robot_commands(
+    batch: CommandBatchRequest,
+    robot_id: str = Depends(fleet_robot),
+    async_session=Depends(get_async_session),
+):
+    ids = await add_commands(async_session, batch.commands, robot_id)
+    return CommandBatchResponse(ids=ids)
+
+
+@app.post(
+    "/command/simulate",
+    response_model=SimulationResponse,
+    dependencies=[Security(security)],
+)
+async def dry_run_command(
     command: CommandRequest, async_session=Depends(get_async_session)
 ):
-    command = await add_command(async_session, command)
-    return CommandResponse(id=command.id)
+    return await run_simulation(command, DEFAULT_ROBOT_ID, async_session)
+
+
+@app.post(
+    "/robots/{robot_id}/command/simulate",
+    response_model=SimulationResponse,
+    dependencies=[Security(security)],
+)
+async def dry_run_fleet_robot_command(
+    command: CommandRequest,
+    robot_id: str = Depends(fleet_robot),
+    async_session=Depends(get_async_session),
+):
+    return await run_simulation(command, robot_id, async_session)
+
+
+@app.post("/plan", response_model=PlanResponse, dependencies=[Security(security)])
+async def plan_route(plan: PlanRequest, async_session=Depends(get_async_session)):
+    return await plan_robot_command(plan, DEFAULT_ROBOT_ID, async_session)
+
+
+@app.post(
+    "/robots/{robot_id}/plan",
+    response_model=PlanResponse,
+    dependencies=[Security(security)],
+)
+async def plan_fleet_robot_route(
+    plan: PlanRequest,
+    robot_id: str = Depends(fleet_robot),
+    async_session=Depends(get_async_session),
+):
+    return await plan_robot_command(plan, robot_id, async_session)
+
+
+@app.get(
+    "/command/{command_id}",
+    response_model=CommandProgress,
+    dependencies=[Security(security)],
+)
+async def get_command(command_id: UUID4, async_session=Depends(get_async_session)):
+    progress = await get_command_progress(async_session, command_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Unknown command")
+    return progress
+
+
+@app.get(
+    "/command/{command_id}/actions",
+    response_model=ActionPage,
+    dependencies=[Security(security)],
+)
+async def list_command_actions(
+    command_id: UUID4,
+    limit: int = Query(ACTIONS_PAGE_SIZE, ge=1, le=ACTIONS_PAGE_MAX_SIZE),
+    cursor: Optional[str] = None,
+    async_session=Depends(get_async_session),
+):
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        page = await get_command_actions(async_session, command_id, limit, after)
+    except CommandArchived as e:
+        # The poses remain available from /command/{id}/trajectory.
+        raise HTTPException(status_code=410, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Unknown command")
+    return page
+
+
+@app.get(
+    "/command/{command_id}/trajectory",
+    response_model=Trajectory,
+    dependencies=[Security(security)],
+)
+async def get_command_path(
+    command_id: UUID4,
+    format: Literal["json", "binary"] = "json",
+    async_session=Depends(get_async_session),
+):
+    result = await get_command_trajectory(async_session, command_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown command")
+    robot_id, trajectory = result
+    return trajectory_response(robot_id, [(command_id, trajectory)], None, format)
+
+
+@app.get("/trajectory", response_model=Trajectory, dependencies=[Security(security)])
+async def get_trajectory(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    format: Literal["json", "binary"] = "json",
+    async_session=Depends(get_async_session),
+):
+    return await robot_trajectory(DEFAULT_ROBOT_ID, start, end, format, async_session)
+
+
+@app.get(
+    "/robots/{robot_id}/trajectory",
+    response_model=Trajectory,
+    dependencies=[Security(security)],
+)
+async def get_fleet_robot_trajectory(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    format: Literal["json", "binary"] = "json",
+    robot_id: str = Depends(fleet_robot),
+    async_session=Depends(get_async_session),
+):
+    return await robot_trajectory(robot_id, start, end, format, async_session)
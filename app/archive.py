@@ -0,0 +1,377 @@
+import datetime
+import logging
+import re
+from itertools import groupby
+from operator import attrgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from database import advisory_lock, async_sessionmaker
+from metrics import Counter
+from models import Action, ActionArchive, ActionTypes, Command, Directions, Statuses
+from settings import (
+    ARCHIVE_AFTER_HOURS,
+    ARCHIVE_BATCH_SIZE,
+    EXECUTION_CHUNK_SIZE,
+    MAINTENANCE_LOCK_ID,
+)
+from sqlalchemy import delete, exists, insert, select, text, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("archive_logger")
+
+ARCHIVED = Counter(
+    "scheduler_archived_commands_total", "Commands whose actions were archived."
+)
+
+# One archived action in 15 bytes. Types, statuses and directions are stored as
+# their index in the enum; direction 0 marks actions without a pose (withdrawn).
+TRAJECTORY_DTYPE = np.dtype(
+    [
+        ("type", "u1"),
+        ("status", "u1"),
+        ("direction", "u1"),
+        ("count", "<u4"),
+        ("x", "<i4"),
+        ("y", "<i4"),
+    ]
+)
+TYPES = list(ActionTypes)
+STATUSES = list(Statuses)
+DIRECTIONS = [None, *Directions]
+_TYPE_CODES = {action_type: code for code, action_type in enumerate(TYPES)}
+_STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+_DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+_EXECUTED = [_STATUS_CODES[Statuses.COMPLETED], _STATUS_CODES[Statuses.FAILED]]
+_DIRECTION_LETTERS = np.array(
+    [ord("-")] + [ord(direction.value) for direction in Directions], dtype=np.uint8
+)
+
+PARTITION_PATTERN = re.compile(r"actions_(\d{4})_(\d{2})")
+
+
+def pack_trajectory(actions: Sequence) -> np.ndarray:
+    """
+    Packs Actions into an array of TRAJECTORY_DTYPE, keeping their order.
+
+    Args:
+        actions: Rows with the type, count, status, x_coord, y_coord and direction
+            of Actions.
+
+    Returns:
+        np.ndarray: The packed actions.
+    """
+    trajectory = np.zeros(len(actions), dtype=TRAJECTORY_DTYPE)
+    trajectory["type"] = [_TYPE_CODES[action.type] for action in actions]
+    trajectory["status"] = [_STATUS_CODES[action.status] for action in actions]
+    trajectory["direction"] = [_DIRECTION_CODES[a.direction] for a in actions]
+    trajectory["count"] = [action.count for action in actions]
+    trajectory["x"] = [action.x_coord or 0 for action in actions]
+    trajectory["y"] = [action.y_coord or 0 for action in actions]
+    return trajectory
+
+
+def unpack_trajectory(data: bytes) -> np.ndarray:
+    """
+    Reads the trajectory of an ActionArchive without copying it.
+    """
+    return np.frombuffer(data, dtype=TRAJECTORY_DTYPE)
+
+
+def summarize_trajectory(
+    trajectory: np.ndarray,
+) -> Tuple[
+    Dict[Statuses, int], Dict[Statuses, int], Optional[Tuple[int, int, Directions]]
+]:
+    """
+    Counts the archived actions and their steps per status and finds the last pose
+    they produced.
+
+    Returns:
+        tuple: (actions per status, steps per status, (x, y, direction) of the last
+        executed action or None if no action was executed).
+    """
+    codes, inverse, counts = np.unique(
+        trajectory["status"], return_inverse=True, return_counts=True
+    )
+    steps = np.bincount(inverse, weights=trajectory["count"], minlength=len(codes))
+    statuses = [STATUSES[code] for code in codes]
+    counts = {status: int(count) for status, count in zip(statuses, counts)}
+    steps = {status: int(total) for status, total in zip(statuses, steps)}
+
+    executed = np.flatnonzero(np.isin(trajectory["status"], _EXECUTED))
+    if not executed.size:
+        return counts, steps, None
+    last = trajectory[executed[-1]]
+    return (
+        counts,
+        steps,
+        (int(last["x"]), int(last["y"]), DIRECTIONS[last["direction"]]),
+    )
+
+
+def executed_poses(trajectory: np.ndarray) -> np.ndarray:
+    """
+    Keeps the actions of a trajectory that moved the robot, i.e. the poses it took.
+    """
+    return trajectory[np.isin(trajectory["status"], _EXECUTED)]
+
+
+def trajectory_bytes(trajectory: np.ndarray) -> bytes:
+    """
+    Serializes the poses of a trajectory as three columns: x and y as
+    little-endian int32, then one ASCII direction letter per pose.
+    """
+    letters = _DIRECTION_LETTERS[trajectory["direction"]]
+    return (
+        trajectory["x"].astype("<i4").tobytes()
+        + trajectory["y"].astype("<i4").tobytes()
+        + letters.tobytes()
+    )
+
+
+def direction_letters(trajectory: np.ndarray) -> str:
+    return _DIRECTION_LETTERS[trajectory["direction"]].tobytes().decode()
+
+
+def delta_encode(values: np.ndarray) -> List[int]:
+    """
+    Encodes a column as its first value followed by the difference between
+    consecutive values, which keeps the JSON of a path small.
+    """
+    return np.diff(values.astype(np.int64), prepend=0).tolist()
+
+
+async def store_trajectories(async_session: AsyncSession, command_ids: Sequence):
+    """
+    Packs the executed Actions of finished Commands into their `trajectory`.
+
+    The executor calls it in the transaction that executes the last Action of the
+    Commands, so trajectories are read as one row per Command. The Actions are
+    streamed EXECUTION_CHUNK_SIZE rows at a time, for ARCHIVE_BATCH_SIZE Commands
+    per query.
+
+    Args:
+        async_session: The asynchronous SQLAlchemy session for database access.
+        command_ids: The IDs of the finished Commands.
+
+    Returns:
+        None
+    """
+    for offset in range(0, len(command_ids), ARCHIVE_BATCH_SIZE):
+        ids = command_ids[offset : offset + ARCHIVE_BATCH_SIZE]
+        chunks = {command_id: [] for command_id in ids}
+        query = (
+            select(
+                Action.command_id,
+                Action.type,
+                Action.count,
+                Action.status,
+                Action.x_coord,
+                Action.y_coord,
+                Action.direction,
+            )
+            .where(
+                Action.command_id.in_(ids),
+                Action.status.in_([Statuses.COMPLETED, Statuses.FAILED]),
+            )
+            .order_by(Action.command_id, Action.created, Action.id)
+            .execution_options(yield_per=EXECUTION_CHUNK_SIZE)
+        )
+        result = await async_session.stream(query)
+        async for rows in result.partitions():
+            for command_id, actions in groupby(rows, key=attrgetter("command_id")):
+                chunks[command_id].append(pack_trajectory(list(actions)))
+        await result.close()
+
+        rows = [
+            {
+                "id": command_id,
+                "trajectory": np.concatenate(
+                    trajectories or [np.empty(0, dtype=TRAJECTORY_DTYPE)]
+                ).tobytes(),
+            }
+            for command_id, trajectories in chunks.items()
+        ]
+        await async_session.execute(update(Command), rows)
+
+
+async def archive_commands() -> int:
+    """
+    Moves the Actions of finished Commands into ActionArchive rows.
+
+    A Command is archived once it is older than ARCHIVE_AFTER_HOURS, has been
+    parsed or withdrawn, and none of its Actions is QUEUED or RUNNING. Its Actions
+    are streamed EXECUTION_CHUNK_SIZE rows at a time, packed into a single
+    trajectory, and deleted. Commands are claimed with FOR UPDATE SKIP LOCKED,
+    ARCHIVE_BATCH_SIZE per transaction, so several workers can archive at once.
+
+    Returns:
+        int: The number of archived Commands.
+    """
+    now = datetime.datetime.now()
+    cutoff = now - datetime.timedelta(hours=ARCHIVE_AFTER_HOURS)
+    active = exists().where(
+        Action.command_id == Command.id,
+        Action.status.in_([Statuses.QUEUED, Statuses.RUNNING]),
+    )
+    archived = 0
+
+    async with async_sessionmaker() as async_session:
+        while True:
+            query = (
+                select(Command.id, Command.robot_id)
+                .where(
+                    Command.archived.is_(None),
+                    Command.status != Statuses.QUEUED,
+                    Command.created < cutoff,
+                    ~active,
+                )
+                .order_by(Command.created)
+                .limit(ARCHIVE_BATCH_SIZE)
+                .with_for_update(of=Command, skip_locked=True)
+            )
+            commands = (await async_session.execute(query)).all()
+            if not commands:
+                break
+
+            ids = [command.id for command in commands]
+            chunks = {command_id: [] for command_id in ids}
+            finished = {}
+            query = (
+                select(
+                    Action.command_id,
+                    Action.type,
+                    Action.count,
+                    Action.status,
+                    Action.x_coord,
+                    Action.y_coord,
+                    Action.direction,
+                    Action.updated,
+                )
+                .where(Action.command_id.in_(ids))
+                .order_by(Action.command_id, Action.created, Action.id)
+                .execution_options(yield_per=EXECUTION_CHUNK_SIZE)
+            )
+            result = await async_session.stream(query)
+            async for rows in result.partitions():
+                for command_id, actions in groupby(rows, key=attrgetter("command_id")):
+                    actions = list(actions)
+                    chunks[command_id].append(pack_trajectory(actions))
+                    latest = max(
+                        (a.updated for a in actions if a.updated is not None),
+                        default=None,
+                    )
+                    if latest is not None:
+                        finished[command_id] = max(
+                            latest, finished.get(command_id, latest)
+                        )
+            await result.close()
+
+            rows = []
+            for command in commands:
+                trajectory = np.concatenate(
+                    chunks[command.id] or [np.empty(0, dtype=TRAJECTORY_DTYPE)]
+                )
+                rows.append(
+                    {
+                        "command_id": command.id,
+                        "robot_id": command.robot_id,
+                        "actions": len(trajectory),
+                        "trajectory": trajectory.tobytes(),
+                        "finished": finished.get(command.id),
+                        "archived": now,
+                    }
+                )
+            await async_session.execute(insert(ActionArchive), rows)
+            await async_session.execute(
+                delete(Action).where(Action.command_id.in_(ids))
+            )
+            await async_session.execute(
+                update(Command).where(Command.id.in_(ids)).values(archived=now)
+            )
+            await async_session.commit()
+
+            archived += len(ids)
+            ARCHIVED.inc(amount=len(ids))
+            logger.info(f"Archived the actions of {len(ids)} commands.")
+
+    return archived
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"actions_{month:%Y_%m}"
+
+
+def next_month(month: datetime.date) -> datetime.date:
+    return (month.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+async def maintain_partitions():
+    """
+    Creates the monthly partitions of actions ahead of time and drops emptied ones.
+
+    The partitions of the current and the next month are created if missing. A
+    month's partition is dropped once it ended more than ARCHIVE_AFTER_HOURS ago
+    and archiving left it empty, which is far cheaper than vacuuming its dead rows
+    forever. DDL on a partition briefly locks the whole actions table, so it gives
+    up after a short lock timeout rather than queueing behind the executor, and is
+    retried on the next run. Only one worker maintains partitions at a time.
+
+    Returns:
+        None
+    """
+    async with advisory_lock(MAINTENANCE_LOCK_ID) as acquired:
+        if not acquired:
+            logger.info("Another worker is maintaining partitions, skipping.")
+            return
+
+        async with async_sessionmaker() as async_session:
+
+            async def run_ddl(statement: str) -> bool:
+                try:
+                    await async_session.execute(text("SET LOCAL lock_timeout = '1s'"))
+                    await async_session.execute(text(statement))
+                    await async_session.commit()
+                    return True
+                except DBAPIError as e:
+                    await async_session.rollback()
+                    logger.warning(f"{type(e)} on '{statement}', retrying later.")
+                    return False
+
+            month = datetime.date.today().replace(day=1)
+            for start in (month, next_month(month)):
+                name = partition_name(start)
+                query = select(text("to_regclass(:name) IS NOT NULL"))
+                if await async_session.scalar(query, {"name": name}):
+                    continue
+                if await run_ddl(
+                    f"CREATE TABLE {name} PARTITION OF actions "
+                    f"FOR VALUES FROM ('{start}') TO ('{next_month(start)}')"
+                ):
+                    logger.info(f"Created partition {name}.")
+
+            query = text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = 'actions'::regclass"
+            )
+            names = (await async_session.execute(query)).scalars().all()
+            await async_session.commit()
+
+            cutoff = datetime.datetime.now() - datetime.timedelta(
+                hours=ARCHIVE_AFTER_HOURS
+            )
+            for name in sorted(names):
+                match = PARTITION_PATTERN.fullmatch(name)
+                if match is None:
+                    continue
+                end = next_month(datetime.date(int(match[1]), int(match[2]), 1))
+                if datetime.datetime.combine(end, datetime.time()) > cutoff:
+                    continue
+                query = text(f"SELECT EXISTS (SELECT 1 FROM {name})")
+                if await async_session.scalar(query):
+                    continue
+                if await run_ddl(f"DROP TABLE {name}"):
+                    logger.info(f"Dropped archived partition {name}.")
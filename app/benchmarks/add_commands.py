@@ -0,0 +1,70 @@
+"""
+Benchmarks command submission one request at a time versus in one batch.
+
+Compares `add_command` called per command (INSERT, commit and refresh SELECT each)
+with `add_commands` (one multi-row INSERT ... RETURNING). Run from the `app`
+directory against a disposable, migrated database; the scheduler should not be
+running, and the inserted commands are deleted afterwards:
+
+    python -m benchmarks.add_commands --commands 500
+"""
+
+import argparse
+import asyncio
+import time
+
+from data_classes import CommandRequest
+from database import async_sessionmaker
+from models import Command
+from sqlalchemy import delete
+from utils import add_command, add_commands
+
+
+async def submit_one_by_one(commands: list) -> list:
+    ids = []
+    async with async_sessionmaker() as async_session:
+        for command in commands:
+            ids.append((await add_command(async_session, command)).id)
+    return ids
+
+
+async def submit_batch(commands: list) -> list:
+    async with async_sessionmaker() as async_session:
+        return await add_commands(async_session, commands)
+
+
+async def run(name: str, submit, commands: list) -> dict:
+    start = time.perf_counter()
+    ids = await submit(commands)
+    elapsed = time.perf_counter() - start
+
+    async with async_sessionmaker() as async_session:
+        await async_session.execute(delete(Command).where(Command.id.in_(ids)))
+        await async_session.commit()
+
+    return {
+        "name": name,
+        "commands": len(ids),
+        "seconds": round(elapsed, 3),
+        "commands_per_second": round(len(ids) / elapsed),
+    }
+
+
+async def main(count: int) -> list:
+    commands = [CommandRequest(command="FFRFF") for _ in range(count)]
+    return [
+        await run("single", submit_one_by_one, commands),
+        await run("batch", submit_batch, commands),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--commands", type=int, default=500)
+    args = parser.parse_args()
+
+    for result in asyncio.run(main(args.commands)):
+        print(
+            f"{result['name']:>6}: {result['commands']} commands in "
+            f"{result['seconds']} s ({result['commands_per_second']} commands/s)"
+        )
@@ -0,0 +1,133 @@
+"""
+Benchmarks the HTTP middleware stack under load on GET /status.
+
+Compares the former pair of `@app.middleware("http")` functions (token check and
+access log, each a BaseHTTPMiddleware layer) with `RequestMiddleware`, both
+wrapping the API's routes. Requests are sent in-process through httpx's ASGI
+transport, and the status is served from a pre-filled robot state cache, so
+neither a server nor a database is needed:
+
+    python -m benchmarks.middleware --requests 20000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from uuid import uuid4
+
+import httpx
+from fastapi.responses import JSONResponse
+from middleware import RequestMiddleware
+from models import Directions, Statuses
+from settings import API_TOKEN, DEFAULT_ROBOT_ID
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app import app, robot_state_cache
+
+logger = logging.getLogger("api_logger")
+
+
+async def token_middleware(request, call_next):
+    if request.url.path in ("/docs", "/openapi.json"):
+        return await call_next(request)
+
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return JSONResponse(
+            status_code=401,
+            content={"detail": "Authorization header missing or invalid"},
+        )
+
+    token = auth_header.split("Bearer ")[1]
+    if token != API_TOKEN:
+        return JSONResponse(status_code=401, content={"detail": "Invalid token"})
+
+    return await call_next(request)
+
+
+async def log_requests(request, call_next):
+    uid = str(uuid4())
+
+    start_time = time.time()
+    logger.info(f"Incoming request {uid}: {request.method} {request.url}")
+
+    response = await call_next(request)
+
+    process_time = (time.time() - start_time) * 1000
+    logger.info(
+        f"Completed response {uid}: {request.method} {request.url} with status "
+        f"{response.status_code} in {process_time:.2f} ms"
+    )
+    return response
+
+
+def with_app_scope(asgi_app):
+    # Endpoints read the application from the scope, which Starlette sets on entry.
+    async def wrapped(scope, receive, send):
+        scope["app"] = app
+        await asgi_app(scope, receive, send)
+
+    return wrapped
+
+
+STACKS = {
+    "BaseHTTPMiddleware": lambda: BaseHTTPMiddleware(
+        BaseHTTPMiddleware(app.router, dispatch=log_requests),
+        dispatch=token_middleware,
+    ),
+    "RequestMiddleware": lambda: RequestMiddleware(app.router),
+}
+
+
+async def run(name: str, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=with_app_scope(STACKS[name]()))
+    headers = {"Authorization": f"Bearer {API_TOKEN}"}
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", headers=headers
+    ) as client:
+
+        async def worker(count: int):
+            for _ in range(count):
+                response = await client.get("/status")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(worker(requests // concurrency) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - start
+
+    sent = requests // concurrency * concurrency
+    return {
+        "name": name,
+        "requests": sent,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(sent / elapsed),
+    }
+
+
+async def main(requests: int, concurrency: int) -> list:
+    robot_state_cache.enable()
+    robot_state_cache.set(
+        DEFAULT_ROBOT_ID,
+        (4, 2, Directions.WEST, Statuses.COMPLETED, None),
+        robot_state_cache.version,
+    )
+    # Log records are still created and formatted, but not written to the terminal.
+    logging.getLogger().handlers[0].setLevel(logging.WARNING)
+
+    return [await run(name, requests, concurrency) for name in STACKS]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    for result in asyncio.run(main(args.requests, args.concurrency)):
+        print(
+            f"{result['name']:>18}: {result['requests']} requests in "
+            f"{result['seconds']} s ({result['requests_per_second']} req/s)"
+        )
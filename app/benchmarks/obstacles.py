@@ -0,0 +1,60 @@
+"""
+Benchmarks obstacle map loading and lookups with a large obstacle set.
+
+Generates a random bitmap with about `--obstacles` blocked cells, saves it as a
+`.npy` file, loads it through `load_obstacle_map` and measures membership tests
+against random cells. Needs no database:
+
+    python -m benchmarks.obstacles --obstacles 10000000 --lookups 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from obstacles import load_obstacle_map
+
+
+def main(obstacles: int, lookups: int, density: float) -> dict:
+    side = int((obstacles / density) ** 0.5)
+    bitmap = np.random.default_rng(0).random((side, side)) < density
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "obstacles.npy")
+        np.save(path, bitmap)
+        del bitmap
+
+        start = time.perf_counter()
+        obstacle_map = load_obstacle_map(path, origin=(-side // 2, -side // 2))
+        load_seconds = time.perf_counter() - start
+
+    cells = [
+        (random.randint(-side, side), random.randint(-side, side))
+        for _ in range(lookups)
+    ]
+    start = time.perf_counter()
+    hits = sum(cell in obstacle_map for cell in cells)
+    lookup_seconds = time.perf_counter() - start
+
+    return {
+        "obstacles": len(obstacle_map),
+        "tiles": obstacle_map.tiles,
+        "load_seconds": round(load_seconds, 3),
+        "lookups": lookups,
+        "hits": hits,
+        "lookups_per_second": round(lookups / lookup_seconds),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--obstacles", type=int, default=10_000_000)
+    parser.add_argument("--lookups", type=int, default=1_000_000)
+    parser.add_argument("--density", type=float, default=0.25)
+    args = parser.parse_args()
+
+    for key, value in main(args.obstacles, args.lookups, args.density).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,91 @@
+"""
+Benchmarks Action insertion throughput of the command parser.
+
+Compares the per-object ORM path that `parse_commands` used originally with the
+bulk INSERT path it uses now. Run from the `app` directory against a disposable,
+migrated database (every QUEUED command in it will be parsed):
+
+    python -m benchmarks.parse_commands --commands 20 --length 50000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from database import async_sessionmaker
+from models import Action, ActionTypes, Command, Statuses
+from scheduler import parse_commands
+from sqlalchemy import asc, delete, func, select
+
+
+async def parse_commands_orm():
+    """The original implementation: one ORM object and flush per action."""
+    async with async_sessionmaker() as async_session:
+        query = (
+            select(Command)
+            .where(Command.status == Statuses.QUEUED)
+            .order_by(asc(Command.created))
+        )
+        result = await async_session.execute(query)
+
+        for item in result.scalars():
+            for action in item.command:
+                async_session.add(Action(type=ActionTypes(action), command_id=item.id))
+
+            item.status = Statuses.COMPLETED
+            await async_session.commit()
+
+
+async def seed_commands(commands: int, length: int) -> list:
+    async with async_sessionmaker() as async_session:
+        items = [
+            Command(command="".join(random.choices("FBLR", k=length)))
+            for _ in range(commands)
+        ]
+        async_session.add_all(items)
+        await async_session.commit()
+        return [item.id for item in items]
+
+
+async def run(name: str, parser, commands: int, length: int) -> dict:
+    ids = await seed_commands(commands, length)
+    try:
+        start = time.perf_counter()
+        await parser()
+        elapsed = time.perf_counter() - start
+
+        async with async_sessionmaker() as async_session:
+            query = select(func.count()).where(Action.command_id.in_(ids))
+            rows = (await async_session.execute(query)).scalar_one()
+    finally:
+        async with async_sessionmaker() as async_session:
+            await async_session.execute(delete(Command).where(Command.id.in_(ids)))
+            await async_session.commit()
+
+    return {
+        "name": name,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed),
+    }
+
+
+async def main(commands: int, length: int) -> list:
+    return [
+        await run("orm", parse_commands_orm, commands, length),
+        await run("bulk", parse_commands, commands, length),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--commands", type=int, default=20)
+    parser.add_argument("--length", type=int, default=50000)
+    args = parser.parse_args()
+
+    for result in asyncio.run(main(args.commands, args.length)):
+        print(
+            f"{result['name']:>5}: {result['rows']} rows in {result['seconds']} s "
+            f"({result['rows_per_second']} rows/s)"
+        )
@@ -0,0 +1,61 @@
+"""
+Benchmarks the A* planner used by `POST /plan`.
+
+Plans paths of growing length through a random obstacle set spread over a
+10000 x 10000 grid, along an axis and along a diagonal, the latter being the
+worst case of the heuristic. Needs no database:
+
+    python -m benchmarks.planner --obstacles 3000000
+"""
+
+import argparse
+import random
+import time
+
+from exceptions import NoPathFound
+from models import Directions
+from obstacles import ObstacleMap
+from planner import plan_command
+
+
+def measure(target_x: int, target_y: int, obstacle_map: ObstacleMap) -> dict:
+    start = time.perf_counter()
+    try:
+        _command, actions = plan_command(
+            0, 0, Directions.NORTH, target_x, target_y, None, obstacle_map
+        )
+    except NoPathFound as e:
+        actions = str(e)
+    return {
+        "actions": actions,
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def main(obstacles: int, distances: list) -> dict:
+    rng = random.Random(0)
+    targets = {(0, 0)} | {(d, 0) for d in distances} | {(d, d) for d in distances}
+    cells = (
+        (rng.randint(-5000, 5000), rng.randint(-5000, 5000)) for _ in range(obstacles)
+    )
+    obstacle_map = ObstacleMap.from_cells(c for c in cells if c not in targets)
+
+    results = {}
+    for distance in distances:
+        results[f"axis_{distance}"] = measure(distance, 0, obstacle_map)
+        results[f"diagonal_{distance}"] = measure(distance, distance, obstacle_map)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--obstacles", type=int, default=3_000_000)
+    parser.add_argument(
+        "--distances",
+        type=lambda value: [int(d) for d in value.split(",")],
+        default=[50, 200, 800],
+    )
+    args = parser.parse_args()
+
+    for name, result in main(args.obstacles, args.distances).items():
+        print(f"{name}: {result}")
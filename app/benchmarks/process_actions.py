@@ -0,0 +1,78 @@
+"""
+Benchmarks the durable and batched execution modes of the action executor.
+
+Each mode executes a freshly parsed command of `--actions` actions that never
+hits an obstacle. Run from the `app` directory against a disposable, migrated
+database with an empty queue:
+
+    python -m benchmarks.process_actions --actions 10000
+"""
+
+import argparse
+import asyncio
+import datetime
+import time
+from types import SimpleNamespace
+
+from database import async_sessionmaker
+from models import Action, Command, Statuses
+from scheduler import _action_rows, process_actions
+from settings import DEFAULT_ROBOT_ID
+from sqlalchemy import delete, insert
+
+
+async def seed_command(actions: int):
+    # "FBLR" moves one cell and back, so the robot never reaches an obstacle.
+    command = SimpleNamespace(
+        id=None,
+        robot_id=DEFAULT_ROBOT_ID,
+        command=("FBLR" * actions)[:actions],
+        created=None,
+        position=None,
+    )
+    async with async_sessionmaker() as async_session:
+        item = Command(command=command.command, status=Statuses.COMPLETED)
+        async_session.add(item)
+        await async_session.flush()
+
+        command.id, command.created = item.id, item.created
+        command.position = item.position
+        rows = list(_action_rows([command], datetime.datetime.now()))
+        await async_session.execute(insert(Action), rows)
+        await async_session.commit()
+    return command.id
+
+
+async def run(mode: str, actions: int) -> dict:
+    command_id = await seed_command(actions)
+    try:
+        start = time.perf_counter()
+        await process_actions(mode=mode)
+        elapsed = time.perf_counter() - start
+    finally:
+        async with async_sessionmaker() as async_session:
+            await async_session.execute(delete(Command).where(Command.id == command_id))
+            await async_session.commit()
+
+    return {
+        "mode": mode,
+        "actions": actions,
+        "seconds": round(elapsed, 3),
+        "actions_per_second": round(actions / elapsed),
+    }
+
+
+async def main(actions: int) -> list:
+    return [await run(mode, actions) for mode in ("durable", "batched")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--actions", type=int, default=10000)
+    args = parser.parse_args()
+
+    for result in asyncio.run(main(args.actions)):
+        print(
+            f"{result['mode']:>7}: {result['actions']} actions in "
+            f"{result['seconds']} s ({result['actions_per_second']} actions/s)"
+        )
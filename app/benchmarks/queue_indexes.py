@@ -0,0 +1,146 @@
+"""
+Benchmarks the queue queries with and without the queue indexes.
+
+Populates `--actions` actions (all executed except the last `--queued`) with
+server-side generate_series, then runs EXPLAIN ANALYZE for every queue query,
+first inside a transaction that drops the indexes and is rolled back ("before"),
+then with the indexes in place ("after"). Run from the `app` directory against a
+disposable database migrated to head:
+
+    python -m benchmarks.queue_indexes --actions 10000000
+"""
+
+import argparse
+import asyncio
+import json
+import uuid
+
+from database import engine
+from models import Action
+from scheduler import _queued_actions_query
+from settings import DEFAULT_ROBOT_ID, EXECUTION_CHUNK_SIZE
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+INDEXES = [
+    "ix_commands_queued_robot_created",
+    "ix_actions_queued_robot_order",
+    "ix_actions_command_created_id",
+]
+
+# The chunk query the durable executor runs, rendered with its parameters.
+QUEUED_ACTIONS = (
+    _queued_actions_query(DEFAULT_ROBOT_ID, Action)
+    .limit(EXECUTION_CHUNK_SIZE)
+    .compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+)
+
+QUERIES = {
+    "queued_commands": """
+        SELECT id, command FROM commands
+        WHERE robot_id = 'default' AND status = 'QUEUED'
+        ORDER BY created LIMIT 100
+    """,
+    "queued_actions": str(QUEUED_ACTIONS),
+    "command_actions": """
+        SELECT count(*) FROM actions WHERE command_id = :command_id
+    """,
+}
+
+
+async def populate(actions: int, queued: int, commands: int) -> uuid.UUID:
+    command_id = uuid.uuid4()
+    async with engine.begin() as connection:
+        await connection.execute(
+            text(
+                """
+                INSERT INTO commands (id, command, status, created)
+                SELECT CASE WHEN n = 1 THEN CAST(:command_id AS uuid)
+                            ELSE gen_random_uuid() END,
+                       'F', 'COMPLETED'::statuses, now() - make_interval(secs => n)
+                FROM generate_series(1, :commands) AS n
+                """
+            ),
+            {"command_id": command_id, "commands": commands},
+        )
+        await connection.execute(
+            text(
+                """
+                INSERT INTO actions
+                    (id, command_id, command_created, command_position, type,
+                     count, status, x_coord, y_coord, direction, created, updated)
+                SELECT gen_random_uuid(), CAST(:command_id AS uuid),
+                       CASE WHEN n > :executed THEN now() - interval '1 second' END,
+                       CASE WHEN n > :executed THEN 1 END,
+                       'MOVE_FORWARD'::actiontypes, 1,
+                       CASE WHEN n > :executed THEN 'QUEUED'::statuses
+                            ELSE 'COMPLETED'::statuses END,
+                       n, 0, 'EAST'::directions,
+                       now() + make_interval(secs => n / 1000.0),
+                       CASE WHEN n > :executed THEN NULL
+                            ELSE now() + make_interval(secs => n / 1000.0) END
+                FROM generate_series(1, :actions) AS n
+                """
+            ),
+            {
+                "command_id": command_id,
+                "actions": actions,
+                "executed": actions - queued,
+            },
+        )
+        await connection.execute(text("ANALYZE commands"))
+        await connection.execute(text("ANALYZE actions"))
+    return command_id
+
+
+async def explain(connection, query: str, params: dict) -> dict:
+    result = await connection.execute(
+        text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}"), params
+    )
+    plan = result.scalar_one()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return {
+        "node": plan[0]["Plan"]["Node Type"],
+        "execution_ms": plan[0]["Execution Time"],
+    }
+
+
+async def measure(command_id: uuid.UUID, drop_indexes: bool) -> dict:
+    results = {}
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            if drop_indexes:
+                for index in INDEXES:
+                    await connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+            for name, query in QUERIES.items():
+                params = {"command_id": command_id} if ":command_id" in query else {}
+                results[name] = await explain(connection, query, params)
+        finally:
+            await transaction.rollback()
+    return results
+
+
+async def main(actions: int, queued: int, commands: int) -> dict:
+    command_id = await populate(actions, queued, commands)
+    return {
+        "before": await measure(command_id, drop_indexes=True),
+        "after": await measure(command_id, drop_indexes=False),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--actions", type=int, default=10_000_000)
+    parser.add_argument("--queued", type=int, default=1000)
+    parser.add_argument("--commands", type=int, default=100_000)
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args.actions, args.queued, args.commands))
+    for stage, results in report.items():
+        for name, result in results.items():
+            print(
+                f"{stage:>6} {name:>16}: {result['node']:<18} "
+                f"{result['execution_ms']:.3f} ms"
+            )
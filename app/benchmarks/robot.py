@@ -0,0 +1,84 @@
+"""
+Benchmarks the in-memory execution of actions by Robot.
+
+Executes `--actions` actions one by one with `process_action`, as the durable
+mode does, with `simulate`, as the batched mode does, and in a single call to
+`execute_many`, first as single steps and then as runs of `--run` steps. The
+actions go back and forth around the origin, so they never hit one of the random
+obstacles. Needs no database:
+
+    python -m benchmarks.robot --actions 1000000
+"""
+
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from models import ActionTypes, Directions
+from obstacles import ObstacleMap, obstacle_map
+from robot import Robot
+
+
+def make_actions(actions: int, count: int) -> list:
+    pattern = [
+        SimpleNamespace(type=ActionTypes(action), count=count) for action in "FBLR"
+    ]
+    return (pattern * (actions // 4 + 1))[:actions]
+
+
+def process_each(actions: list):
+    robot = Robot(0, 0, Directions.NORTH)
+    for action in actions:
+        robot.process_action(action)
+
+
+def measure(actions: list, repeat: int) -> dict:
+    steps = sum(action.count for action in actions)
+    result = {"actions": len(actions), "steps": steps}
+    for name, execute in (
+        ("process_action", process_each),
+        ("simulate", lambda actions: Robot(0, 0, Directions.NORTH).simulate(actions)),
+        (
+            "execute_many",
+            lambda actions: Robot(0, 0, Directions.NORTH).execute_many(actions),
+        ),
+    ):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            execute(actions)
+            timings.append(time.perf_counter() - start)
+        result[f"{name}_steps_per_second"] = round(steps / min(timings))
+    return result
+
+
+def main(actions: int, run: int, obstacles: int, repeat: int) -> dict:
+    rng = random.Random(0)
+    cells = (
+        (rng.randint(-5000, 5000), rng.randint(-5000, 5000)) for _ in range(obstacles)
+    )
+    obstacle_map.replace(
+        ObstacleMap.from_cells(
+            (x, y) for x, y in cells if max(abs(x), abs(y)) > run + 1
+        )
+    )
+
+    return {
+        "single_steps": measure(make_actions(actions, 1), repeat),
+        "runs": measure(make_actions(actions, run), repeat),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--actions", type=int, default=1_000_000)
+    parser.add_argument("--run", type=int, default=10)
+    parser.add_argument("--obstacles", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, result in main(
+        args.actions, args.run, args.obstacles, args.repeat
+    ).items():
+        print(f"{name}: {result}")
@@ -0,0 +1,60 @@
+"""
+Benchmarks the vectorized command simulation used by `POST /command/simulate`.
+
+Simulates a random command of `--length` actions against a random obstacle set
+and a collision-free straight-line command of the same length. Needs no
+database:
+
+    python -m benchmarks.simulation --length 1000000
+"""
+
+import argparse
+import random
+import time
+
+from models import Directions
+from obstacles import ObstacleMap
+from simulation import simulate_command
+
+
+def measure(command: str, obstacle_map: ObstacleMap, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = simulate_command(command, 0, 0, Directions.NORTH, obstacle_map)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "length": len(command),
+        "collision_index": result[3],
+        "best_ms": round(min(timings) * 1000, 2),
+    }
+
+
+def main(length: int, obstacles: int, repeat: int) -> dict:
+    rng = random.Random(0)
+    obstacle_map = ObstacleMap.from_cells(
+        (rng.randint(-5000, 5000), rng.randint(-5000, 5000)) for _ in range(obstacles)
+    )
+    free_map = ObstacleMap()
+
+    return {
+        "random_walk": measure(
+            "".join(rng.choices("FFFBLR", k=length)), free_map, repeat
+        ),
+        "random_walk_with_obstacles": measure(
+            "".join(rng.choices("FFFBLR", k=length)), obstacle_map, repeat
+        ),
+        "straight_line": measure("F" * length, free_map, repeat),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--length", type=int, default=1_000_000)
+    parser.add_argument("--obstacles", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, result in main(args.length, args.obstacles, args.repeat).items():
+        print(f"{name}: {result}")
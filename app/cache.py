@@ -0,0 +1,55 @@
+from utils import decode_state
+
+
+class RobotStateCache:
+    """
+    In-process cache of robot states, kept fresh by robot_state notifications.
+
+    The cache is only served while the LISTEN connection is up: notifications sent
+    while it is down are lost, so connecting and disconnecting both drop the
+    cached states. Every change bumps a version, which lets readers that loaded a
+    state from the database store it only if no notification arrived meanwhile.
+    """
+
+    def __init__(self):
+        self._enabled = False
+        self._states = {}
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, robot_id: str):
+        """
+        Returns the cached state tuple of a robot, or None if missing or not trusted.
+        """
+        return self._states.get(robot_id) if self._enabled else None
+
+    def set(self, robot_id: str, state, version: int):
+        """
+        Stores a state loaded from the database at the given cache version.
+        """
+        if self._enabled and version == self._version:
+            self._states[robot_id] = state
+
+    def update(self, payload: str):
+        """
+        Replaces a robot's cached state with the one carried by a notification.
+        """
+        robot_id, state = decode_state(payload)
+        self._version += 1
+        self._states[robot_id] = state
+
+    def enable(self):
+        self._version += 1
+        self._states = {}
+        self._enabled = True
+
+    def disable(self):
+        self._version += 1
+        self._states = {}
+        self._enabled = False
+
+
+robot_state_cache = RobotStateCache()
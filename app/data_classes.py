@@ -1,20 +1,99 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 
-from models import Directions, Statuses
-from pydantic import UUID4, BaseModel
+from grammar import validate_command
+from models import ActionTypes, Directions, Statuses
+from pydantic import UUID4, BaseModel, Field, field_validator
+from settings import COMMAND_BATCH_MAX_SIZE
 
 
 class CommandRequest(BaseModel):
     command: str
 
+    @field_validator("command")
+    @classmethod
+    def check_command(cls, command: str) -> str:
+        validate_command(command)
+        return command
+
 
 class CommandResponse(BaseModel):
     id: UUID4
 
 
+class CommandBatchRequest(BaseModel):
+    commands: List[CommandRequest] = Field(
+        min_length=1, max_length=COMMAND_BATCH_MAX_SIZE
+    )
+
+
+class CommandBatchResponse(BaseModel):
+    ids: List[UUID4]
+
+
 class RobotStatus(BaseModel):
     x: int
     y: int
     direction: Directions
     status: Statuses
     command_id: Optional[UUID4] = None
+
+
+class SimulationResponse(BaseModel):
+    x: int
+    y: int
+    direction: Directions
+    status: Statuses
+    collision_index: Optional[int] = None
+
+
+class CommandProgress(BaseModel):
+    id: UUID4
+    robot_id: str
+    status: Statuses
+    actions: Dict[Statuses, int]
+    x: Optional[int] = None
+    y: Optional[int] = None
+    direction: Optional[Directions] = None
+
+
+class ActionItem(BaseModel):
+    id: UUID4
+    type: ActionTypes
+    count: int
+    status: Statuses
+    x: Optional[int] = None
+    y: Optional[int] = None
+    direction: Optional[Directions] = None
+    created: datetime
+    updated: Optional[datetime] = None
+
+
+class ActionPage(BaseModel):
+    items: List[ActionItem]
+    next_cursor: Optional[str] = None
+
+
+class Trajectory(BaseModel):
+    # Poses of all listed commands, concatenated; the poses of commands[i] start at
+    # offsets[i]. x and y hold the first coordinate, then deltas to the previous one.
+    robot_id: str
+    commands: List[UUID4]
+    offsets: List[int]
+    x: List[int]
+    y: List[int]
+    directions: str
+    next_from: Optional[datetime] = None
+
+
+class PlanRequest(BaseModel):
+    x: int
+    y: int
+    direction: Optional[Directions] = None
+    enqueue: bool = False
+
+
+class PlanResponse(BaseModel):
+    command: str
+    actions: int
+    id: Optional[UUID4] = None
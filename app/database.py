@@ -1,11 +1,105 @@
-from settings import POSTGRES_DSN
+import time
+from contextlib import asynccontextmanager
+
+from metrics import Gauge, Histogram
+from settings import (
+    POSTGRES_DSN,
+    POSTGRES_MAX_SIZE,
+    POSTGRES_MIN_SIZE,
+    POSTGRES_POOL_PRE_PING,
+    POSTGRES_POOL_PROFILE,
+    POSTGRES_POOL_RECYCLE,
+    POSTGRES_POOL_TIMEOUT,
+    POSTGRES_STATEMENT_CACHE_SIZE,
+)
+from sqlalchemy import event, func, select
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
-engine = create_async_engine(POSTGRES_DSN, echo=False)
+engine = create_async_engine(
+    POSTGRES_DSN,
+    echo=False,
+    pool_size=POSTGRES_MIN_SIZE,
+    max_overflow=POSTGRES_MAX_SIZE - POSTGRES_MIN_SIZE,
+    pool_timeout=POSTGRES_POOL_TIMEOUT,
+    pool_pre_ping=POSTGRES_POOL_PRE_PING,
+    pool_recycle=POSTGRES_POOL_RECYCLE,
+    connect_args={
+        # SQLAlchemy's cache of prepared statements, and asyncpg's own one.
+        "prepared_statement_cache_size": POSTGRES_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": POSTGRES_STATEMENT_CACHE_SIZE,
+    },
+)
 async_sessionmaker = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+QUERY_DURATION = Histogram("db_query_duration_seconds", "Duration of SQL statements.")
+COMMIT_DURATION = Histogram(
+    "db_commit_duration_seconds", "Duration of session commits, flush included."
+)
+
+POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Open pool connections, idle or in use.", ["profile"]
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections", "Pool connections in use.", ["profile"]
+)
+POOL_MAX_SIZE = Gauge(
+    "db_pool_max_connections", "Maximum number of pool connections.", ["profile"]
+)
+# Read when scraped, so checkouts and checkins cost nothing extra.
+POOL_CONNECTIONS.set_function(
+    lambda: engine.pool.checkedin() + engine.pool.checkedout(), POSTGRES_POOL_PROFILE
+)
+POOL_CHECKED_OUT.set_function(lambda: engine.pool.checkedout(), POSTGRES_POOL_PROFILE)
+POOL_MAX_SIZE.set(POSTGRES_MAX_SIZE, POSTGRES_POOL_PROFILE)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _observe_query(conn, cursor, statement, parameters, context, executemany):
+    QUERY_DURATION.observe(time.perf_counter() - context._query_started)
+
+
+@event.listens_for(Session, "before_commit")
+def _start_commit_timer(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _observe_commit(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        COMMIT_DURATION.observe(time.perf_counter() - started)
+
 
 async def get_async_session() -> AsyncSession:
     async with async_sessionmaker() as session:
         yield session
+
+
+@asynccontextmanager
+async def advisory_lock(*keys):
+    """
+    Tries to take a session-level Postgres advisory lock without waiting.
+
+    The lock is held on a dedicated connection for the duration of the context, so
+    the commits of other sessions inside it do not release it, and it is released
+    by Postgres if the process dies.
+
+    Args:
+        keys: The advisory lock key, either one bigint or two int keys.
+
+    Yields:
+        bool: Whether the lock was acquired.
+    """
+    async with engine.connect() as connection:
+        acquired = await connection.scalar(select(func.pg_try_advisory_lock(*keys)))
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await connection.scalar(select(func.pg_advisory_unlock(*keys)))
@@ -7,4 +7,18 @@ class UnknownAction(RobotError):
 
 
 class ObstacleDetected(RobotError):
+    def __init__(self, message: str, steps: int = 0):
+        super().__init__(message)
+        self.steps = steps
+
+
+class InvalidCommand(ValueError):
+    pass
+
+
+class NoPathFound(ValueError):
+    pass
+
+
+class CommandArchived(Exception):
     pass
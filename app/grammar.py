@@ -0,0 +1,158 @@
+"""
+Parser of the command grammar.
+
+    command := item*
+    item    := (action | "(" command ")") count?
+    action  := "F" | "B" | "L" | "R"
+    count   := [1-9][0-9]{0,8}
+
+Whitespace between items is ignored, so "F100 R (FL)20" is a valid command: a
+hundred steps forward, a right turn, then twenty times a step forward followed by
+a left turn. Groups must contain at least one action. Commands are parsed into a
+small AST of Step and Repeat nodes, which is expanded lazily by generators, so a
+long survey pattern is never materialized as a string of single actions.
+"""
+
+import re
+from itertools import repeat
+from typing import Iterator, NamedTuple, Tuple, Union
+
+from exceptions import InvalidCommand
+from settings import COMMAND_MAX_ACTIONS, COMMAND_MAX_LENGTH
+
+# Commands without groups or whitespace, checked in a single pass.
+FLAT_PATTERN = re.compile(r"(?:[FBLR](?:[1-9][0-9]{0,8})?)*")
+RUN_PATTERN = re.compile(r"([FBLR])([0-9]*)")
+TOKEN_PATTERN = re.compile(
+    r"([FBLR])([1-9][0-9]{0,8})?|(\()|\)([1-9][0-9]{0,8})?|(\s+)"
+)
+MAX_NESTING = 16
+
+
+class Step(NamedTuple):
+    action: str
+    count: int
+
+
+class Repeat(NamedTuple):
+    body: Tuple["Node", ...]
+    count: int
+
+
+Node = Union[Step, Repeat]
+
+
+def parse_command(command: str) -> Tuple[Node, ...]:
+    """
+    Parses a command string into its AST.
+
+    Args:
+        command: The command string, e.g. "F100 R (FL)20".
+
+    Returns:
+        tuple: The top-level nodes of the command.
+
+    Raises:
+        InvalidCommand: If the command is malformed or has an empty group.
+    """
+    stack = [[]]
+    opened = []
+    position = 0
+    while position < len(command):
+        match = TOKEN_PATTERN.match(command, position)
+        if match is None:
+            raise InvalidCommand(f"Invalid command syntax at index {position}.")
+
+        action, count, group, group_count, _ = match.groups()
+        if action:
+            stack[-1].append(Step(action, int(count or 1)))
+        elif group:
+            if len(opened) == MAX_NESTING:
+                raise InvalidCommand(
+                    f"Groups are nested deeper than {MAX_NESTING} at index {position}."
+                )
+            stack.append([])
+            opened.append(position)
+        elif match.group(0).startswith(")"):
+            if not opened:
+                raise InvalidCommand(f"Unopened group at index {position}.")
+            body = stack.pop()
+            start = opened.pop()
+            if not body:
+                raise InvalidCommand(f"Empty group at index {start}.")
+            stack[-1].append(Repeat(tuple(body), int(group_count or 1)))
+        position = match.end()
+
+    if opened:
+        raise InvalidCommand(f"Unclosed group at index {opened[-1]}.")
+    return tuple(stack[0])
+
+
+def count_actions(nodes: Tuple[Node, ...]) -> int:
+    """
+    Returns the number of single-step actions the nodes expand to.
+    """
+    return sum(
+        node.count if isinstance(node, Step) else node.count * count_actions(node.body)
+        for node in nodes
+    )
+
+
+def validate_command(command: str) -> int:
+    """
+    Checks a command string against the command grammar and size limits.
+
+    Commands without groups or whitespace are checked with a single pass of a
+    compiled regular expression. Other commands, including malformed ones, are
+    parsed, which locates the first error.
+
+    Args:
+        command: The command string, e.g. "FFRFF", "F10R2" or "F100 R (FL)20".
+
+    Returns:
+        int: The number of single-step actions the command expands to.
+
+    Raises:
+        InvalidCommand: If the command is malformed or too large.
+    """
+    if len(command) > COMMAND_MAX_LENGTH:
+        raise InvalidCommand(f"Command is longer than {COMMAND_MAX_LENGTH} characters.")
+
+    if command.isalpha() and FLAT_PATTERN.fullmatch(command):
+        actions = len(command)
+    elif FLAT_PATTERN.fullmatch(command):
+        actions = sum(int(count or 1) for _, count in RUN_PATTERN.findall(command))
+    else:
+        actions = count_actions(parse_command(command))
+
+    if actions > COMMAND_MAX_ACTIONS:
+        raise InvalidCommand(
+            f"Command expands to more than {COMMAND_MAX_ACTIONS} actions."
+        )
+    return actions
+
+
+def expand(nodes: Tuple[Node, ...]) -> Iterator[Tuple[str, int]]:
+    """
+    Lazily yields the (action character, repeat count) runs of the nodes, in order.
+    """
+    for node in nodes:
+        if isinstance(node, Step):
+            yield node
+        else:
+            for body in repeat(node.body, node.count):
+                yield from expand(body)
+
+
+def command_runs(command: str) -> Iterator[Tuple[str, int]]:
+    """
+    Lazily yields (action character, repeat count) runs of a valid command, in order.
+    """
+    if command.isalpha():
+        return ((action, 1) for action in command)
+    if FLAT_PATTERN.fullmatch(command):
+        return (
+            (match.group(1), int(match.group(2) or 1))
+            for match in RUN_PATTERN.finditer(command)
+        )
+    return expand(parse_command(command))
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger("metrics_logger")
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """
+    Holds the metrics of a process and renders them in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: "Metric"):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """
+    Base class of metrics with an optional fixed set of label names.
+
+    Series are keyed by the tuple of their label values, and text is only produced
+    when the registry is rendered, so recording a sample never formats strings.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        registry: Registry = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        registry.register(self)
+
+    def _labels(self, values: Tuple, extra: Tuple = ()) -> str:
+        pairs = [
+            f'{name}="{_escape(value)}"'
+            for name, value in (*zip(self.labels, values), *extra)
+        ]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{self._labels(labels)} {value}"
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def set_function(self, function: Callable[[], float], *labels):
+        """
+        Makes the gauge report the value returned by `function` when scraped.
+        """
+        self._values[labels] = function
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            if callable(value):
+                value = value()
+            yield f"{self.name}{self._labels(labels)} {value}"
+
+
+class Histogram(Metric):
+    """
+    Counts observations in fixed buckets; an observation is a bisect and two adds.
+    """
+
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._buckets = tuple(buckets)
+        self._series: Dict[Tuple, List] = {}
+
+    def observe(self, value: float, *labels, count: int = 1):
+        """
+        Records `count` observations of `value`.
+        """
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self._buckets) + 1), 0.0]
+        series[0][bisect_left(self._buckets, value)] += count
+        series[1] += value * count
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self) -> Iterator[str]:
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self._buckets, "+Inf"), counts):
+                cumulative += count
+                label_text = self._labels(labels, (("le", bound),))
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            yield f"{self.name}_sum{self._labels(labels)} {total}"
+            yield f"{self.name}_count{self._labels(labels)} {cumulative}"
+
+
+async def serve_metrics(
+    port: int, registry: Registry = REGISTRY, host: str = "127.0.0.1"
+):
+    """
+    Serves the metrics of a process without a web framework, e.g. for the scheduler.
+
+    Every request, whatever its path, is answered with the rendered registry. The
+    metrics are optional, so failing to listen, e.g. because the port is taken, is
+    logged rather than raised.
+
+    Args:
+        port: The TCP port to listen on.
+        registry: The metrics to serve.
+        host: The interface to listen on.
+
+    Returns:
+        None. Runs until cancelled, or returns if the port cannot be bound.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while (await reader.readline()).strip():
+                pass
+            body = registry.render().encode()
+            writer.write(
+                f"HTTP/1.1 200 OK\r\nContent-Type: {CONTENT_TYPE}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    try:
+        server = await asyncio.start_server(handle, host=host, port=port)
+    except OSError as e:
+        logger.error(f"Cannot serve metrics on {host}:{port}: {e}")
+        return
+    logger.info(f"Serving metrics on {host}:{port}.")
+    async with server:
+        await server.serve_forever()
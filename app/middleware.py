@@ -0,0 +1,123 @@
+import hmac
+import json
+import logging
+import random
+import time
+from uuid import uuid4
+
+from metrics import Histogram
+from settings import ACCESS_LOG_SAMPLE_RATE, API_TOKEN, REQUEST_ID
+
+logger = logging.getLogger("api_logger")
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests.",
+    ["method", "route", "status"],
+)
+
+PUBLIC_PATHS = frozenset(("/docs", "/openapi.json"))
+REQUEST_ID_HEADER = b"x-request-id"
+REQUEST_ID_MAX_LENGTH = 64
+_API_TOKEN = API_TOKEN.encode()
+
+
+def token_valid(token: str) -> bool:
+    """
+    Compares a token with API_TOKEN in constant time.
+    """
+    return hmac.compare_digest(token.encode(), _API_TOKEN)
+
+
+async def _unauthorized(send, detail: str, request_id: bytes):
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 401,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (REQUEST_ID_HEADER, request_id),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class RequestMiddleware:
+    """
+    Authenticates, times and logs HTTP requests in a single pure ASGI layer.
+
+    Unlike `@app.middleware("http")` functions it does not wrap requests and
+    responses in objects nor run the endpoint in a separate task; it only reads
+    the raw headers and watches the response start message.
+
+    Every request gets an ID, taken from the X-Request-ID header when the client
+    sends one, which is echoed in the response, added to the log records written
+    while handling the request and passed on to the scheduler with the command
+    notifications. Successful requests are written to the access log with
+    probability ACCESS_LOG_SAMPLE_RATE; server errors are always logged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        authorization = request_id = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value
+            elif name == REQUEST_ID_HEADER:
+                request_id = value[:REQUEST_ID_MAX_LENGTH]
+        if not request_id:
+            request_id = uuid4().hex.encode()
+        token = REQUEST_ID.set(request_id.decode("latin-1"))
+
+        status_code = 500
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (REQUEST_ID_HEADER, request_id),
+                ]
+            await send(message)
+
+        try:
+            if scope["path"] in PUBLIC_PATHS:
+                await self.app(scope, receive, send_with_request_id)
+            elif authorization is None or not authorization.startswith(b"Bearer "):
+                status_code = 401
+                await _unauthorized(
+                    send, "Authorization header missing or invalid", request_id
+                )
+            elif not hmac.compare_digest(authorization[7:], _API_TOKEN):
+                status_code = 401
+                await _unauthorized(send, "Invalid token", request_id)
+            else:
+                await self.app(scope, receive, send_with_request_id)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            # The route template rather than the path keeps the number of series
+            # bounded.
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                elapsed,
+                scope["method"],
+                route.path if route else "unmatched",
+                status_code,
+            )
+            if status_code >= 500 or random.random() < ACCESS_LOG_SAMPLE_RATE:
+                logger.info(
+                    f"{scope['method']} {scope['path']} completed with status "
+                    f"{status_code} in {elapsed * 1000:.2f} ms"
+                )
+            REQUEST_ID.reset(token)
@@ -0,0 +1,31 @@
+"""add count to actions
+
+Revision ID: 37176994c018
+Revises: 4297ffdc48f2
+Create Date: 2026-10-18 10:12:41.518302
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "37176994c018"
+down_revision: Union[str, Sequence[str], None] = "4297ffdc48f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "actions",
+        sa.Column("count", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("actions", "count")
@@ -0,0 +1,97 @@
+"""add robot_id to commands, actions and robot_state
+
+Revision ID: 84fc2b926e24
+Revises: ce1a1f318a01
+Create Date: 2026-10-18 14:47:08.112630
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from settings import DEFAULT_ROBOT_ID
+
+# revision identifiers, used by Alembic.
+revision: str = "84fc2b926e24"
+down_revision: Union[str, Sequence[str], None] = "ce1a1f318a01"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant defaults make these metadata-only changes, even on large tables.
+    for table in ("commands", "actions"):
+        op.add_column(
+            table,
+            sa.Column(
+                "robot_id",
+                sa.TEXT(),
+                server_default=DEFAULT_ROBOT_ID,
+                nullable=False,
+            ),
+        )
+
+    op.add_column(
+        "robot_state",
+        sa.Column(
+            "robot_id", sa.TEXT(), server_default=DEFAULT_ROBOT_ID, nullable=False
+        ),
+    )
+    op.drop_constraint("robot_state_pkey", "robot_state", type_="primary")
+    op.drop_column("robot_state", "id")
+    op.create_primary_key("robot_state_pkey", "robot_state", ["robot_id"])
+    op.alter_column("robot_state", "robot_id", server_default=None)
+
+    with op.get_context().autocommit_block():
+        for table, old_index, new_index in [
+            (
+                "commands",
+                "ix_commands_queued_created",
+                "ix_commands_queued_robot_created",
+            ),
+            ("actions", "ix_actions_queued_created", "ix_actions_queued_robot_created"),
+        ]:
+            op.create_index(
+                new_index,
+                table,
+                ["robot_id", "created"],
+                postgresql_where=sa.text("status = 'QUEUED'"),
+                postgresql_concurrently=True,
+            )
+            op.drop_index(old_index, table_name=table, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, old_index, new_index in [
+            (
+                "commands",
+                "ix_commands_queued_created",
+                "ix_commands_queued_robot_created",
+            ),
+            ("actions", "ix_actions_queued_created", "ix_actions_queued_robot_created"),
+        ]:
+            op.create_index(
+                old_index,
+                table,
+                ["created"],
+                postgresql_where=sa.text("status = 'QUEUED'"),
+                postgresql_concurrently=True,
+            )
+            op.drop_index(new_index, table_name=table, postgresql_concurrently=True)
+
+    op.execute(f"DELETE FROM robot_state WHERE robot_id <> '{DEFAULT_ROBOT_ID}'")
+    op.drop_constraint("robot_state_pkey", "robot_state", type_="primary")
+    op.add_column(
+        "robot_state",
+        sa.Column("id", sa.Integer(), server_default="1", nullable=False),
+    )
+    op.alter_column("robot_state", "id", server_default=None)
+    op.create_primary_key("robot_state_pkey", "robot_state", ["id"])
+    op.drop_column("robot_state", "robot_id")
+
+    for table in ("actions", "commands"):
+        op.drop_column(table, "robot_id")
@@ -0,0 +1,54 @@
+"""add actions.command_created and index the queue in execution order
+
+Revision ID: a1d4f7c2e935
+Revises: e7a3c91b4f02
+Create Date: 2026-10-18 23:41:07.529164
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a1d4f7c2e935"
+down_revision: Union[str, Sequence[str], None] = "e7a3c91b4f02"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "actions", sa.Column("command_created", sa.TIMESTAMP(), nullable=True)
+    )
+    # Only the queue is read by command_created, so executed actions keep NULL.
+    op.execute(
+        """
+        UPDATE actions SET command_created = commands.created
+        FROM commands
+        WHERE actions.command_id = commands.id AND actions.status = 'QUEUED'
+        """
+    )
+
+    # Indexes of partitioned tables cannot be built concurrently.
+    op.create_index(
+        "ix_actions_queued_robot_order",
+        "actions",
+        ["robot_id", "command_created", "created", "id"],
+        postgresql_where=sa.text("status = 'QUEUED'"),
+    )
+    op.drop_index("ix_actions_queued_robot_created", table_name="actions")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        "ix_actions_queued_robot_created",
+        "actions",
+        ["robot_id", "created"],
+        postgresql_where=sa.text("status = 'QUEUED'"),
+    )
+    op.drop_index("ix_actions_queued_robot_order", table_name="actions")
+    op.drop_column("actions", "command_created")
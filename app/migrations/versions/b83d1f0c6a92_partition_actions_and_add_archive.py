@@ -0,0 +1,177 @@
+"""partition actions by month and add the action archive
+
+Revision ID: b83d1f0c6a92
+Revises: f2e627d415a3
+Create Date: 2026-10-18 19:24:13.902114
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from settings import DEFAULT_ROBOT_ID
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "b83d1f0c6a92"
+down_revision: Union[str, Sequence[str], None] = "f2e627d415a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, command_id, robot_id, type, count, status, x_coord, y_coord, direction, "
+    "created, updated"
+)
+INDEXES = [
+    (
+        "ix_actions_queued_robot_created",
+        ["robot_id", "created"],
+        "status = 'QUEUED'",
+    ),
+    ("ix_actions_command_created_id", ["command_id", "created", "id"], None),
+]
+
+
+def create_actions_table(*constraints, **kwargs) -> None:
+    op.create_table(
+        "actions",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("command_id", sa.UUID(), nullable=True),
+        sa.Column(
+            "type",
+            postgresql.ENUM(name="actiontypes", create_type=False),
+            nullable=False,
+        ),
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="statuses", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("x_coord", sa.Integer(), nullable=True),
+        sa.Column("y_coord", sa.Integer(), nullable=True),
+        sa.Column(
+            "direction",
+            postgresql.ENUM(name="directions", create_type=False),
+            nullable=True,
+        ),
+        sa.Column("created", sa.TIMESTAMP(), nullable=False),
+        sa.Column("updated", sa.TIMESTAMP(), nullable=True),
+        sa.Column("count", sa.Integer(), server_default="1", nullable=False),
+        sa.Column(
+            "robot_id", sa.TEXT(), server_default=DEFAULT_ROBOT_ID, nullable=False
+        ),
+        sa.ForeignKeyConstraint(["command_id"], ["commands.id"], ondelete="CASCADE"),
+        *constraints,
+        **kwargs,
+    )
+
+
+def replace_actions_table(create) -> None:
+    # Index names are unique per schema, so the old table's ones are freed first.
+    for name, _columns, _where in INDEXES:
+        op.drop_index(name, table_name="actions")
+    op.rename_table("actions", "actions_previous")
+    op.execute("ALTER INDEX actions_pkey RENAME TO actions_previous_pkey")
+
+    create()
+    op.execute(
+        f"INSERT INTO actions ({COLUMNS}) SELECT {COLUMNS} FROM actions_previous"
+    )
+    op.drop_table("actions_previous")
+
+    # Built after the copy, which is much faster than maintaining them during it.
+    for name, columns, where in INDEXES:
+        op.create_index(
+            name,
+            "actions",
+            columns,
+            postgresql_where=sa.text(where) if where is not None else None,
+        )
+
+
+def create_partitions() -> None:
+    # One partition per month from the oldest action to next month, named like the
+    # ones the scheduler's maintenance job creates, plus a default partition that
+    # catches rows should that job fall behind.
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month timestamp;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc(
+                        'month',
+                        coalesce((SELECT min(created) FROM actions_previous), now())
+                    ),
+                    date_trunc('month', now()) + interval '1 month',
+                    interval '1 month'
+                )
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF actions FOR VALUES FROM (%L) TO (%L)',
+                    'actions_' || to_char(month, 'YYYY_MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute("CREATE TABLE actions_default PARTITION OF actions DEFAULT")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("commands", sa.Column("archived", sa.TIMESTAMP(), nullable=True))
+    op.create_table(
+        "action_archives",
+        sa.Column("command_id", sa.UUID(), nullable=False),
+        sa.Column("robot_id", sa.TEXT(), nullable=False),
+        sa.Column("actions", sa.Integer(), nullable=False),
+        sa.Column("trajectory", sa.LargeBinary(), nullable=False),
+        sa.Column("finished", sa.TIMESTAMP(), nullable=True),
+        sa.Column("archived", sa.TIMESTAMP(), nullable=False),
+        sa.ForeignKeyConstraint(["command_id"], ["commands.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("command_id"),
+    )
+
+    # The partition key has to be part of the primary key.
+    def create():
+        create_actions_table(
+            sa.PrimaryKeyConstraint("id", "created"),
+            postgresql_partition_by="RANGE (created)",
+        )
+        create_partitions()
+
+    replace_actions_table(create)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_commands_unarchived_created",
+            "commands",
+            ["created"],
+            postgresql_where=sa.text("archived IS NULL"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    Archived actions are not restored: only the actions still in the partitions
+    are copied back.
+    """
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_commands_unarchived_created",
+            table_name="commands",
+            postgresql_concurrently=True,
+        )
+
+    replace_actions_table(lambda: create_actions_table(sa.PrimaryKeyConstraint("id")))
+
+    op.drop_table("action_archives")
+    op.drop_column("commands", "archived")
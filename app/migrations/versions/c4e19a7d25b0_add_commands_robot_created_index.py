@@ -0,0 +1,39 @@
+"""add ix_commands_robot_created for trajectory ranges
+
+Revision ID: c4e19a7d25b0
+Revises: b83d1f0c6a92
+Create Date: 2026-10-18 21:07:55.214630
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e19a7d25b0"
+down_revision: Union[str, Sequence[str], None] = "b83d1f0c6a92"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        # GET /trajectory reads the commands of a robot by creation time.
+        op.create_index(
+            "ix_commands_robot_created",
+            "commands",
+            ["robot_id", "created"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_commands_robot_created",
+            table_name="commands",
+            postgresql_concurrently=True,
+        )
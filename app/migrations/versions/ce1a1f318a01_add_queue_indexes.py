@@ -0,0 +1,68 @@
+"""add queue indexes
+
+Revision ID: ce1a1f318a01
+Revises: ddd5721f370f
+Create Date: 2026-10-18 13:21:54.803114
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "ce1a1f318a01"
+down_revision: Union[str, Sequence[str], None] = "ddd5721f370f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # robot_state.id was created as SERIAL, but the single row always has id 1.
+    op.alter_column("robot_state", "id", server_default=None)
+    op.execute("DROP SEQUENCE IF EXISTS robot_state_id_seq")
+
+    # Built concurrently so that large tables stay writable during the migration.
+    with op.get_context().autocommit_block():
+        # Queue scans in parse_commands and process_actions.
+        op.create_index(
+            "ix_commands_queued_created",
+            "commands",
+            ["created"],
+            postgresql_where=sa.text("status = 'QUEUED'"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_actions_queued_created",
+            "actions",
+            ["created"],
+            postgresql_where=sa.text("status = 'QUEUED'"),
+            postgresql_concurrently=True,
+        )
+        # Actions of a command, also used by the ON DELETE CASCADE from commands.
+        op.create_index(
+            "ix_actions_command_id",
+            "actions",
+            ["command_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, index in [
+            ("actions", "ix_actions_command_id"),
+            ("actions", "ix_actions_queued_created"),
+            ("commands", "ix_commands_queued_created"),
+        ]:
+            op.drop_index(index, table_name=table, postgresql_concurrently=True)
+
+    op.execute("CREATE SEQUENCE robot_state_id_seq OWNED BY robot_state.id")
+    op.alter_column(
+        "robot_state",
+        "id",
+        server_default=sa.text("nextval('robot_state_id_seq'::regclass)"),
+    )
@@ -0,0 +1,30 @@
+"""add commands.trajectory
+
+Revision ID: d5b8e1f4a7c3
+Revises: a1d4f7c2e935
+Create Date: 2026-10-19 00:18:52.640217
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5b8e1f4a7c3"
+down_revision: Union[str, Sequence[str], None] = "a1d4f7c2e935"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Not backfilled: commands that finished before this revision and are not
+    # archived yet get their trajectory from the archive once they are.
+    op.add_column("commands", sa.Column("trajectory", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("commands", "trajectory")
@@ -0,0 +1,62 @@
+"""add robot_state table
+
+Revision ID: ddd5721f370f
+Revises: 37176994c018
+Create Date: 2026-10-18 12:03:17.240915
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "ddd5721f370f"
+down_revision: Union[str, Sequence[str], None] = "37176994c018"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "robot_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("x_coord", sa.Integer(), nullable=False),
+        sa.Column("y_coord", sa.Integer(), nullable=False),
+        sa.Column(
+            "direction",
+            postgresql.ENUM(name="directions", create_type=False),
+            nullable=False,
+        ),
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="statuses", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("command_id", sa.UUID(), nullable=True),
+        sa.Column("updated", sa.TIMESTAMP(), nullable=False),
+        sa.ForeignKeyConstraint(["command_id"], ["commands.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    # Seed the state from the most recent executed action, if there is one.
+    op.execute(
+        """
+        INSERT INTO robot_state
+            (id, x_coord, y_coord, direction, status, command_id, updated)
+        SELECT 1, x_coord, y_coord, direction, status, command_id, updated
+        FROM actions
+        WHERE status IN ('RUNNING', 'FAILED', 'COMPLETED')
+            AND x_coord IS NOT NULL
+        ORDER BY updated DESC
+        LIMIT 1
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("robot_state")
@@ -0,0 +1,31 @@
+"""drop ix_actions_executed_updated
+
+Revision ID: e7a3c91b4f02
+Revises: c4e19a7d25b0
+Create Date: 2026-10-18 23:12:40.118305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e7a3c91b4f02"
+down_revision: Union[str, Sequence[str], None] = "c4e19a7d25b0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases migrated before the index was removed from the earlier revisions
+    # still have it. Nothing reads it since positions come from robot_state, and it
+    # slows down every status update. Indexes of partitioned tables cannot be
+    # dropped concurrently, but dropping one only touches the catalog.
+    op.execute("DROP INDEX IF EXISTS ix_actions_executed_updated")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The index is not part of the earlier revisions anymore, so it is not restored.
@@ -0,0 +1,51 @@
+"""replace ix_actions_command_id with (command_id, created, id)
+
+Revision ID: f2e627d415a3
+Revises: 84fc2b926e24
+Create Date: 2026-10-18 16:02:41.538207
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2e627d415a3"
+down_revision: Union[str, Sequence[str], None] = "84fc2b926e24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        # Keyset pagination over the actions of a command; the leading command_id
+        # column still serves the ON DELETE CASCADE from commands.
+        op.create_index(
+            "ix_actions_command_created_id",
+            "actions",
+            ["command_id", "created", "id"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_actions_command_id",
+            table_name="actions",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_actions_command_id",
+            "actions",
+            ["command_id"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_actions_command_created_id",
+            table_name="actions",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,84 @@
+"""add commands.position to break ties of commands.created
+
+Revision ID: f7c2a9d3e816
+Revises: d5b8e1f4a7c3
+Create Date: 2026-10-19 00:52:31.207846
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f7c2a9d3e816"
+down_revision: Union[str, Sequence[str], None] = "d5b8e1f4a7c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing commands are numbered in storage order, which only matters for the
+    # ones sharing a creation time.
+    op.add_column(
+        "commands",
+        sa.Column("position", sa.BigInteger(), sa.Identity(), nullable=False),
+    )
+    op.add_column("actions", sa.Column("command_position", sa.BigInteger()))
+    op.execute(
+        """
+        UPDATE actions SET command_position = commands.position
+        FROM commands
+        WHERE actions.command_id = commands.id AND actions.status = 'QUEUED'
+        """
+    )
+
+    # Indexes of partitioned tables cannot be built concurrently.
+    op.drop_index("ix_actions_queued_robot_order", table_name="actions")
+    op.create_index(
+        "ix_actions_queued_robot_order",
+        "actions",
+        ["robot_id", "command_created", "command_position", "created", "id"],
+        postgresql_where=sa.text("status = 'QUEUED'"),
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_commands_robot_created_position",
+            "commands",
+            ["robot_id", "created", "position"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_commands_robot_created",
+            table_name="commands",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_commands_robot_created",
+            "commands",
+            ["robot_id", "created"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_commands_robot_created_position",
+            table_name="commands",
+            postgresql_concurrently=True,
+        )
+
+    op.drop_index("ix_actions_queued_robot_order", table_name="actions")
+    op.create_index(
+        "ix_actions_queued_robot_order",
+        "actions",
+        ["robot_id", "command_created", "created", "id"],
+        postgresql_where=sa.text("status = 'QUEUED'"),
+    )
+    op.drop_column("actions", "command_position")
+    op.drop_column("commands", "position")
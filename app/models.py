@@ -3,8 +3,9 @@ import uuid
 from datetime import datetime
 
 import sqlalchemy as sa
+from settings import DEFAULT_ROBOT_ID
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.orm import declarative_base, deferred, relationship
 
 Base = declarative_base()
 
@@ -37,13 +38,45 @@ class Command(Base):
     """
 
     __tablename__ = "commands"
+    __table_args__ = (
+        sa.Index(
+            "ix_commands_queued_robot_created",
+            "robot_id",
+            "created",
+            postgresql_where=sa.text("status = 'QUEUED'"),
+        ),
+        sa.Index(
+            "ix_commands_robot_created_position", "robot_id", "created", "position"
+        ),
+        sa.Index(
+            "ix_commands_unarchived_created",
+            "created",
+            postgresql_where=sa.text("archived IS NULL"),
+        ),
+    )
 
     id = sa.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    robot_id = sa.Column(
+        sa.TEXT,
+        nullable=False,
+        default=DEFAULT_ROBOT_ID,
+        server_default=DEFAULT_ROBOT_ID,
+    )
     command = sa.Column(sa.TEXT, nullable=False)
     status = sa.Column(sa.Enum(Statuses), nullable=False, default=Statuses.QUEUED)
 
     created = sa.Column(sa.TIMESTAMP, nullable=False, default=datetime.now)
+    # Strictly increasing, breaks ties of `created`: commands are ordered by
+    # (created, position). A detour shares the creation time of the command it
+    # bypasses and follows it by position.
+    position = sa.Column(sa.BigInteger, sa.Identity(), nullable=False)
     updated = sa.Column(sa.TIMESTAMP, onupdate=datetime.now)
+    # Set once the actions of the command were moved to its ActionArchive.
+    archived = sa.Column(sa.TIMESTAMP, nullable=True)
+    # Poses of the executed actions in the layout of `archive.TRAJECTORY_DTYPE`,
+    # written by the executor when the command finishes. Deferred, so loading a
+    # command does not load its trajectory.
+    trajectory = deferred(sa.Column(sa.LargeBinary, nullable=True))
 
     actions = relationship(
         "Action", back_populates="command", cascade="all, delete-orphan"
@@ -54,22 +87,101 @@ class Action(Base):
     """
     Represents a single action derived from a Command,
     tracking its execution status and resulting state.
+
+    An Action repeats its type `count` times, which lets runs of identical
+    consecutive moves be stored and executed as one row.
+
+    The table is partitioned by month of `created`, which is therefore part of the
+    primary key. Once their command finished, actions are moved to the archive.
     """
 
     __tablename__ = "actions"
+    __table_args__ = (
+        sa.Index(
+            "ix_actions_queued_robot_order",
+            "robot_id",
+            "command_created",
+            "command_position",
+            "created",
+            "id",
+            postgresql_where=sa.text("status = 'QUEUED'"),
+        ),
+        sa.Index("ix_actions_command_created_id", "command_id", "created", "id"),
+        {"postgresql_partition_by": "RANGE (created)"},
+    )
 
     id = sa.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     command_id = sa.Column(
         UUID(as_uuid=True), sa.ForeignKey("commands.id", ondelete="CASCADE")
     )
+    # Copied from the Command so that each robot's queue is read without a join.
+    robot_id = sa.Column(
+        sa.TEXT,
+        nullable=False,
+        default=DEFAULT_ROBOT_ID,
+        server_default=DEFAULT_ROBOT_ID,
+    )
+    # Creation and position of the Command, i.e. its submission order, copied at
+    # parse time so that the queue is read in execution order from a single index.
+    # Actions parsed before the columns existed and executed since have none.
+    command_created = sa.Column(sa.TIMESTAMP, nullable=True)
+    command_position = sa.Column(sa.BigInteger, nullable=True)
     type = sa.Column(sa.Enum(ActionTypes), nullable=False)
+    count = sa.Column(sa.Integer, nullable=False, default=1, server_default="1")
     status = sa.Column(sa.Enum(Statuses), nullable=False, default=Statuses.QUEUED)
 
     x_coord = sa.Column(sa.Integer, nullable=True)
     y_coord = sa.Column(sa.Integer, nullable=True)
     direction = sa.Column(sa.Enum(Directions), nullable=True)
 
-    created = sa.Column(sa.TIMESTAMP, nullable=False, default=datetime.now)
+    created = sa.Column(
+        sa.TIMESTAMP, primary_key=True, nullable=False, default=datetime.now
+    )
     updated = sa.Column(sa.TIMESTAMP, onupdate=datetime.now)
 
     command = relationship("Command", back_populates="actions")
+
+
+class RobotState(Base):
+    """
+    Holds the latest known pose and status of a robot of the fleet.
+
+    Maintained by the executor in the same transaction as the Action it results
+    from, so reading a robot's position never has to scan the actions table.
+    """
+
+    __tablename__ = "robot_state"
+
+    robot_id = sa.Column(sa.TEXT, primary_key=True)
+    x_coord = sa.Column(sa.Integer, nullable=False)
+    y_coord = sa.Column(sa.Integer, nullable=False)
+    direction = sa.Column(sa.Enum(Directions), nullable=False)
+    status = sa.Column(sa.Enum(Statuses), nullable=False)
+    command_id = sa.Column(
+        UUID(as_uuid=True), sa.ForeignKey("commands.id", ondelete="SET NULL")
+    )
+
+    updated = sa.Column(sa.TIMESTAMP, nullable=False, default=datetime.now)
+
+
+class ActionArchive(Base):
+    """
+    Holds the actions of a finished Command in packed form, once archived.
+
+    `trajectory` is the array of the command's actions in execution order, in the
+    binary layout of `archive.TRAJECTORY_DTYPE`, so one row replaces all of them.
+    """
+
+    __tablename__ = "action_archives"
+
+    command_id = sa.Column(
+        UUID(as_uuid=True),
+        sa.ForeignKey("commands.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    robot_id = sa.Column(sa.TEXT, nullable=False)
+    actions = sa.Column(sa.Integer, nullable=False)
+    trajectory = sa.Column(sa.LargeBinary, nullable=False)
+    # When the last action of the command was executed, if any was.
+    finished = sa.Column(sa.TIMESTAMP, nullable=True)
+    archived = sa.Column(sa.TIMESTAMP, nullable=False, default=datetime.now)
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from typing import Callable, Optional
+
+import asyncpg
+from settings import (
+    LISTEN_HEALTHCHECK_INTERVAL,
+    LISTEN_RECONNECT_DELAY,
+    POSTGRES_DSN,
+)
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("notifications_logger")
+
+
+async def notify(async_session: AsyncSession, channel: str, payload: str = ""):
+    """
+    Queues a Postgres notification within the session's current transaction.
+
+    Postgres delivers the notification to listeners only when the transaction
+    commits, so listeners never observe rows that were rolled back.
+
+    Args:
+        async_session: The SQLAlchemy asynchronous session used for DB operations.
+        channel: The name of the notification channel.
+        payload: An optional payload string passed to listeners.
+
+    Returns:
+        None
+    """
+    await async_session.execute(select(func.pg_notify(channel, payload)))
+
+
+async def listen(
+    channel: str,
+    callback: Callable[[str], None],
+    on_connect: Optional[Callable[[], None]] = None,
+    on_disconnect: Optional[Callable[[], None]] = None,
+):
+    """
+    Holds a dedicated LISTEN connection on a channel, reconnecting on failure.
+
+    The connection is health-checked periodically so that silently dropped
+    connections are detected. Notifications sent while disconnected are lost,
+    which is why `on_connect` is invoked after every (re)connect: callers use it
+    to catch up on anything they may have missed.
+
+    Args:
+        channel: The name of the notification channel.
+        callback: Called with the payload of every received notification.
+        on_connect: Called each time the LISTEN connection is established.
+        on_disconnect: Called each time the LISTEN connection is lost.
+
+    Returns:
+        None. Runs until cancelled.
+    """
+    dsn = POSTGRES_DSN.replace("postgresql+asyncpg", "postgresql")
+
+    while True:
+        connection = None
+        connected = False
+        try:
+            connection = await asyncpg.connect(dsn)
+            await connection.add_listener(
+                channel, lambda _conn, _pid, _channel, payload: callback(payload)
+            )
+            logger.info(f"Listening for notifications on channel '{channel}'.")
+            connected = True
+            if on_connect:
+                on_connect()
+
+            while True:
+                await asyncio.sleep(LISTEN_HEALTHCHECK_INTERVAL)
+                await connection.fetchval(
+                    "SELECT 1", timeout=LISTEN_HEALTHCHECK_INTERVAL
+                )
+        except (
+            OSError,
+            asyncio.TimeoutError,
+            asyncpg.PostgresError,
+            asyncpg.InterfaceError,
+        ) as e:
+            logger.warning(
+                f"{type(e)} on LISTEN connection for channel '{channel}', "
+                f"reconnecting in {LISTEN_RECONNECT_DELAY} s."
+            )
+        finally:
+            if connected and on_disconnect:
+                on_disconnect()
+            if connection is not None:
+                connection.terminate()
+
+        await asyncio.sleep(LISTEN_RECONNECT_DELAY)
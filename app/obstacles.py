@@ -0,0 +1,240 @@
+import logging
+import os
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from settings import (
+    OBSTACLES,
+    OBSTACLES_FILE,
+    OBSTACLES_ORIGIN,
+    OBSTACLES_TILE_BITS,
+)
+
+logger = logging.getLogger("obstacles_logger")
+
+
+class ObstacleMap:
+    """
+    A set of blocked grid cells stored as bit-packed square tiles.
+
+    The grid is split into tiles of 2**tile_bits x 2**tile_bits cells and only
+    tiles containing at least one obstacle are stored, one bit per cell, so memory
+    scales with the occupied area rather than with the extent of the map. Lookups
+    are a single dict access and a bit test.
+    """
+
+    def __init__(self, tile_bits: int = OBSTACLES_TILE_BITS):
+        self._bits = tile_bits
+        self._size = 1 << tile_bits
+        self._mask = self._size - 1
+        self._tiles = {}
+        # Incremented by every `replace`, so results derived from the map can be cached.
+        self.version = 0
+
+    @staticmethod
+    def _key(tile_x: int, tile_y: int) -> int:
+        return (tile_y << 32) | (tile_x & 0xFFFFFFFF)
+
+    def __contains__(self, cell) -> bool:
+        x, y = cell
+        tile = self._tiles.get(
+            ((y >> self._bits) << 32) | ((x >> self._bits) & 0xFFFFFFFF)
+        )
+        if tile is None:
+            return False
+        index = ((y & self._mask) << self._bits) | (x & self._mask)
+        return bool(tile[index >> 3] >> (index & 7) & 1)
+
+    def __len__(self) -> int:
+        return sum(
+            int.from_bytes(tile, "little").bit_count() for tile in self._tiles.values()
+        )
+
+    def contains_many(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Vectorized membership test for arrays of x and y coordinates.
+
+        Only one dict lookup per distinct tile is done in Python. Consecutive cells
+        of a path mostly share a tile, so tile keys are deduplicated run by run
+        before the (sorting) deduplication across the whole input.
+
+        Args:
+            xs: The x coordinates.
+            ys: The y coordinates, same length as xs.
+
+        Returns:
+            np.ndarray: A boolean array, True where the cell is an obstacle.
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        blocked = np.zeros(len(xs), dtype=bool)
+        if not len(xs) or not self._tiles:
+            return blocked
+
+        keys = ((ys >> self._bits) << 32) | ((xs >> self._bits) & 0xFFFFFFFF)
+        run_starts = np.empty(len(keys), dtype=bool)
+        run_starts[0] = True
+        np.not_equal(keys[1:], keys[:-1], out=run_starts[1:])
+        runs = np.cumsum(run_starts) - 1
+
+        unique, inverse = np.unique(keys[run_starts], return_inverse=True)
+        tiles = [self._tiles.get(int(key)) for key in unique]
+        present = [slot for slot, tile in enumerate(tiles) if tile is not None]
+        if not present:
+            return blocked
+
+        slots = np.full(len(unique), -1, dtype=np.int64)
+        slots[present] = np.arange(len(present))
+        stacked = np.frombuffer(b"".join(tiles[slot] for slot in present), np.uint8)
+        stacked = stacked.reshape(len(present), -1)
+
+        cell_slots = slots[inverse][runs]
+        candidates = np.flatnonzero(cell_slots >= 0)
+        index = ((ys[candidates] & self._mask) << self._bits) | (
+            xs[candidates] & self._mask
+        )
+        bits = stacked[cell_slots[candidates], index >> 3] >> (index & 7) & 1
+        blocked[candidates] = bits.astype(bool)
+        return blocked
+
+    @property
+    def tiles(self) -> int:
+        return len(self._tiles)
+
+    def replace(self, other: "ObstacleMap"):
+        """
+        Atomically swaps in the contents of another map with the same tile size.
+
+        Holders of a reference to this map observe either the old or the new set
+        of obstacles, never a mix of both.
+        """
+        if other._bits != self._bits:
+            raise ValueError("Obstacle maps must have the same tile size.")
+        self._tiles = other._tiles
+        self.version += 1
+
+    @classmethod
+    def from_cells(
+        cls, cells: Iterable[Tuple[int, int]], tile_bits: int = OBSTACLES_TILE_BITS
+    ) -> "ObstacleMap":
+        """
+        Builds a map from an iterable of (x, y) cells.
+        """
+        obstacle_map = cls(tile_bits)
+        tiles = {}
+        for x, y in cells:
+            key = cls._key(x >> tile_bits, y >> tile_bits)
+            tile = tiles.setdefault(key, bytearray(obstacle_map._size**2 // 8))
+            index = ((y & obstacle_map._mask) << tile_bits) | (x & obstacle_map._mask)
+            tile[index >> 3] |= 1 << (index & 7)
+        obstacle_map._tiles = {key: bytes(tile) for key, tile in tiles.items()}
+        return obstacle_map
+
+    @classmethod
+    def from_bitmap(
+        cls,
+        bitmap: np.ndarray,
+        origin: Tuple[int, int] = (0, 0),
+        tile_bits: int = OBSTACLES_TILE_BITS,
+    ) -> "ObstacleMap":
+        """
+        Builds a map from a 2-D bitmap where non-zero cells are obstacles.
+
+        Row r and column c of the bitmap describe the cell (origin_x + c,
+        origin_y + r). The bitmap is consumed one strip of tile rows at a time, so a
+        memory-mapped bitmap is never loaded into memory as a whole.
+        """
+        obstacle_map = cls(tile_bits)
+        size = obstacle_map._size
+        height, width = bitmap.shape
+        origin_x, origin_y = origin
+
+        first_tile_x = origin_x >> tile_bits
+        last_tile_x = (origin_x + width - 1) >> tile_bits
+        columns = last_tile_x - first_tile_x + 1
+        left = origin_x - (first_tile_x << tile_bits)
+
+        first_tile_y = origin_y >> tile_bits
+        last_tile_y = (origin_y + height - 1) >> tile_bits
+
+        for tile_y in range(first_tile_y, last_tile_y + 1):
+            top = (tile_y << tile_bits) - origin_y
+            rows = slice(max(top, 0), min(top + size, height))
+
+            strip = np.zeros((size, columns * size), dtype=bool)
+            target = strip[rows.start - top : rows.stop - top, left : left + width]
+            target[...] = bitmap[rows]
+            blocks = strip.reshape(size, columns, size).transpose(1, 0, 2)
+            blocks = blocks.reshape(columns, size * size)
+
+            for column in np.flatnonzero(blocks.any(axis=1)):
+                key = cls._key(first_tile_x + int(column), tile_y)
+                packed = np.packbits(blocks[column], bitorder="little")
+                obstacle_map._tiles[key] = packed.tobytes()
+
+        return obstacle_map
+
+
+def load_obstacle_map(
+    path: Optional[str] = OBSTACLES_FILE, origin: Tuple[int, int] = OBSTACLES_ORIGIN
+) -> ObstacleMap:
+    """
+    Loads an obstacle map from a file, or from settings.OBSTACLES without one.
+
+    Supported formats:
+      - `.npy`: a 2-D NumPy bitmap, memory-mapped while loading; row r and column c
+        describe the cell (origin_x + c, origin_y + r).
+      - anything else: a text file with one "x,y" pair per line.
+
+    Args:
+        path: The path to the obstacle file.
+        origin: The cell described by the first row and column of a bitmap.
+
+    Returns:
+        ObstacleMap: The loaded map.
+    """
+    if not path:
+        return ObstacleMap.from_cells(OBSTACLES)
+
+    if path.endswith(".npy"):
+        return ObstacleMap.from_bitmap(np.load(path, mmap_mode="r"), origin)
+
+    with open(path) as file:
+        cells = (
+            tuple(map(int, line.replace(" ", "").split(",")))
+            for line in file
+            if line.strip()
+        )
+        return ObstacleMap.from_cells(cells)
+
+
+_loaded_mtime = os.stat(OBSTACLES_FILE).st_mtime if OBSTACLES_FILE else None
+obstacle_map = load_obstacle_map()
+
+
+def reload_obstacles(path: Optional[str] = OBSTACLES_FILE):
+    """
+    Reloads the obstacle map in place if its file changed since the last load.
+
+    The new map is built aside and then swapped into `obstacle_map`, so lookups
+    running concurrently keep working against the previous map until the swap.
+
+    Args:
+        path: The path to the obstacle file.
+
+    Returns:
+        None
+    """
+    global _loaded_mtime
+
+    if not path:
+        return
+
+    mtime = os.stat(path).st_mtime
+    if mtime == _loaded_mtime:
+        return
+
+    new_map = load_obstacle_map(path)
+    obstacle_map.replace(new_map)
+    _loaded_mtime = mtime
+    logger.info(f"Reloaded {new_map.tiles} obstacle tiles from {path}.")
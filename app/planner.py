@@ -0,0 +1,263 @@
+"""
+Shortest-path planning of commands with A*.
+
+The robot's pose is a cell and a heading, and each action costs one: a step
+forward or backward along the heading, or a quarter turn. The search runs over a
+rectangle around the start and the target, whose obstacles are looked up once
+with `ObstacleMap.contains_many` and kept one byte per cell. Estimates, costs and
+the action that reached each pose are flat arrays indexed by `cell * 4 + heading`,
+and a blocked border around the rectangle spares bounds checks in the inner loop.
+The search gives up after PLAN_MAX_EXPANSIONS poses, which bounds its time.
+"""
+
+import heapq
+from array import array
+from functools import lru_cache
+from itertools import groupby
+from typing import List, Optional, Tuple
+
+import numpy as np
+from exceptions import NoPathFound
+from models import ActionTypes, Directions
+from obstacles import ObstacleMap, obstacle_map
+from robot import Robot
+from settings import (
+    PLAN_CACHE_SIZE,
+    PLAN_MARGIN,
+    PLAN_MAX_AREA,
+    PLAN_MAX_EXPANSIONS,
+)
+from simulation import HEADINGS
+
+# Action codes, in the order neighbours are expanded.
+ACTIONS = [
+    ActionTypes.MOVE_FORWARD.value,
+    ActionTypes.MOVE_BACKWARD.value,
+    ActionTypes.ROTATE_LEFT.value,
+    ActionTypes.ROTATE_RIGHT.value,
+]
+FORWARD, BACKWARD, LEFT, RIGHT = range(4)
+# Transitions taken from Robot, so plans always match how commands execute.
+LEFT_OF = [HEADINGS.index(Robot.LEFT_ROTATION[h]) for h in HEADINGS]
+RIGHT_OF = [HEADINGS.index(Robot.RIGHT_ROTATION[h]) for h in HEADINGS]
+FORWARD_STEPS = [
+    (Robot.MOVE_FORWARD[h]["x"], Robot.MOVE_FORWARD[h]["y"]) for h in HEADINGS
+]
+BACKWARD_STEPS = [
+    (Robot.MOVE_BACKWARD[h]["x"], Robot.MOVE_BACKWARD[h]["y"]) for h in HEADINGS
+]
+UNREACHED = 2**31 - 1
+
+
+def compress(actions: List[str]) -> str:
+    """
+    Writes a sequence of single actions with repeat counts, e.g. "F5R2F".
+    """
+    runs = ((action, len(list(group))) for action, group in groupby(actions))
+    return "".join(
+        f"{action}{count}" if count > 1 else action for action, count in runs
+    )
+
+
+def plan_path(
+    x: int,
+    y: int,
+    direction: Directions,
+    target_x: int,
+    target_y: int,
+    target_direction: Optional[Directions],
+    obstacle_map: ObstacleMap,
+    margin: int = PLAN_MARGIN,
+    max_area: int = PLAN_MAX_AREA,
+    max_expansions: int = PLAN_MAX_EXPANSIONS,
+) -> List[str]:
+    """
+    Finds a shortest sequence of single actions from a pose to a target.
+
+    The heuristic is the Manhattan distance plus one turn when the target is off
+    the axis of the current heading (or, on the target cell, the turns left to
+    face `target_direction`). It never overestimates, since backward steps make
+    both directions of an axis reachable without turning, so the plan is optimal.
+
+    Args:
+        x: The starting x coordinate.
+        y: The starting y coordinate.
+        direction: The starting direction.
+        target_x: The x coordinate to reach.
+        target_y: The y coordinate to reach.
+        target_direction: The direction to end in, or None for any.
+        obstacle_map: The obstacles to avoid.
+        margin: How far beyond the rectangle spanned by the start and the target
+            the search may go.
+        max_area: The largest number of cells to search.
+        max_expansions: The most poses to expand before giving up.
+
+    Returns:
+        list: The actions, one character per step, in order.
+
+    Raises:
+        NoPathFound: If the target is blocked, too far away, unreachable within
+            the search area, or the search budget ran out.
+    """
+    if (target_x, target_y) in obstacle_map:
+        raise NoPathFound(f"Target ({target_x}, {target_y}) is an obstacle.")
+
+    # One extra cell on each side for the blocked border.
+    x0 = min(x, target_x) - margin - 1
+    y0 = min(y, target_y) - margin - 1
+    width = abs(x - target_x) + 2 * margin + 3
+    height = abs(y - target_y) + 2 * margin + 3
+    if width * height > max_area:
+        raise NoPathFound(f"Target ({target_x}, {target_y}) is too far away.")
+
+    xs = np.tile(np.arange(x0, x0 + width, dtype=np.int64), height)
+    ys = np.repeat(np.arange(y0, y0 + height, dtype=np.int64), width)
+    grid = obstacle_map.contains_many(xs, ys).reshape(height, width)
+    grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = True
+    blocked = grid.tobytes()
+
+    forward = [dx + dy * width for dx, dy in FORWARD_STEPS]
+    backward = [dx + dy * width for dx, dy in BACKWARD_STEPS]
+    goal_cell = (target_y - y0) * width + (target_x - x0)
+    goal_heading = (
+        None if target_direction is None else HEADINGS.index(target_direction)
+    )
+
+    # The estimate of every pose, computed up front so the loop only indexes it.
+    dx = np.abs(xs - target_x)
+    dy = np.abs(ys - target_y)
+    estimates = np.empty((width * height, 4), dtype=np.int32)
+    for heading, (step_x, _step_y) in enumerate(FORWARD_STEPS):
+        off_axis = dy if step_x else dx
+        estimates[:, heading] = dx + dy + (off_axis != 0)
+    if goal_heading is not None:
+        turns = (goal_heading - np.arange(4)) % 4
+        estimates[goal_cell] = np.minimum(turns, 4 - turns)
+    estimates = array("i", estimates.tobytes())
+
+    # Open set entries are single ints ordered by estimate, then by highest cost
+    # (deepest pose first), then by pose, which compare faster than tuples.
+    poses = width * height * 4
+    bits = poses.bit_length()
+    mask = (1 << bits) - 1
+    costs = array("i", [UNREACHED]) * poses
+    reached_by = bytearray(poses)
+    start = ((y - y0) * width + (x - x0)) * 4 + HEADINGS.index(direction)
+    costs[start] = 0
+    open_set = [(estimates[start] << bits | mask) << bits | start]
+    heappop, heappush = heapq.heappop, heapq.heappush
+    expansions = 0
+
+    while open_set:
+        entry = heappop(open_set)
+        pose = entry & mask
+        cost = mask - (entry >> bits & mask)
+        if cost > costs[pose]:
+            continue
+        cell, heading = pose >> 2, pose & 3
+        if cell == goal_cell and (goal_heading is None or heading == goal_heading):
+            break
+
+        expansions += 1
+        if expansions > max_expansions:
+            raise NoPathFound(
+                f"No path to ({target_x}, {target_y}) found within the search budget."
+            )
+
+        cost += 1
+        depth = mask - cost
+        for action, next_cell, next_heading in (
+            (FORWARD, cell + forward[heading], heading),
+            (BACKWARD, cell + backward[heading], heading),
+            (LEFT, cell, LEFT_OF[heading]),
+            (RIGHT, cell, RIGHT_OF[heading]),
+        ):
+            if action < LEFT and blocked[next_cell]:
+                continue
+            next_pose = next_cell << 2 | next_heading
+            if cost < costs[next_pose]:
+                costs[next_pose] = cost
+                reached_by[next_pose] = action
+                f = cost + estimates[next_pose]
+                heappush(open_set, (f << bits | depth) << bits | next_pose)
+    else:
+        raise NoPathFound(f"Target ({target_x}, {target_y}) is unreachable.")
+
+    actions = []
+    while pose != start:
+        action = reached_by[pose]
+        actions.append(ACTIONS[action])
+        cell, heading = pose >> 2, pose & 3
+        if action == FORWARD:
+            cell -= forward[heading]
+        elif action == BACKWARD:
+            cell -= backward[heading]
+        elif action == LEFT:
+            heading = RIGHT_OF[heading]
+        else:
+            heading = LEFT_OF[heading]
+        pose = cell << 2 | heading
+    actions.reverse()
+    return actions
+
+
+def plan_command(
+    x: int,
+    y: int,
+    direction: Directions,
+    target_x: int,
+    target_y: int,
+    target_direction: Optional[Directions],
+    obstacle_map: ObstacleMap,
+) -> Tuple[str, int]:
+    """
+    Plans a shortest command from a pose to a target, see `plan_path`.
+
+    Returns:
+        tuple: (command string with repeat counts, number of single actions).
+    """
+    actions = plan_path(
+        x, y, direction, target_x, target_y, target_direction, obstacle_map
+    )
+    return compress(actions), len(actions)
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _cached_detour(
+    x: int,
+    y: int,
+    direction: Directions,
+    target_x: int,
+    target_y: int,
+    target_direction: Directions,
+    _version: int,
+) -> Optional[str]:
+    try:
+        actions = plan_path(
+            x, y, direction, target_x, target_y, target_direction, obstacle_map
+        )
+    except NoPathFound:
+        return None
+    return compress(actions)
+
+
+def plan_detour(
+    x: int,
+    y: int,
+    direction: Directions,
+    target_x: int,
+    target_y: int,
+    target_direction: Directions,
+) -> Optional[str]:
+    """
+    Plans a shortest command between two poses around the current obstacle map.
+
+    Robots repeating a pattern hit the same obstacle from the same pose, so plans
+    are cached, failed ones included, until the obstacle map is reloaded.
+
+    Returns:
+        str: The command, or None if there is no path.
+    """
+    return _cached_detour(
+        x, y, direction, target_x, target_y, target_direction, obstacle_map.version
+    )
@@ -1,10 +1,21 @@
-from exceptions import ObstacleDetected, UnknownAction
+from typing import Optional, Tuple
+
+from exceptions import ObstacleDetected, RobotError, UnknownAction
 from models import Action, ActionTypes, Directions
-from settings import OBSTACLES
+from obstacles import obstacle_map
+from simulation import HEADINGS
+
+# Robots keep their heading as an index into HEADINGS, and actions are encoded as
+# indices into ACTIONS, so execution never hashes or compares enums per step.
+ACTIONS = list(ActionTypes)
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+HEADING_CODES = {direction: heading for heading, direction in enumerate(HEADINGS)}
 
 
 class Robot:
 
+    __slots__ = ("_x", "_y", "_heading")
+
     LEFT_ROTATION = {
         Directions.NORTH: Directions.WEST,
         Directions.SOUTH: Directions.EAST,
@@ -33,7 +44,7 @@ class Robot:
     def __init__(self, x_coord: int, y_coord: int, direction: Directions):
         self._x = x_coord
         self._y = y_coord
-        self._direction = direction
+        self._heading = HEADING_CODES[direction]
 
     @property
     def x(self):
@@ -45,26 +56,136 @@ class Robot:
 
     @property
     def direction(self):
-        return self._direction
+        return HEADINGS[self._heading]
+
+    def _execute(self, code: int, count: int) -> int:
+        """
+        Executes an encoded action `count` times.
+
+        Returns:
+            int: The number of steps that succeeded, less than `count` if a move
+            stopped at the last free cell before an obstacle.
+        """
+        heading = self._heading
+        dx, dy, turned = TRANSITIONS[heading << 2 | code]
+        if turned != heading or not (dx or dy):
+            for _ in range(count % 4):
+                heading = TRANSITIONS[heading << 2 | code][2]
+            self._heading = heading
+            return count
 
-    def _move_robot(self, changes):
-        x = self._x + changes["x"]
-        y = self._y + changes["y"]
-        if (x, y) in OBSTACLES:
-            raise ObstacleDetected(f"Obstacle detected: ({x}, {y})")
-        self._x = x
-        self._y = y
+        x, y = self._x, self._y
+        for step in range(count):
+            x += dx
+            y += dy
+            if (x, y) in obstacle_map:
+                self._x, self._y = x - dx, y - dy
+                return step
+        self._x, self._y = x, y
+        return count
 
     def process_action(self, action: Action):
-        if action.type == ActionTypes.ROTATE_LEFT:
-            self._direction = self.LEFT_ROTATION[self._direction]
-        elif action.type == ActionTypes.ROTATE_RIGHT:
-            self._direction = self.RIGHT_ROTATION[self._direction]
-        elif action.type == ActionTypes.MOVE_FORWARD:
-            changes = self.MOVE_FORWARD[self._direction]
-            self._move_robot(changes)
-        elif action.type == ActionTypes.MOVE_BACKWARD:
-            changes = self.MOVE_BACKWARD[self._direction]
-            self._move_robot(changes)
-        else:
+        """
+        Executes an Action, repeating it `action.count` times.
+
+        A run of moves stops at the last free cell before an obstacle; the raised
+        ObstacleDetected reports how many steps of the run succeeded.
+        """
+        code = ACTION_CODES.get(action.type)
+        if code is None:
             raise UnknownAction(f"Unknown action: {action.type}.")
+        steps = self._execute(code, action.count)
+        if steps < action.count:
+            dx, dy, _heading = TRANSITIONS[self._heading << 2 | code]
+            x, y = self._x + dx, self._y + dy
+            raise ObstacleDetected(f"Obstacle detected: ({x}, {y})", steps=steps)
+
+    def simulate(self, actions):
+        """
+        Executes a sequence of Actions in memory, stopping at the first failure.
+
+        Args:
+            actions: The Actions to execute, in order.
+
+        Returns:
+            tuple: (poses, error) where poses holds the (x, y, direction) of the robot
+            after each processed Action and error is the RobotError that stopped the
+            sequence, or None. When error is set, the last pose belongs to the failed
+            Action, i.e. the failure index is `len(poses) - 1`.
+        """
+        poses = []
+        for action in actions:
+            try:
+                self.process_action(action)
+            except RobotError as e:
+                poses.append((self._x, self._y, HEADINGS[self._heading]))
+                return poses, e
+            poses.append((self._x, self._y, HEADINGS[self._heading]))
+        return poses, None
+
+    def execute_many(self, actions) -> Tuple[int, int, Directions, Optional[int]]:
+        """
+        Executes a sequence of Actions, stopping at the first failure.
+
+        Unlike `simulate`, no pose is kept per Action and failures are not raised,
+        so the whole sequence runs in one loop over the transition table.
+
+        Args:
+            actions: The Actions to execute, in order.
+
+        Returns:
+            tuple: (x, y, direction, failure) with the final pose of the robot and
+            the index of the Action that hit an obstacle or was unknown, or None.
+        """
+        codes = ACTION_CODES
+        transitions = TRANSITIONS
+        blocked = obstacle_map
+        x, y, heading = self._x, self._y, self._heading
+        failure = None
+        for index, action in enumerate(actions):
+            code = codes.get(action.type)
+            if code is None:
+                failure = index
+                break
+            dx, dy, turned = transitions[heading << 2 | code]
+            if turned != heading or not (dx or dy):
+                for _ in range(action.count % 4):
+                    heading = transitions[heading << 2 | code][2]
+                continue
+            for _ in range(action.count):
+                x += dx
+                y += dy
+                if (x, y) in blocked:
+                    x -= dx
+                    y -= dy
+                    failure = index
+                    break
+            if failure is not None:
+                break
+
+        self._x, self._y, self._heading = x, y, heading
+        return x, y, HEADINGS[heading], failure
+
+
+def _transitions() -> Tuple[Tuple[int, int, int], ...]:
+    # Indexed by `heading << 2 | action code`, built from the tables of Robot.
+    steps = {
+        ActionTypes.MOVE_FORWARD: Robot.MOVE_FORWARD,
+        ActionTypes.MOVE_BACKWARD: Robot.MOVE_BACKWARD,
+    }
+    turns = {
+        ActionTypes.ROTATE_LEFT: Robot.LEFT_ROTATION,
+        ActionTypes.ROTATE_RIGHT: Robot.RIGHT_ROTATION,
+    }
+    table = []
+    for heading, direction in enumerate(HEADINGS):
+        for action in ACTIONS:
+            if action in steps:
+                step = steps[action][direction]
+                table.append((step["x"], step["y"], heading))
+            else:
+                table.append((0, 0, HEADING_CODES[turns[action][direction]]))
+    return tuple(table)
+
+
+TRANSITIONS = _transitions()
@@ -1,159 +1,1079 @@
 import asyncio
+import contextvars
 import datetime
 import logging
+import time
+from itertools import groupby, islice
+from operator import itemgetter
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID, uuid4
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from database import async_sessionmaker
-from exceptions import RobotError
-from models import Action, ActionTypes, Command, Statuses
+from archive import (
+    archive_commands,
+    maintain_partitions,
+    pack_trajectory,
+    store_trajectories,
+)
+from database import advisory_lock, async_sessionmaker
+from exceptions import InvalidCommand, ObstacleDetected, RobotError
+from grammar import command_runs, validate_command
+from metrics import Counter, Gauge, Histogram, serve_metrics
+from models import Action, ActionTypes, Command, Directions, Statuses
+from notifications import listen
+from obstacles import obstacle_map, reload_obstacles
+from planner import plan_detour
 from robot import Robot
-from sqlalchemy import asc, select, update
-from utils import get_current_position
+from settings import (
+    ARCHIVE_INTERVAL,
+    COMMANDS_CHANNEL,
+    COMPACT_ACTIONS,
+    EXECUTION_CHUNK_SIZE,
+    EXECUTION_MODE,
+    EXECUTION_MODES,
+    EXECUTOR_CONCURRENCY,
+    EXECUTOR_LOCK_ID,
+    METRICS_HOST,
+    METRICS_PORT,
+    OBSTACLE_RECOVERY,
+    OBSTACLES_RELOAD_INTERVAL,
+    PARSE_BATCH_SIZE,
+    PARSE_INSERT_CHUNK_SIZE,
+    REQUEST_ID,
+    SWEEP_INTERVAL,
+)
+from sqlalchemy import asc, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils import get_current_position, save_robot_state
 
 logger = logging.getLogger("worker_logger")
 
+# Request IDs listed in the log records of a pipeline run, the rest are counted
+MAX_LOGGED_REQUEST_IDS = 3
 
-async def process_actions():
+PARSE_DURATION = Histogram(
+    "scheduler_parse_commands_duration_seconds", "Duration of parse_commands runs."
+)
+PROCESS_DURATION = Histogram(
+    "scheduler_process_actions_duration_seconds",
+    "Duration of the execution of a robot's queue.",
+    ["mode"],
+)
+ACTION_DURATION = Histogram(
+    "scheduler_action_duration_seconds",
+    "Execution latency of a single action, commits included.",
+    ["mode"],
+)
+QUEUE_DEPTH = Gauge(
+    "scheduler_queue_depth", "Rows of a queue table by status.", ["table", "status"]
+)
+OBSTACLES = Counter(
+    "scheduler_obstacles_total", "Actions stopped by an obstacle.", ["robot_id"]
+)
+WITHDRAWALS = Counter(
+    "scheduler_withdrawals_total",
+    "Times the queue of a robot was withdrawn after a failure.",
+    ["robot_id"],
+)
+DETOURS = Counter(
+    "scheduler_detours_total",
+    "Detours planned around an obstacle instead of withdrawing a queue.",
+    ["robot_id"],
+)
+QUARANTINED = Counter(
+    "scheduler_quarantined_commands_total", "Commands that failed validation."
+)
+
+
+def _queued_actions_query(robot_id: str, *entities):
+    """
+    Builds the query selecting a robot's executable QUEUED Actions in execution order.
+
+    With several parsing workers, a newer Command can be parsed before an older one
+    that another worker is still parsing. Actions are therefore only executable
+    once every older Command of the robot has been parsed, i.e. when their Command
+    was created before the robot's oldest Command that is still QUEUED.
+
+    Actions are ordered by the creation and position of their Command, i.e.
+    submission order, then by their own creation, i.e. their position in the
+    Command. Their own creation time is taken at parse time, so it alone would let
+    a Command parsed early by one worker overtake an older one. The creation and
+    position of the Command are copied to each Action when parsing, so the query is
+    served in this order by the partial index on QUEUED Actions without joining the
+    Commands.
+
+    Args:
+        robot_id: The ID of the robot.
+        entities: The entities or columns to select.
+
+    Returns:
+        Select: The query.
+    """
+    oldest_queued = (
+        select(func.min(Command.created))
+        .where(Command.robot_id == robot_id, Command.status == Statuses.QUEUED)
+        .correlate(None)
+        .scalar_subquery()
+    )
+    return (
+        select(*entities)
+        .where(
+            Action.robot_id == robot_id,
+            Action.status == Statuses.QUEUED,
+            Action.command_created
+            < func.coalesce(oldest_queued, datetime.datetime.max),
+        )
+        .order_by(
+            asc(Action.command_created),
+            asc(Action.command_position),
+            asc(Action.created),
+            asc(Action.id),
+        )
+    )
+
+
+def _rejoin_pose(robot: Robot, actions, error: ObstacleDetected):
+    """
+    Finds where a detour around an obstacle should rejoin a robot's queue.
+
+    The poses the queue would have led to without the obstacle are followed, from
+    the blocked Action on, until one of them is free.
+
+    Args:
+        robot: The robot, stopped in front of the obstacle.
+        actions: The blocked Action followed by the Actions queued after it.
+        error: The ObstacleDetected raised by the blocked Action.
+
+    Returns:
+        tuple: (number of Actions the detour replaces, x, y, direction), or None if
+        none of the poses is free.
+    """
+    x, y, direction = robot.x, robot.y, robot.direction
+    count = actions[0].count - error.steps
+    for replaced, action in enumerate(actions, 1):
+        if action.type == ActionTypes.MOVE_FORWARD:
+            x += Robot.MOVE_FORWARD[direction]["x"] * count
+            y += Robot.MOVE_FORWARD[direction]["y"] * count
+        elif action.type == ActionTypes.MOVE_BACKWARD:
+            x += Robot.MOVE_BACKWARD[direction]["x"] * count
+            y += Robot.MOVE_BACKWARD[direction]["y"] * count
+        else:
+            rotation = (
+                Robot.LEFT_ROTATION
+                if action.type == ActionTypes.ROTATE_LEFT
+                else Robot.RIGHT_ROTATION
+            )
+            for _ in range(count % 4):
+                direction = rotation[direction]
+        if (x, y) not in obstacle_map:
+            return replaced, x, y, direction
+        if replaced < len(actions):
+            count = actions[replaced].count
+    return None
+
+
+async def _plan_detour(robot_id: str, robot: Robot, actions, error: RobotError):
+    """
+    Plans a detour around the obstacle that stopped a robot, if recovery is enabled.
+
+    Args:
+        robot_id: The ID of the robot.
+        robot: The robot, stopped in front of the obstacle.
+        actions: The blocked Action followed by the Actions queued after it.
+        error: The RobotError raised by the blocked Action.
+
+    Returns:
+        tuple: (number of Actions the detour replaces, command string), or None if
+        recovery is disabled or there is no way around the obstacle.
+    """
+    if OBSTACLE_RECOVERY != "replan" or not isinstance(error, ObstacleDetected):
+        return None
+
+    rejoin = _rejoin_pose(robot, actions, error)
+    if rejoin is None:
+        logger.warning(f"Robot {robot_id} cannot rejoin its queue past the obstacle.")
+        return None
+    replaced, x, y, direction = rejoin
+    # Planning is CPU-bound, so it must not stall the other robots' executors.
+    path = await asyncio.to_thread(
+        plan_detour, robot.x, robot.y, robot.direction, x, y, direction
+    )
+    if path is None:
+        logger.warning(f"No detour to ({x}, {y}) found for robot {robot_id}.")
+        return None
+
+    DETOURS.inc(robot_id)
+    logger.info(
+        f"Robot {robot_id} takes detour {path} to ({x}, {y}), replacing "
+        f"{replaced} actions."
+    )
+    return replaced, path
+
+
+def _skipped_pose(action, blocked, stop: Tuple[int, int, Directions], robot: Robot):
+    """
+    Chooses the pose recorded for an Action skipped by a detour.
+
+    Trajectories list the detour after the blocked Command, so the skipped Actions
+    of that Command keep the pose the robot stopped at, and those of later
+    Commands take the pose the detour rejoined the queue at.
+
+    Args:
+        action: The skipped Action.
+        blocked: The blocked Action.
+        stop: The (x, y, direction) the robot stopped at before the detour.
+        robot: The robot, after the detour.
+
+    Returns:
+        tuple: (x, y, direction).
+    """
+    if action.command_id == blocked.command_id:
+        return stop
+    return robot.x, robot.y, robot.direction
+
+
+async def _record_detour(
+    async_session: AsyncSession,
+    robot_id: str,
+    robot: Robot,
+    path: str,
+    blocked_command_id: UUID,
+) -> Optional[RobotError]:
+    """
+    Executes a detour and stores it as a parsed Command with executed Actions and
+    its trajectory.
+
+    Commands are listed in trajectories by creation time, then by position, so the
+    detour shares the creation time of the blocked Command rather than taking the
+    execution time. Its position, assigned on insert, puts it after the blocked
+    Command and before any Command created later.
+
+    Args:
+        async_session: The asynchronous SQLAlchemy session for database access.
+        robot_id: The ID of the robot.
+        robot: The robot, stopped in front of the obstacle.
+        path: The command string of the detour.
+        blocked_command_id: The ID of the Command of the blocked Action.
+
+    Returns:
+        RobotError: The error that stopped the detour, or None.
+    """
+    if not path:
+        return None
+
+    step = datetime.timedelta(microseconds=1)
+    query = select(Command.created).where(Command.id == blocked_command_id)
+    created = await async_session.scalar(query)
+    now = datetime.datetime.now()
+    command = SimpleNamespace(
+        id=uuid4(), robot_id=robot_id, command=path, created=created, position=None
+    )
+    rows = list(_action_rows([command], now, COMPACT_ACTIONS))
+    poses, error = robot.simulate([SimpleNamespace(**row) for row in rows])
+    rows = rows[: len(poses)]
+    updated = now
+    for row, (x, y, direction) in zip(rows, poses):
+        row.update(
+            status=Statuses.COMPLETED,
+            x_coord=x,
+            y_coord=y,
+            direction=direction,
+            updated=updated,
+        )
+        updated += step
+    if error:
+        rows[-1]["status"] = Statuses.FAILED
+
+    query = insert(Command).values(
+        id=command.id,
+        robot_id=robot_id,
+        command=path,
+        status=Statuses.COMPLETED,
+        created=created,
+        trajectory=pack_trajectory([SimpleNamespace(**row) for row in rows]).tobytes(),
+    )
+    await async_session.execute(query)
+    await async_session.execute(insert(Action), rows)
+    return error
+
+
+async def _process_actions_durable(
+    async_session: AsyncSession, robot_id: str, robot: Robot
+):
     """
-    Processes all queued Actions by executing their commands sequentially.
+    Executes a robot's queued Actions one by one, committing every step.
 
-    The function retrieves the robot's current position, then selects all Actions
-    with status QUEUED, ordered by creation time. For each Action:
+    Actions are loaded EXECUTION_CHUNK_SIZE at a time and expunged from the session
+    once executed, so memory does not grow with the length of the queue. For each
+    Action:
       - Sets its status to RUNNING and commits.
       - Attempts to process the command using the Robot instance.
       - If processing fails with a RobotError, marks the Action as FAILED, updates
         the robot's position in the Action, and raises the error.
-      - If processing succeeds, marks the Action as COMPLETED and updates its position.
+      - Unless OBSTACLE_RECOVERY is "replan" and the error is an ObstacleDetected:
+        then the robot takes a detour to the first free pose its queue would have
+        reached, and the Actions the detour replaces are marked COMPLETED with the
+        steps they made.
+      - If processing succeeds, marks the Action as COMPLETED, updates its position
+        and commits.
 
-    If any RobotError occurs during processing, all remaining QUEUED Actions and Commands
-    are marked as WITHDRAWN, and the changes are committed.
+    The robot_state row is updated in the same transactions as the Action. The
+    transaction of the last Action of a Command also stores the Command's
+    trajectory, and so does the one of a failing Action.
+
+    Args:
+        async_session: The asynchronous SQLAlchemy session for database access.
+        robot_id: The ID of the robot.
+        robot: The robot positioned at its current pose.
 
     Returns:
         None
     """
-    logger.info("Starting processing of queued actions.")
-
-    async with async_sessionmaker() as async_session:
-        x, y, direction, _, _ = await get_current_position(async_session)
-        robot = Robot(x_coord=x, y_coord=y, direction=direction)
-
-        query = (
-            select(Action)
-            .where(Action.status == Statuses.QUEUED)
-            .order_by(asc(Action.created))
-        )
+    while True:
+        # One Action more than executed tells whether the last one ends its Command.
+        query = _queued_actions_query(robot_id, Action).limit(EXECUTION_CHUNK_SIZE + 1)
         result = await async_session.execute(query)
-        actions = result.scalars()
+        actions = result.scalars().all()
+        if not actions:
+            break
+        following = [a.command_id for a in actions[1:]] + [None]
+        actions = actions[:EXECUTION_CHUNK_SIZE]
+        ends = [a.command_id != command_id for a, command_id in zip(actions, following)]
 
-        try:
-            for action in actions:
-                action.status = Statuses.RUNNING
-                await async_session.commit()
+        resume = 0
+        for index, action in enumerate(actions):
+            if index < resume:
+                continue
+            started = time.perf_counter()
+            action.status = Statuses.RUNNING
+            await save_robot_state(
+                async_session,
+                robot_id,
+                robot.x,
+                robot.y,
+                robot.direction,
+                Statuses.RUNNING,
+                action.command_id,
+            )
+            await async_session.commit()
 
-                try:
-                    robot.process_action(action)
-                except RobotError as e:
-                    logger.error(f"{type(e)} while processing action ID {action.id}")
+            try:
+                robot.process_action(action)
+            except RobotError as e:
+                logger.error(f"{type(e)} while processing action ID {action.id}")
+                if isinstance(e, ObstacleDetected):
+                    OBSTACLES.inc(robot_id)
+                    logger.error(
+                        f"{e.steps} of {action.count} steps of action ID "
+                        f"{action.id} succeeded."
+                    )
+                detour = await _plan_detour(robot_id, robot, actions[index:], e)
+                if detour is None:
                     action.status = Statuses.FAILED
                     action.x_coord = robot.x
                     action.y_coord = robot.y
                     action.direction = robot.direction
+                    await save_robot_state(
+                        async_session,
+                        robot_id,
+                        robot.x,
+                        robot.y,
+                        robot.direction,
+                        Statuses.FAILED,
+                        action.command_id,
+                    )
+                    await store_trajectories(async_session, [action.command_id])
                     raise e
-                else:
-                    action.status = Statuses.COMPLETED
-                    action.x_coord = robot.x
-                    action.y_coord = robot.y
-                    action.direction = robot.direction
-                    await async_session.commit()
 
-                    logger.info(
-                        f"Action ID {action.id} completed successfully. Updated robot position."
+                # The blocked Action made e.steps steps, the others it replaces none.
+                replaced, path = detour
+                stop = robot.x, robot.y, robot.direction
+                error = await _record_detour(
+                    async_session, robot_id, robot, path, action.command_id
+                )
+                for skipped in actions[index : index + replaced]:
+                    skipped.status = Statuses.COMPLETED
+                    skipped.count = 0
+                    skipped.x_coord, skipped.y_coord, skipped.direction = _skipped_pose(
+                        skipped, action, stop, robot
                     )
-        except RobotError:
-            logger.warning(
-                "RobotError occurred, withdrawing remaining queued actions and commands."
-            )
-            query = (
-                update(Action)
-                .where(Action.status == Statuses.QUEUED)
-                .values(status=Statuses.WITHDRAWN)
+                action.count = e.steps
+                resume = index + replaced
+
+                await save_robot_state(
+                    async_session,
+                    robot_id,
+                    robot.x,
+                    robot.y,
+                    robot.direction,
+                    Statuses.FAILED if error else Statuses.COMPLETED,
+                    action.command_id,
+                )
+                # A failed detour withdraws the rest of the queue, which finishes
+                # every Command it touched.
+                finished = [
+                    skipped.command_id
+                    for skipped, end in zip(actions[index:resume], ends[index:resume])
+                    if end or error
+                ]
+                await store_trajectories(async_session, list(dict.fromkeys(finished)))
+                if error:
+                    raise error
+                await async_session.commit()
+            else:
+                action.status = Statuses.COMPLETED
+                action.x_coord = robot.x
+                action.y_coord = robot.y
+                action.direction = robot.direction
+                await save_robot_state(
+                    async_session,
+                    robot_id,
+                    robot.x,
+                    robot.y,
+                    robot.direction,
+                    Statuses.COMPLETED,
+                    action.command_id,
+                )
+                if ends[index]:
+                    await store_trajectories(async_session, [action.command_id])
+                await async_session.commit()
+                ACTION_DURATION.observe(time.perf_counter() - started, "durable")
+
+                logger.info(
+                    f"Action ID {action.id} completed successfully. "
+                    f"Updated robot position."
+                )
+
+        # Executed Actions are not needed anymore, don't keep them in the session.
+        async_session.expunge_all()
+
+
+async def _process_actions_batched(
+    async_session: AsyncSession, robot_id: str, robot: Robot
+):
+    """
+    Executes a robot's queued Actions in memory and persists the results in bulk.
+
+    The queue is read through a server-side cursor, EXECUTION_CHUNK_SIZE rows at a
+    time, so memory does not grow with its length. The robot is simulated over each
+    chunk, stopping at the first failing Action, and the statuses and positions of
+    the processed Actions are written back with one bulk UPDATE by primary key per
+    chunk. The final pose is stored in the robot_state row, the trajectories of
+    the executed Commands in their rows, and everything is committed in a single
+    transaction. `updated` timestamps are assigned explicitly and strictly increase
+    in execution order.
+
+    If an Action failed, the error is raised after the bulk UPDATE so that the
+    caller withdraws the rest of the queue in the same transaction; otherwise
+    the results are committed. With OBSTACLE_RECOVERY set to "replan", an Action
+    stopped by an obstacle is first bypassed with a detour, as in durable mode,
+    and the simulation resumes after the Actions the detour replaces.
+
+    Args:
+        async_session: The asynchronous SQLAlchemy session for database access.
+        robot_id: The ID of the robot.
+        robot: The robot positioned at its current pose.
+
+    Returns:
+        None
+    """
+    query = _queued_actions_query(
+        robot_id,
+        Action.id,
+        Action.created,
+        Action.command_id,
+        Action.type,
+        Action.count,
+    ).execution_options(yield_per=EXECUTION_CHUNK_SIZE)
+    result = await async_session.stream(query)
+
+    updated = datetime.datetime.now()
+    step = datetime.timedelta(microseconds=1)
+    processed = 0
+    last = None
+    error = None
+    finished = {}
+    async for actions in result.partitions():
+        started = time.perf_counter()
+        rows = []
+        pending = actions
+        while pending:
+            poses, error = robot.simulate(pending)
+            for action, (x, y, direction) in zip(pending, poses):
+                rows.append(
+                    {
+                        "id": action.id,
+                        "created": action.created,
+                        "count": action.count,
+                        "status": Statuses.COMPLETED,
+                        "x_coord": x,
+                        "y_coord": y,
+                        "direction": direction,
+                        "updated": updated,
+                    }
+                )
+                updated += step
+            if not error:
+                break
+
+            failed = pending[len(poses) - 1]
+            logger.error(f"{type(error)} while processing action ID {failed.id}")
+            if isinstance(error, ObstacleDetected):
+                OBSTACLES.inc(robot_id)
+                logger.error(
+                    f"{error.steps} of {failed.count} steps of action ID "
+                    f"{failed.id} succeeded."
+                )
+            blocked = pending[len(poses) - 1 :]
+            detour = await _plan_detour(robot_id, robot, blocked, error)
+            if detour is None:
+                rows[-1]["status"] = Statuses.FAILED
+                break
+
+            # The blocked Action made error.steps steps, the others it replaces none.
+            replaced, path = detour
+            rows[-1]["count"] = error.steps
+            stop = robot.x, robot.y, robot.direction
+            error = await _record_detour(
+                async_session, robot_id, robot, path, failed.command_id
             )
-            await async_session.execute(query)
+            for action in blocked[1:replaced]:
+                x, y, direction = _skipped_pose(action, failed, stop, robot)
+                rows.append(
+                    {
+                        "id": action.id,
+                        "created": action.created,
+                        "count": 0,
+                        "status": Statuses.COMPLETED,
+                        "x_coord": x,
+                        "y_coord": y,
+                        "direction": direction,
+                        "updated": updated,
+                    }
+                )
+                updated += step
+            if error:
+                break
+            pending = blocked[replaced:]
 
-            query = (
-                update(Command)
-                .where(Command.status == Statuses.QUEUED)
-                .values(status=Statuses.WITHDRAWN)
+        await async_session.execute(update(Action), rows)
+        elapsed = time.perf_counter() - started
+        ACTION_DURATION.observe(elapsed / len(rows), "batched", count=len(rows))
+        processed += len(rows)
+        last = rows[-1]["status"], actions[len(rows) - 1].command_id
+        finished.update(dict.fromkeys(a.command_id for a in actions[: len(rows)]))
+        if error:
+            break
+    await result.close()
+
+    if last is None:
+        return
+
+    # The queue was executed to its end or is withdrawn, so every Command it
+    # touched is finished.
+    await store_trajectories(async_session, list(finished))
+
+    status, command_id = last
+    await save_robot_state(
+        async_session,
+        robot_id,
+        robot.x,
+        robot.y,
+        robot.direction,
+        Statuses.FAILED if error else status,
+        command_id,
+    )
+    logger.info(f"{processed} actions processed in batch. Updated robot position.")
+
+    if error:
+        raise error
+
+    await async_session.commit()
+
+
+async def _withdraw_queued(async_session: AsyncSession, robot_id: str):
+    """
+    Marks a robot's remaining QUEUED Actions and Commands as WITHDRAWN and commits.
+
+    Args:
+        async_session: The asynchronous SQLAlchemy session for database access.
+        robot_id: The ID of the robot.
+
+    Returns:
+        None
+    """
+    query = (
+        update(Action)
+        .where(Action.robot_id == robot_id, Action.status == Statuses.QUEUED)
+        .values(status=Statuses.WITHDRAWN)
+    )
+    await async_session.execute(query)
+
+    query = (
+        update(Command)
+        .where(Command.robot_id == robot_id, Command.status == Statuses.QUEUED)
+        .values(status=Statuses.WITHDRAWN)
+    )
+    await async_session.execute(query)
+
+    await async_session.commit()
+
+
+async def _process_robot_actions(robot_id: str, mode: str):
+    """
+    Executes the queued Actions of a single robot.
+
+    Only one worker executes a robot's actions at a time, across all processes:
+    the function returns immediately if another worker holds the robot's executor
+    advisory lock.
+
+    If any RobotError occurs during processing, all of the robot's remaining QUEUED
+    Actions and Commands are marked as WITHDRAWN; other robots are not affected.
+    With OBSTACLE_RECOVERY set to "replan", obstacles only lead to a withdrawal
+    when no detour around them exists.
+
+    Args:
+        robot_id: The ID of the robot.
+        mode: The execution mode, "durable" or "batched".
+
+    Returns:
+        None
+    """
+    async with advisory_lock(EXECUTOR_LOCK_ID, func.hashtext(robot_id)) as acquired:
+        if not acquired:
+            logger.info(f"Another worker is executing robot {robot_id}, skipping.")
+            return
+
+        async with async_sessionmaker() as async_session:
+            x, y, direction, _, _ = await get_current_position(async_session, robot_id)
+            robot = Robot(x_coord=x, y_coord=y, direction=direction)
+
+            try:
+                if mode == "batched":
+                    await _process_actions_batched(async_session, robot_id, robot)
+                else:
+                    await _process_actions_durable(async_session, robot_id, robot)
+            except RobotError:
+                WITHDRAWALS.inc(robot_id)
+                logger.warning(
+                    f"RobotError occurred, withdrawing remaining queued actions "
+                    f"and commands of robot {robot_id}."
+                )
+                await _withdraw_queued(async_session, robot_id)
+                logger.info(
+                    f"All remaining queued actions and commands of robot {robot_id} "
+                    f"marked as WITHDRAWN."
+                )
+
+
+async def _queued_robot_ids(async_session: AsyncSession) -> List[str]:
+    query = select(Action.robot_id).where(Action.status == Statuses.QUEUED)
+    result = await async_session.execute(query.distinct())
+    return result.scalars().all()
+
+
+async def process_actions(mode: Optional[str] = None):
+    """
+    Processes the queued Actions of every robot of the fleet once.
+
+    Robots with QUEUED Actions are executed concurrently, at most
+    EXECUTOR_CONCURRENCY at a time. Each robot's Actions are executed
+    sequentially, ordered by creation time, in one of two modes:
+      - "durable": every Action is marked RUNNING and then COMPLETED or FAILED with
+        its own commits, so progress survives a crash mid-queue.
+      - "batched": the whole queue is executed in memory and the results are
+        written back with bulk UPDATE statements.
+
+    The scheduler runs RobotExecutors instead; this one-shot run serves the
+    benchmarks, which time the execution of a whole backlog.
+
+    Args:
+        mode: The execution mode, "durable" or "batched". Defaults to EXECUTION_MODE.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    mode = mode or EXECUTION_MODE
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode {mode!r}.")
+
+    async with async_sessionmaker() as async_session:
+        robot_ids = await _queued_robot_ids(async_session)
+
+    if not robot_ids:
+        return
+
+    logger.info(
+        f"Starting processing of queued actions of {len(robot_ids)} robots "
+        f"({mode} mode)."
+    )
+    semaphore = asyncio.Semaphore(EXECUTOR_CONCURRENCY)
+
+    async def process(robot_id: str):
+        async with semaphore:
+            try:
+                with PROCESS_DURATION.time(mode):
+                    await _process_robot_actions(robot_id, mode)
+            except Exception:
+                logger.exception(f"Processing actions of robot {robot_id} failed.")
+
+    await asyncio.gather(*(process(robot_id) for robot_id in robot_ids))
+    logger.info("Completed processing of queued actions.")
+
+
+class RobotExecutors:
+    """
+    Runs one long-lived executor task per robot of the fleet.
+
+    Every robot has its own wake-up event, so a robot with a long queue only delays
+    itself: the other robots and the parsing of new Commands carry on meanwhile.
+    Tasks are started on the first wake-up of their robot. Wake-ups arriving while
+    a robot's queue is being executed are coalesced into a single follow-up run.
+    At most EXECUTOR_CONCURRENCY robots are executed at a time.
+
+    Args:
+        mode: The execution mode, "durable" or "batched". Defaults to EXECUTION_MODE.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+
+    def __init__(self, mode: Optional[str] = None):
+        self.mode = mode or EXECUTION_MODE
+        if self.mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode {self.mode!r}.")
+        self.semaphore = asyncio.Semaphore(EXECUTOR_CONCURRENCY)
+        self.wake_ups: Dict[str, asyncio.Event] = {}
+        self.request_ids: Dict[str, Set[str]] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def wake(self, robot_id: str, request_ids: Iterable[str] = ()):
+        """
+        Wakes the executor of a robot, starting it if needed.
+
+        Args:
+            robot_id: The ID of the robot.
+            request_ids: The IDs of the requests that led to the wake-up, carried by
+                the log records of the next run.
+
+        Returns:
+            None
+        """
+        if robot_id not in self.tasks:
+            self.wake_ups[robot_id] = asyncio.Event()
+            self.request_ids[robot_id] = set()
+            # A fresh context, so the request IDs of the wake-up that started the
+            # task do not stick to its later runs.
+            self.tasks[robot_id] = asyncio.create_task(
+                self._run(robot_id), context=contextvars.Context()
             )
-            await async_session.execute(query)
+        self.request_ids[robot_id].update(request_ids)
+        self.wake_ups[robot_id].set()
 
-            await async_session.commit()
-            logger.info(
-                "All remaining queued actions and commands marked as WITHDRAWN."
+    async def _run(self, robot_id: str):
+        wake_up = self.wake_ups[robot_id]
+        request_ids = self.request_ids[robot_id]
+        while True:
+            await wake_up.wait()
+            async with self.semaphore:
+                wake_up.clear()
+                token = REQUEST_ID.set(_request_ids_label(request_ids))
+                request_ids.clear()
+                try:
+                    with PROCESS_DURATION.time(self.mode):
+                        await _process_robot_actions(robot_id, self.mode)
+                except Exception:
+                    logger.exception(f"Processing actions of robot {robot_id} failed.")
+                finally:
+                    REQUEST_ID.reset(token)
+
+    async def close(self):
+        """
+        Cancels every executor task and waits for them to finish.
+
+        Returns:
+            None
+        """
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks.clear()
+
+
+def _action_rows(commands, created: datetime.datetime, compact: bool = False):
+    """
+    Yields Action insert parameters for the given commands.
+
+    Without compaction every single step becomes its own Action, so "F3" yields
+    three. With compaction consecutive steps of the same type are collapsed into
+    one Action with a `count` ("FFFFFRR", "F5R2" and "F (F)4 RR" all become F x5,
+    R x2). Commands are expanded lazily, so memory does not grow with the number of
+    actions a command expands to.
+
+    Creation timestamps are assigned explicitly and increase by one microsecond per
+    row, so the execution order (by `created`) is strict within and across commands
+    of a batch even though all rows are inserted in one statement.
+
+    Args:
+        commands: Rows with `id`, `robot_id`, `command`, `created` and `position`
+            attributes, in execution order. The command strings must be valid.
+        created: The timestamp assigned to the first Action of the batch.
+        compact: Whether to run-length encode consecutive identical actions.
+
+    Yields:
+        dict: Column values for a single Action.
+    """
+    step = datetime.timedelta(microseconds=1)
+    for command in commands:
+        runs = command_runs(command.command)
+        if compact:
+            runs = (
+                (action, sum(count for _, count in run))
+                for action, run in groupby(runs, key=itemgetter(0))
             )
+        else:
+            runs = ((action, 1) for action, count in runs for _ in range(count))
 
-    logger.info("Completed processing of queued actions.")
+        for action, count in runs:
+            yield {
+                "command_id": command.id,
+                "robot_id": command.robot_id,
+                "command_created": command.created,
+                "command_position": command.position,
+                "type": ActionTypes(action),
+                "count": count,
+                "created": created,
+            }
+            created += step
 
 
 async def parse_commands():
     """
     Parses queued Command records into individual Actions and updates their status.
 
-    The function fetches all Commands with status QUEUED, ordered by creation time.
-    For each Command:
-      - Iterates over its command string, creating an Action for each action character.
-      - Associates each Action with the Command by command_id.
-      - Marks the Command as COMPLETED after parsing all actions.
+    The function claims Commands with status QUEUED in batches of
+    PARSE_BATCH_SIZE, ordered by creation time, using SELECT ... FOR UPDATE SKIP
+    LOCKED, so several workers can parse in parallel without ever parsing the same
+    Command twice. For each batch:
+      - Quarantines Commands that fail validation by marking them as FAILED, so a
+        malformed row never blocks the queue.
+      - Builds one Action row per single step of every other Command in the batch,
+        or one per run of identical steps when COMPACT_ACTIONS is enabled.
+      - Inserts the rows with bulk INSERT statements of up to PARSE_INSERT_CHUNK_SIZE
+        rows each, bypassing the ORM unit of work.
+      - Marks the parsed Commands of the batch as COMPLETED with a single UPDATE.
 
-    Finally, commits all changes to the database.
+    Each batch is committed in a single transaction, so either all of its actions
+    are stored or none at all.
 
     Returns:
         None
     """
     logger.info("Starting parsing of queued commands.")
+    started = time.perf_counter()
 
     async with async_sessionmaker() as async_session:
-        query = (
-            select(Command)
-            .where(Command.status == Statuses.QUEUED)
-            .order_by(asc(Command.created))
-        )
-        result = await async_session.execute(query)
-        result = result.scalars()
+        while True:
+            query = (
+                select(
+                    Command.id,
+                    Command.robot_id,
+                    Command.command,
+                    Command.created,
+                    Command.position,
+                )
+                .where(Command.status == Statuses.QUEUED)
+                .order_by(asc(Command.created), asc(Command.position))
+                .limit(PARSE_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            result = await async_session.execute(query)
+            commands = result.all()
+            if not commands:
+                break
 
-        for item in result:
-            for action in item.command:
-                command = Action(type=ActionTypes(action), command_id=item.id)
-                async_session.add(command)
+            valid, invalid = [], []
+            for command in commands:
+                try:
+                    validate_command(command.command)
+                except InvalidCommand as e:
+                    logger.error(f"Quarantining command ID {command.id}: {e}")
+                    QUARANTINED.inc()
+                    invalid.append(command.id)
+                else:
+                    valid.append(command)
 
-            item.status = Statuses.COMPLETED
+            rows = _action_rows(valid, datetime.datetime.now(), COMPACT_ACTIONS)
+            while chunk := list(islice(rows, PARSE_INSERT_CHUNK_SIZE)):
+                await async_session.execute(insert(Action), chunk)
+
+            for ids, status in [
+                ([command.id for command in valid], Statuses.COMPLETED),
+                (invalid, Statuses.FAILED),
+            ]:
+                if ids:
+                    query = (
+                        update(Command).where(Command.id.in_(ids)).values(status=status)
+                    )
+                    await async_session.execute(query)
             await async_session.commit()
-            logger.debug(f"Parsed actions for command ID {item.id}.")
+            logger.debug(f"Parsed actions for {len(commands)} commands.")
 
+    PARSE_DURATION.observe(time.perf_counter() - started)
     logger.info("Completed parsing of queued commands.")
 
 
+def _request_ids_label(request_ids: Set[str]) -> str:
+    if not request_ids:
+        return REQUEST_ID.get()
+    ids = sorted(request_ids)
+    label = ",".join(ids[:MAX_LOGGED_REQUEST_IDS])
+    if len(ids) > MAX_LOGGED_REQUEST_IDS:
+        label += f",+{len(ids) - MAX_LOGGED_REQUEST_IDS}"
+    return label
+
+
+async def pipeline_worker(
+    wake_up: asyncio.Event,
+    executors: RobotExecutors,
+    request_ids: Optional[Set[str]] = None,
+):
+    """
+    Parses queued Commands and wakes the robot executors every time the wake-up
+    event is set.
+
+    Every robot with QUEUED Actions is woken after parsing, including the ones
+    whose Actions were parsed by another worker or left over by an earlier run, so
+    the periodic sweep also catches up on execution. Execution happens in the
+    robots' own tasks, so parsing never waits for it.
+
+    Wake-ups arriving while parsing are coalesced into a single follow-up run, so
+    no notification is lost and runs never overlap. The log records of a run, and
+    of the executor runs it triggers, carry the IDs of the API requests that woke
+    it up.
+
+    Args:
+        wake_up: The event set by notifications and by the periodic sweep.
+        executors: The executors of the robots.
+        request_ids: The IDs of the requests whose notifications set the event,
+            emptied at the start of every run.
+
+    Returns:
+        None. Runs until cancelled.
+    """
+    if request_ids is None:
+        request_ids = set()
+
+    while True:
+        await wake_up.wait()
+        wake_up.clear()
+        woken_by = set(request_ids)
+        request_ids.clear()
+        token = REQUEST_ID.set(_request_ids_label(woken_by))
+
+        try:
+            await parse_commands()
+            async with async_sessionmaker() as async_session:
+                robot_ids = await _queued_robot_ids(async_session)
+            for robot_id in robot_ids:
+                executors.wake(robot_id, woken_by)
+        except Exception:
+            logger.exception("Pipeline run failed.")
+        finally:
+            REQUEST_ID.reset(token)
+
+
+async def update_queue_depth():
+    """
+    Refreshes the queue depth gauge with the number of Commands and Actions in
+    each status.
+
+    Statuses without rows are reported as 0 rather than keeping their last value.
+    Archived Actions are moved out of the actions table, so the counts stay bounded
+    by the unarchived backlog.
+
+    Returns:
+        None
+    """
+    async with async_sessionmaker() as async_session:
+        for model in (Command, Action):
+            query = select(model.status, func.count()).group_by(model.status)
+            counts = dict((await async_session.execute(query)).all())
+            for status in Statuses:
+                QUEUE_DEPTH.set(counts.get(status, 0), model.__tablename__, status.name)
+
+
 async def main():
+    wake_up = asyncio.Event()
+
+    async def sweep():
+        wake_up.set()
+
+    # Safety-net sweep for commands whose notification was missed.
     scheduler = AsyncIOScheduler()
     scheduler.add_job(
-        process_actions,
+        sweep,
         "interval",
-        seconds=30,
+        seconds=SWEEP_INTERVAL,
         max_instances=1,
         coalesce=True,
         next_run_time=datetime.datetime.now(),
     )
+    # Partitions are created at startup, so actions always have one to go to.
     scheduler.add_job(
-        parse_commands,
+        maintain_partitions,
         "interval",
-        seconds=30,
+        seconds=ARCHIVE_INTERVAL,
         max_instances=1,
         coalesce=True,
         next_run_time=datetime.datetime.now(),
     )
+    scheduler.add_job(
+        archive_commands,
+        "interval",
+        seconds=ARCHIVE_INTERVAL,
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.add_job(
+        update_queue_depth,
+        "interval",
+        seconds=SWEEP_INTERVAL,
+        max_instances=1,
+        coalesce=True,
+    )
+    # Synchronous job, runs in the scheduler's thread pool off the event loop.
+    scheduler.add_job(
+        reload_obstacles,
+        "interval",
+        seconds=OBSTACLES_RELOAD_INTERVAL,
+        max_instances=1,
+        coalesce=True,
+    )
     scheduler.start()
 
-    await asyncio.Event().wait()
+    request_ids = set()
+
+    def on_command(payload: str):
+        # The payload is the ID of the API request that submitted the command, or
+        # the default ID for commands submitted outside of a request.
+        if payload and payload != REQUEST_ID.get():
+            request_ids.add(payload)
+        wake_up.set()
+
+    executors = RobotExecutors()
+    tasks = [
+        pipeline_worker(wake_up, executors, request_ids),
+        listen(COMMANDS_CHANNEL, on_command, on_connect=wake_up.set),
+    ]
+    if METRICS_PORT:
+        tasks.append(serve_metrics(METRICS_PORT, host=METRICS_HOST))
+    await asyncio.gather(*tasks)
 
 
 if __name__ == "__main__":
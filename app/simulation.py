@@ -0,0 +1,97 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from exceptions import InvalidCommand, UnknownAction
+from grammar import Node, Step, parse_command, validate_command
+from models import ActionTypes, Directions
+from obstacles import ObstacleMap
+
+# Headings in clockwise order, so a right turn is +1 and a left turn is -1.
+HEADINGS = [Directions.NORTH, Directions.EAST, Directions.SOUTH, Directions.WEST]
+HEADING_DX = np.array([0, 1, 0, -1], dtype=np.int64)
+HEADING_DY = np.array([1, 0, -1, 0], dtype=np.int64)
+
+# Lookup tables indexed by the byte value of an action character.
+VALID = np.zeros(256, dtype=bool)
+TURNS = np.zeros(256, dtype=np.int64)
+MOVES = np.zeros(256, dtype=np.int64)
+
+for action in ActionTypes:
+    VALID[ord(action.value)] = True
+TURNS[ord(ActionTypes.ROTATE_RIGHT.value)] = 1
+TURNS[ord(ActionTypes.ROTATE_LEFT.value)] = -1
+MOVES[ord(ActionTypes.MOVE_FORWARD.value)] = 1
+MOVES[ord(ActionTypes.MOVE_BACKWARD.value)] = -1
+
+
+def _expand_codes(nodes: Tuple[Node, ...]) -> np.ndarray:
+    # Repeats are tiled in NumPy rather than expanded action by action in Python.
+    parts = [
+        (
+            np.full(node.count, ord(node.action), dtype=np.uint8)
+            if isinstance(node, Step)
+            else np.tile(_expand_codes(node.body), node.count)
+        )
+        for node in nodes
+    ]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint8)
+
+
+def simulate_command(
+    command: str,
+    x: int,
+    y: int,
+    direction: Directions,
+    obstacle_map: ObstacleMap,
+) -> Tuple[int, int, Directions, Optional[int]]:
+    """
+    Computes the outcome of a command string without executing it step by step.
+
+    The whole trajectory is computed with NumPy: headings are the cumulative sum of
+    the L/R turns, and positions are the cumulative sum of the F/B displacements
+    along the heading at each step. All visited cells are then checked against the
+    obstacle map at once.
+
+    Args:
+        command: The command string, e.g. "FFRFF" or "F2 (RF)2".
+        x: The starting x coordinate.
+        y: The starting y coordinate.
+        direction: The starting direction.
+        obstacle_map: The obstacles to check the trajectory against.
+
+    Returns:
+        tuple: (x, y, direction, collision_index), the final pose of the robot and
+        the index of the first action that hits an obstacle, or None. Repeat counts
+        are expanded, so the index counts single steps. On collision the pose is the
+        one the robot holds when it stops in front of the obstacle.
+
+    Raises:
+        UnknownAction: If the command is malformed or too large.
+    """
+    codes = np.frombuffer(command.encode("latin-1", "replace"), dtype=np.uint8)
+    if not len(codes):
+        return x, y, direction, None
+
+    if not VALID[codes].all():
+        try:
+            validate_command(command)
+        except InvalidCommand as e:
+            raise UnknownAction(str(e))
+        codes = _expand_codes(parse_command(command))
+        if not len(codes):
+            return x, y, direction, None
+
+    headings = (HEADINGS.index(direction) + np.cumsum(TURNS[codes])) % 4
+    moves = MOVES[codes]
+    xs = x + np.cumsum(moves * HEADING_DX[headings])
+    ys = y + np.cumsum(moves * HEADING_DY[headings])
+
+    steps = np.flatnonzero(moves)
+    collisions = np.flatnonzero(obstacle_map.contains_many(xs[steps], ys[steps]))
+    if not len(collisions):
+        return int(xs[-1]), int(ys[-1]), HEADINGS[headings[-1]], None
+
+    index = int(steps[collisions[0]])
+    if index:
+        x, y = int(xs[index - 1]), int(ys[index - 1])
+    return x, y, HEADINGS[headings[index]], index
@@ -0,0 +1,135 @@
+import asyncio
+from collections import defaultdict
+from typing import AsyncIterator
+
+import anyio
+from data_classes import RobotStatus
+from fastapi import WebSocket, WebSocketDisconnect
+from settings import STREAM_KEEPALIVE_INTERVAL
+from utils import decode_state
+
+
+def status_message(state) -> str:
+    """
+    Serializes a robot state tuple as a RobotStatus JSON document.
+    """
+    x, y, direction, status, command_id = state
+    return RobotStatus(
+        x=x, y=y, direction=direction, status=status, command_id=command_id
+    ).model_dump_json()
+
+
+class StateBroadcaster:
+    """
+    Fans out robot state notifications to every in-process watcher of a robot.
+
+    One LISTEN connection per process feeds `publish`, which serializes each state
+    once and hands the same message to all subscribers of the robot. Each
+    subscriber gets a single-slot queue holding the latest state: a slow client
+    skips intermediate poses instead of delaying the others or buffering without
+    bound.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+
+    def __len__(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, robot_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers[robot_id].add(queue)
+        return queue
+
+    def unsubscribe(self, robot_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(robot_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[robot_id]
+
+    def publish(self, payload: str):
+        """
+        Delivers a robot_state notification payload to the robot's subscribers.
+        """
+        if not self._subscribers:
+            return
+
+        robot_id, state = decode_state(payload)
+        queues = self._subscribers.get(robot_id)
+        if not queues:
+            return
+
+        message = status_message(state)
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+
+state_broadcaster = StateBroadcaster()
+
+
+async def sse_events(
+    robot_id: str, queue: asyncio.Queue, initial: str
+) -> AsyncIterator[str]:
+    """
+    Yields server-sent events for a subscribed robot until the client goes away.
+
+    The current status is sent first, then one event per state change. A comment
+    line is sent after STREAM_KEEPALIVE_INTERVAL seconds without changes so that
+    proxies do not time out idle streams.
+
+    Args:
+        robot_id: The ID of the watched robot.
+        queue: The subscription queue returned by `StateBroadcaster.subscribe`.
+        initial: The current status, as a RobotStatus JSON document.
+
+    Yields:
+        str: The encoded events.
+    """
+    try:
+        yield f"data: {initial}\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"data: {message}\n\n"
+    finally:
+        state_broadcaster.unsubscribe(robot_id, queue)
+
+
+async def forward_states(websocket: WebSocket, robot_id: str, queue: asyncio.Queue):
+    """
+    Sends every state change of a subscribed robot until the client disconnects.
+
+    Incoming messages are read and ignored, which is how a disconnect of an idle
+    client is noticed.
+
+    Args:
+        websocket: The accepted WebSocket.
+        robot_id: The ID of the watched robot.
+        queue: The subscription queue returned by `StateBroadcaster.subscribe`.
+
+    Returns:
+        None
+    """
+
+    async def send(cancel_scope: anyio.CancelScope):
+        try:
+            while True:
+                await websocket.send_text(await queue.get())
+        except WebSocketDisconnect:
+            cancel_scope.cancel()
+
+    try:
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(send, task_group.cancel_scope)
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+            task_group.cancel_scope.cancel()
+    finally:
+        state_broadcaster.unsubscribe(robot_id, queue)
@@ -1,10 +1,18 @@
+import datetime
+import struct
 import unittest
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, Mock, patch
 from uuid import uuid4
 
+from archive import pack_trajectory
+from data_classes import CommandProgress
+from exceptions import CommandArchived
 from fastapi.testclient import TestClient
-from models import Command
-from settings import API_TOKEN
+from fastapi.websockets import WebSocketDisconnect
+from models import ActionTypes, Command, Directions, Statuses
+from obstacles import ObstacleMap
+from settings import API_TOKEN, DEFAULT_ROBOT_ID
 
 from app import app
 
@@ -33,6 +41,21 @@ class TestGetStatusEndpoint(unittest.TestCase):
 
         mock_get_position.assert_awaited_once()
 
+    @patch("app.robot_state_cache")
+    @patch("app.get_current_position", new_callable=AsyncMock)
+    def test_get_status_from_cache(self, mock_get_position, mock_cache):
+        uid = uuid4()
+        mock_cache.get.return_value = (1, 2, Directions.NORTH, Statuses.RUNNING, uid)
+
+        response = client.get(
+            "/status", headers={"Authorization": f"Bearer {API_TOKEN}"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["command_id"], str(uid))
+        self.assertEqual(response.json()["status"], "R")
+        mock_get_position.assert_not_awaited()
+
     def test_get_status_error(self):
         response = client.get(
             "/status", headers={"Authorization": "Bearer wrong-token"}
@@ -68,3 +91,390 @@ class TestRegisterCommandEndpoint(unittest.TestCase):
             headers={"Authorization": "Bearer wrong-token"},
         )
         self.assertEqual(response.status_code, 401)
+
+    @patch("app.add_command", new_callable=AsyncMock)
+    def test_register_invalid_command(self, mock_add_command):
+        response = client.post(
+            "/command",
+            json={"command": "FFX"},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 422)
+        mock_add_command.assert_not_awaited()
+
+
+class FleetEndpointsTests(unittest.TestCase):
+
+    @patch("app.ROBOT_IDS", ["rover-1", "rover-2"])
+    @patch("app.get_current_position", new_callable=AsyncMock)
+    def test_get_robot_status(self, mock_get_position):
+        mock_get_position.return_value = (5, 10, "W", "C", None)
+
+        response = client.get(
+            "/robots/rover-2/status",
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["x"], 5)
+        self.assertEqual(mock_get_position.await_args.args[1], "rover-2")
+
+    @patch("app.ROBOT_IDS", ["rover-1", "rover-2"])
+    @patch("app.add_command", new_callable=AsyncMock)
+    def test_register_robot_command(self, mock_add_command):
+        command = Mock(spec=Command)
+        command.id = str(uuid4())
+        mock_add_command.return_value = command
+
+        response = client.post(
+            "/robots/rover-1/command",
+            json={"command": "FFF"},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_add_command.await_args.args[2], "rover-1")
+
+    @patch("app.ROBOT_IDS", ["rover-1"])
+    def test_unknown_robot(self):
+        response = client.get(
+            "/robots/rover-9/status",
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+class StatusWebSocketTests(unittest.TestCase):
+
+    @patch("app.async_sessionmaker")
+    @patch("app.get_current_position", new_callable=AsyncMock)
+    def test_sends_current_status(self, mock_get_position, _mock_sessionmaker):
+        mock_get_position.return_value = (5, 10, "W", "C", None)
+
+        with client.websocket_connect(
+            "/status/ws", headers={"Authorization": f"Bearer {API_TOKEN}"}
+        ) as websocket:
+            data = websocket.receive_json()
+
+        self.assertEqual((data["x"], data["y"], data["direction"]), (5, 10, "W"))
+
+    def test_rejects_invalid_token(self):
+        with self.assertRaises(WebSocketDisconnect) as error:
+            with client.websocket_connect("/status/ws?token=wrong-token"):
+                pass
+
+        self.assertEqual(error.exception.code, 1008)
+
+    @patch("app.ROBOT_IDS", ["rover-1"])
+    @patch("app.async_sessionmaker")
+    @patch("app.get_current_position", new_callable=AsyncMock)
+    def test_serves_default_robot_outside_fleet(
+        self, mock_get_position, _mock_sessionmaker
+    ):
+        mock_get_position.return_value = (5, 10, "W", "C", None)
+
+        with client.websocket_connect(
+            "/status/ws", headers={"Authorization": f"Bearer {API_TOKEN}"}
+        ) as websocket:
+            data = websocket.receive_json()
+
+        self.assertEqual(data["x"], 5)
+        self.assertEqual(mock_get_position.await_args.args[1], DEFAULT_ROBOT_ID)
+
+    @patch("app.ROBOT_IDS", ["rover-1"])
+    def test_rejects_unknown_fleet_robot(self):
+        with self.assertRaises(WebSocketDisconnect) as error:
+            with client.websocket_connect(
+                "/robots/rover-9/status/ws",
+                headers={"Authorization": f"Bearer {API_TOKEN}"},
+            ):
+                pass
+
+        self.assertEqual(error.exception.code, 1008)
+
+
+class CommandProgressEndpointTests(unittest.TestCase):
+
+    @patch("app.get_command_progress", new_callable=AsyncMock)
+    def test_get_command(self, mock_get_progress):
+        command_id = uuid4()
+        mock_get_progress.return_value = CommandProgress(
+            id=command_id,
+            robot_id="default",
+            status=Statuses.RUNNING,
+            actions={Statuses.COMPLETED: 2, Statuses.QUEUED: 1},
+            x=1,
+            y=2,
+            direction=Directions.NORTH,
+        )
+
+        response = client.get(
+            f"/command/{command_id}",
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["status"], "R")
+        self.assertEqual(data["actions"], {"C": 2, "Q": 1})
+
+    @patch("app.get_command_progress", new_callable=AsyncMock, return_value=None)
+    def test_unknown_command(self, _mock_get_progress):
+        response = client.get(
+            f"/command/{uuid4()}", headers={"Authorization": f"Bearer {API_TOKEN}"}
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_cursor(self):
+        response = client.get(
+            f"/command/{uuid4()}/actions?cursor=nope",
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 422)
+
+    @patch(
+        "app.get_command_actions",
+        new_callable=AsyncMock,
+        side_effect=CommandArchived("archived"),
+    )
+    def test_archived_actions(self, _mock_get_actions):
+        response = client.get(
+            f"/command/{uuid4()}/actions",
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()["detail"], "archived")
+
+
+class TrajectoryEndpointTests(unittest.TestCase):
+
+    def poses(self, xs):
+        return pack_trajectory(
+            [
+                SimpleNamespace(
+                    type=ActionTypes.MOVE_FORWARD,
+                    count=1,
+                    status=Statuses.COMPLETED,
+                    x_coord=x,
+                    y_coord=0,
+                    direction=Directions.EAST,
+                )
+                for x in xs
+            ]
+        )
+
+    @patch("app.get_robot_trajectory", new_callable=AsyncMock)
+    def test_delta_encoded_json(self, mock_get_trajectory):
+        first, second = uuid4(), uuid4()
+        mock_get_trajectory.return_value = (
+            [(first, self.poses([5, 6])), (second, self.poses([7]))],
+            None,
+        )
+
+        response = client.get(
+            "/trajectory?from=2026-10-01T00:00:00",
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["commands"], [str(first), str(second)])
+        self.assertEqual(data["offsets"], [0, 2])
+        self.assertEqual(data["x"], [5, 1, 1])
+        self.assertEqual(data["directions"], "EEE")
+        start = mock_get_trajectory.await_args.args[2]
+        self.assertEqual(start, datetime.datetime(2026, 10, 1))
+
+    @patch("app.get_command_trajectory", new_callable=AsyncMock)
+    def test_binary_columns(self, mock_get_trajectory):
+        mock_get_trajectory.return_value = ("default", self.poses([5, 6]))
+
+        response = client.get(
+            f"/command/{uuid4()}/trajectory?format=binary",
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Trajectory-Points"], "2")
+        self.assertEqual(response.content, struct.pack("<4i", 5, 6, 0, 0) + b"EE")
+
+    @patch("app.get_command_trajectory", new_callable=AsyncMock, return_value=None)
+    def test_unknown_command(self, _mock_get_trajectory):
+        response = client.get(
+            f"/command/{uuid4()}/trajectory",
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+class RegisterCommandsEndpointTests(unittest.TestCase):
+
+    @patch("app.add_commands", new_callable=AsyncMock)
+    def test_register_batch(self, mock_add_commands):
+        ids = [uuid4(), uuid4()]
+        mock_add_commands.return_value = ids
+
+        response = client.post(
+            "/commands/batch",
+            json={"commands": [{"command": "FF"}, {"command": "RL"}]},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["ids"], [str(i) for i in ids])
+        commands = mock_add_commands.await_args.args[1]
+        self.assertEqual([c.command for c in commands], ["FF", "RL"])
+
+    @patch("app.add_commands", new_callable=AsyncMock)
+    def test_empty_batch(self, mock_add_commands):
+        response = client.post(
+            "/commands/batch",
+            json={"commands": []},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 422)
+        mock_add_commands.assert_not_awaited()
+
+
+class PlanEndpointTests(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("app.get_current_position", new_callable=AsyncMock)
+        self.mock_get_position = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_get_position.return_value = (
+            0,
+            0,
+            Directions.NORTH,
+            Statuses.COMPLETED,
+            None,
+        )
+        patcher = patch(
+            "app.has_pending_commands", new_callable=AsyncMock, return_value=False
+        )
+        self.mock_has_pending = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("app.obstacle_map", ObstacleMap.from_cells([(0, 2)]))
+    @patch("app.add_command", new_callable=AsyncMock)
+    def test_plan_and_enqueue(self, mock_add_command):
+        mock_add_command.return_value = Command(id=uuid4(), command="B2")
+
+        response = client.post(
+            "/plan",
+            json={"x": 0, "y": -2, "enqueue": True},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["command"], data["actions"]), ("B2", 2))
+        self.assertEqual(data["id"], str(mock_add_command.return_value.id))
+        self.assertEqual(mock_add_command.await_args.args[1].command, "B2")
+
+    @patch("app.obstacle_map", ObstacleMap.from_cells([(0, 2)]))
+    @patch("app.add_command", new_callable=AsyncMock)
+    def test_blocked_target(self, mock_add_command):
+        response = client.post(
+            "/plan",
+            json={"x": 0, "y": 2, "enqueue": True},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 422)
+        mock_add_command.assert_not_awaited()
+
+    @patch("app.add_command", new_callable=AsyncMock)
+    def test_enqueue_behind_pending_commands(self, mock_add_command):
+        self.mock_has_pending.return_value = True
+
+        response = client.post(
+            "/plan",
+            json={"x": 0, "y": -2, "enqueue": True},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 409)
+        mock_add_command.assert_not_awaited()
+
+    def test_plan_behind_pending_commands_without_enqueue(self):
+        self.mock_has_pending.return_value = True
+
+        response = client.post(
+            "/plan",
+            json={"x": 0, "y": -2},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.mock_has_pending.assert_not_awaited()
+
+
+class SimulateCommandEndpointTests(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("app.get_current_position", new_callable=AsyncMock)
+        self.mock_get_position = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_get_position.return_value = (
+            4,
+            2,
+            Directions.WEST,
+            Statuses.COMPLETED,
+            None,
+        )
+
+    @patch("app.obstacle_map", ObstacleMap.from_cells([(1, 4)]))
+    def test_simulate_collision(self):
+        response = client.post(
+            "/command/simulate",
+            json={"command": "FFFRFF"},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"x": 1, "y": 3, "direction": "N", "status": "F", "collision_index": 5},
+        )
+
+    @patch("app.add_command", new_callable=AsyncMock)
+    def test_dry_run_does_not_register(self, mock_add_command):
+        response = client.post(
+            "/command?dry_run=true",
+            json={"command": "FF"},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["x"], 2)
+        self.assertEqual(response.json()["status"], "C")
+        mock_add_command.assert_not_awaited()
+
+    def test_simulate_million_character_command(self):
+        response = client.post(
+            "/command/simulate",
+            json={"command": "FB" * 500_000},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"x": 4, "y": 2, "direction": "W", "status": "C", "collision_index": None},
+        )
+
+    def test_simulate_unknown_action(self):
+        response = client.post(
+            "/command/simulate",
+            json={"command": "FX"},
+            headers={"Authorization": f"Bearer {API_TOKEN}"},
+        )
+        self.assertEqual(response.status_code, 422)
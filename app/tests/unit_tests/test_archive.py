@@ -0,0 +1,287 @@
+import datetime
+import struct
+import unittest
+from contextlib import asynccontextmanager
+from itertools import islice
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from uuid import uuid4
+
+from archive import (
+    TRAJECTORY_DTYPE,
+    archive_commands,
+    delta_encode,
+    direction_letters,
+    executed_poses,
+    maintain_partitions,
+    next_month,
+    pack_trajectory,
+    partition_name,
+    store_trajectories,
+    summarize_trajectory,
+    trajectory_bytes,
+    unpack_trajectory,
+)
+from models import ActionTypes, Directions, Statuses
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import Delete, Insert, Update
+
+
+def session_factory(session):
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+
+class StreamedResult:
+    """Stands in for the AsyncResult of a query streamed with yield_per."""
+
+    def __init__(self, rows, size):
+        self.rows = iter(rows)
+        self.size = size
+        self.close = AsyncMock()
+
+    async def partitions(self):
+        while chunk := list(islice(self.rows, self.size)):
+            yield chunk
+
+
+def advisory_lock(acquired=True):
+    @asynccontextmanager
+    async def lock(*_keys):
+        yield acquired
+
+    return lock
+
+
+def action(command_id, status, x=None, y=None, direction=None, updated=None):
+    return SimpleNamespace(
+        command_id=command_id,
+        type=ActionTypes.MOVE_FORWARD,
+        count=2,
+        status=status,
+        x_coord=x,
+        y_coord=y,
+        direction=direction,
+        updated=updated,
+    )
+
+
+class TrajectoryTests(unittest.TestCase):
+
+    def test_round_trip(self):
+        actions = [
+            action(None, Statuses.COMPLETED, 1, -2, Directions.EAST),
+            action(None, Statuses.WITHDRAWN),
+        ]
+
+        trajectory = unpack_trajectory(pack_trajectory(actions).tobytes())
+
+        self.assertEqual(TRAJECTORY_DTYPE.itemsize, 15)
+        self.assertEqual(trajectory["count"].tolist(), [2, 2])
+        self.assertEqual(trajectory["x"].tolist(), [1, 0])
+        self.assertEqual(trajectory["y"].tolist(), [-2, 0])
+        self.assertEqual(trajectory["direction"].tolist(), [4, 0])
+
+    def test_summary(self):
+        trajectory = pack_trajectory(
+            [
+                action(None, Statuses.COMPLETED, 1, 2, Directions.NORTH),
+                action(None, Statuses.FAILED, 1, 3, Directions.NORTH),
+                action(None, Statuses.WITHDRAWN),
+                action(None, Statuses.WITHDRAWN),
+            ]
+        )
+
+        counts, steps, pose = summarize_trajectory(trajectory)
+
+        self.assertEqual(
+            counts,
+            {Statuses.COMPLETED: 1, Statuses.FAILED: 1, Statuses.WITHDRAWN: 2},
+        )
+        self.assertEqual(
+            steps,
+            {Statuses.COMPLETED: 2, Statuses.FAILED: 2, Statuses.WITHDRAWN: 4},
+        )
+        self.assertEqual(pose, (1, 3, Directions.NORTH))
+
+    def test_summary_without_executed_actions(self):
+        trajectory = pack_trajectory([action(None, Statuses.WITHDRAWN)])
+
+        self.assertEqual(summarize_trajectory(trajectory)[2], None)
+
+    def test_path_encodings(self):
+        poses = executed_poses(
+            pack_trajectory(
+                [
+                    action(None, Statuses.COMPLETED, 1, 2, Directions.NORTH),
+                    action(None, Statuses.FAILED, 1, 3, Directions.EAST),
+                    action(None, Statuses.WITHDRAWN),
+                ]
+            )
+        )
+
+        self.assertEqual(delta_encode(poses["y"]), [2, 1])
+        self.assertEqual(direction_letters(poses), "NE")
+        self.assertEqual(
+            trajectory_bytes(poses), struct.pack("<2i2i", 1, 1, 2, 3) + b"NE"
+        )
+
+
+class ArchiveCommandsTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_moves_actions_into_one_row_per_command(self):
+        first, second, empty = uuid4(), uuid4(), uuid4()
+        start = datetime.datetime(2026, 10, 1)
+        actions = [
+            action(first, Statuses.COMPLETED, 1, 2, Directions.NORTH, start),
+            action(first, Statuses.COMPLETED, 1, 3, Directions.NORTH, start),
+            action(first, Statuses.COMPLETED, 1, 4, Directions.NORTH, start),
+            action(second, Statuses.FAILED, 1, 4, Directions.EAST, start),
+            action(second, Statuses.WITHDRAWN),
+        ]
+        commands = [
+            SimpleNamespace(id=command_id, robot_id="rover-1")
+            for command_id in (first, second, empty)
+        ]
+        batches = [commands, []]
+        statements = []
+
+        async def execute(statement, params=None):
+            statements.append((statement, params))
+            if isinstance(statement, Select):
+                return Mock(all=Mock(return_value=batches.pop(0)))
+
+        session = Mock(
+            execute=AsyncMock(side_effect=execute),
+            # Chunks of 2 split the first command's actions across partitions.
+            stream=AsyncMock(return_value=StreamedResult(actions, 2)),
+            commit=AsyncMock(),
+        )
+        with patch("archive.async_sessionmaker", session_factory(session)):
+            archived = await archive_commands()
+
+        self.assertEqual(archived, 3)
+        rows = next(params for statement, params in statements if params)
+        self.assertEqual([row["actions"] for row in rows], [3, 2, 0])
+        self.assertEqual(
+            unpack_trajectory(rows[0]["trajectory"])["y"].tolist(), [2, 3, 4]
+        )
+        self.assertEqual(rows[0]["finished"], start)
+        self.assertIsNone(rows[2]["finished"])
+        kinds = [type(statement) for statement, _params in statements[1:4]]
+        self.assertEqual(kinds, [Insert, Delete, Update])
+        session.stream.return_value.close.assert_awaited_once()
+        session.commit.assert_awaited_once()
+
+
+class StoreTrajectoriesTests(unittest.IsolatedAsyncioTestCase):
+
+    @patch("archive.ARCHIVE_BATCH_SIZE", 2)
+    async def test_packs_executed_actions_per_command(self):
+        first, second, idle = uuid4(), uuid4(), uuid4()
+        results = [
+            [
+                action(first, Statuses.COMPLETED, 1, 2, Directions.NORTH),
+                action(first, Statuses.COMPLETED, 1, 3, Directions.NORTH),
+                action(second, Statuses.FAILED, 1, 3, Directions.EAST),
+            ],
+            [],
+        ]
+        session = Mock(
+            execute=AsyncMock(),
+            stream=AsyncMock(
+                side_effect=lambda _query: StreamedResult(results.pop(0), 2)
+            ),
+        )
+
+        await store_trajectories(session, [first, second, idle])
+
+        query = str(session.stream.await_args_list[0].args[0])
+        self.assertIn("actions.status IN", query)
+        rows = [c.args[1] for c in session.execute.await_args_list]
+        self.assertEqual(
+            [[row["id"] for row in chunk] for chunk in rows], [[first, second], [idle]]
+        )
+        trajectories = [unpack_trajectory(row["trajectory"]) for row in rows[0]]
+        self.assertEqual(trajectories[0]["y"].tolist(), [2, 3])
+        self.assertEqual(trajectories[1]["status"].tolist(), [3])
+        self.assertEqual(rows[1][0]["trajectory"], b"")
+
+
+class MaintainPartitionsTests(unittest.IsolatedAsyncioTestCase):
+
+    def make_session(self, existing, partitions, non_empty=()):
+        self.ddl = []
+
+        async def scalar(statement, params=None):
+            if params:
+                return params["name"] in existing
+            return any(name in str(statement) for name in non_empty)
+
+        async def execute(statement, params=None):
+            sql = str(statement)
+            if "pg_inherits" in sql:
+                return Mock(scalars=Mock(return_value=Mock(all=lambda: partitions)))
+            if not sql.startswith("SET"):
+                self.ddl.append(sql)
+
+        return Mock(
+            scalar=AsyncMock(side_effect=scalar),
+            execute=AsyncMock(side_effect=execute),
+            commit=AsyncMock(),
+            rollback=AsyncMock(),
+        )
+
+    async def run_maintenance(self, session, acquired=True):
+        with (
+            patch("archive.async_sessionmaker", session_factory(session)),
+            patch("archive.advisory_lock", advisory_lock(acquired)),
+        ):
+            await maintain_partitions()
+
+    async def test_creates_missing_partitions(self):
+        month = datetime.date.today().replace(day=1)
+        session = self.make_session({partition_name(month)}, [])
+
+        await self.run_maintenance(session)
+
+        following = next_month(month)
+        self.assertEqual(
+            self.ddl,
+            [
+                f"CREATE TABLE {partition_name(following)} PARTITION OF actions "
+                f"FOR VALUES FROM ('{following}') TO ('{next_month(following)}')"
+            ],
+        )
+
+    async def test_drops_old_empty_partitions(self):
+        month = datetime.date.today().replace(day=1)
+        current = {partition_name(month), partition_name(next_month(month))}
+        partitions = [
+            "actions_2020_01",
+            "actions_2020_02",
+            "actions_default",
+            *current,
+        ]
+        session = self.make_session(current, partitions, ["actions_2020_02"])
+
+        await self.run_maintenance(session)
+
+        self.assertEqual(self.ddl, ["DROP TABLE actions_2020_01"])
+
+    async def test_skips_when_locked(self):
+        session = self.make_session(set(), [])
+
+        await self.run_maintenance(session, acquired=False)
+
+        self.assertEqual(self.ddl, [])
+
+    def test_next_month(self):
+        self.assertEqual(
+            next_month(datetime.date(2026, 12, 1)), datetime.date(2027, 1, 1)
+        )
+        self.assertEqual(
+            next_month(datetime.date(2026, 1, 31)), datetime.date(2026, 2, 1)
+        )
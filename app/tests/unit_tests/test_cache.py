@@ -0,0 +1,64 @@
+import unittest
+from uuid import uuid4
+
+from cache import RobotStateCache
+from models import Directions, Statuses
+from settings import DEFAULT_ROBOT_ID
+from utils import encode_state
+
+
+class RobotStateCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = RobotStateCache()
+        self.state = (1, 2, Directions.NORTH, Statuses.COMPLETED, uuid4())
+
+    def test_disabled_cache_is_not_served(self):
+        self.cache.set(DEFAULT_ROBOT_ID, self.state, self.cache.version)
+        self.cache.update(encode_state(DEFAULT_ROBOT_ID, *self.state))
+
+        self.assertIsNone(self.cache.get(DEFAULT_ROBOT_ID))
+
+    def test_set_and_get(self):
+        self.cache.enable()
+        self.cache.set(DEFAULT_ROBOT_ID, self.state, self.cache.version)
+
+        self.assertEqual(self.cache.get(DEFAULT_ROBOT_ID), self.state)
+
+    def test_notification_updates_state(self):
+        self.cache.enable()
+        self.cache.set(DEFAULT_ROBOT_ID, self.state, self.cache.version)
+        new_state = (5, 6, Directions.WEST, Statuses.FAILED, None)
+
+        self.cache.update(encode_state(DEFAULT_ROBOT_ID, *new_state))
+
+        self.assertEqual(self.cache.get(DEFAULT_ROBOT_ID), new_state)
+
+    def test_stale_database_read_is_discarded(self):
+        self.cache.enable()
+        version = self.cache.version
+        new_state = (5, 6, Directions.WEST, Statuses.FAILED, None)
+        self.cache.update(encode_state(DEFAULT_ROBOT_ID, *new_state))
+
+        self.cache.set(DEFAULT_ROBOT_ID, self.state, version)
+
+        self.assertEqual(self.cache.get(DEFAULT_ROBOT_ID), new_state)
+
+    def test_disconnect_drops_state(self):
+        self.cache.enable()
+        self.cache.set(DEFAULT_ROBOT_ID, self.state, self.cache.version)
+
+        self.cache.disable()
+        self.cache.enable()
+
+        self.assertIsNone(self.cache.get(DEFAULT_ROBOT_ID))
+
+    def test_robots_are_cached_separately(self):
+        self.cache.enable()
+        self.cache.set(DEFAULT_ROBOT_ID, self.state, self.cache.version)
+        other_state = (5, 6, Directions.WEST, Statuses.FAILED, None)
+
+        self.cache.update(encode_state("rover-2", *other_state))
+
+        self.assertEqual(self.cache.get(DEFAULT_ROBOT_ID), self.state)
+        self.assertEqual(self.cache.get("rover-2"), other_state)
@@ -0,0 +1,97 @@
+import unittest
+from unittest.mock import patch
+
+from data_classes import CommandRequest
+from exceptions import InvalidCommand
+from grammar import (
+    Repeat,
+    Step,
+    command_runs,
+    parse_command,
+    validate_command,
+)
+from pydantic import ValidationError
+
+
+class ValidateCommandTests(unittest.TestCase):
+
+    def test_valid_commands(self):
+        for command, actions in [
+            ("", 0),
+            ("FFRFF", 5),
+            ("F10R2", 12),
+            ("FB3LR", 6),
+            ("F100 R (FL)20", 141),
+            ("(F(RL)2)3", 15),
+        ]:
+            self.assertEqual(validate_command(command), actions, command)
+
+    def test_invalid_commands(self):
+        for command, index in [
+            ("FFX", 2),
+            ("F0", 1),
+            ("3F", 0),
+            ("F!R", 1),
+            ("f", 0),
+            ("F(R", 1),
+            ("FR)", 2),
+            ("(F)0", 3),
+            (" ( ) ", 1),
+            ("F(R())", 3),
+        ]:
+            with self.assertRaisesRegex(InvalidCommand, f"index {index}"):
+                validate_command(command)
+
+    @patch("grammar.COMMAND_MAX_LENGTH", 4)
+    def test_max_length(self):
+        with self.assertRaises(InvalidCommand):
+            validate_command("FFFFF")
+
+    @patch("grammar.COMMAND_MAX_ACTIONS", 100)
+    def test_max_actions(self):
+        validate_command("F100")
+        with self.assertRaises(InvalidCommand):
+            validate_command("F99R2")
+
+    @patch("grammar.COMMAND_MAX_ACTIONS", 100)
+    def test_max_actions_of_groups(self):
+        with self.assertRaises(InvalidCommand):
+            validate_command("((F)10)11")
+
+    def test_empty_groups_are_rejected(self):
+        for command in ["()999999999", "(()999999999)999999999"]:
+            with self.assertRaisesRegex(InvalidCommand, "Empty group at index"):
+                validate_command(command)
+            with self.assertRaises(ValidationError):
+                CommandRequest(command=command)
+
+    def test_max_nesting(self):
+        with self.assertRaisesRegex(InvalidCommand, "nested"):
+            validate_command("(" * 17 + "F" + ")" * 17)
+
+
+class ParseCommandTests(unittest.TestCase):
+
+    def test_ast(self):
+        self.assertEqual(
+            parse_command("F100 R (FL)20"),
+            (
+                Step("F", 100),
+                Step("R", 1),
+                Repeat((Step("F", 1), Step("L", 1)), 20),
+            ),
+        )
+
+
+class CommandRunsTests(unittest.TestCase):
+
+    def test_runs(self):
+        self.assertEqual(list(command_runs("FFR")), [("F", 1), ("F", 1), ("R", 1)])
+        self.assertEqual(list(command_runs("F10RB2")), [("F", 10), ("R", 1), ("B", 2)])
+
+    def test_groups_expand_lazily(self):
+        runs = command_runs("(FR)999999999")
+
+        self.assertEqual(next(runs), ("F", 1))
+        self.assertEqual(next(runs), ("R", 1))
+        self.assertEqual(next(runs), ("F", 1))
@@ -0,0 +1,117 @@
+import asyncio
+import socket
+import unittest
+
+from fastapi.testclient import TestClient
+from metrics import CONTENT_TYPE, Counter, Gauge, Histogram, Registry, serve_metrics
+from settings import API_TOKEN
+
+from app import app
+
+client = TestClient(app)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_and_gauge(self):
+        counter = Counter("jobs_total", "Jobs.", ["robot_id"], registry=self.registry)
+        gauge = Gauge("depth", "Depth.", registry=self.registry)
+        counter.inc("r1")
+        counter.inc("r1", amount=2)
+        counter.inc('a"b')
+        gauge.set(7)
+
+        text = self.registry.render()
+
+        self.assertIn("# TYPE jobs_total counter", text)
+        self.assertIn('jobs_total{robot_id="r1"} 3.0', text)
+        self.assertIn('jobs_total{robot_id="a\\"b"} 1.0', text)
+        self.assertIn("depth 7", text)
+
+    def test_gauge_function_is_read_when_scraped(self):
+        gauge = Gauge("in_use", "In use.", ["profile"], registry=self.registry)
+        values = iter([1, 2])
+        gauge.set_function(lambda: next(values), "api")
+
+        self.assertIn('in_use{profile="api"} 1', self.registry.render())
+        self.assertIn('in_use{profile="api"} 2', self.registry.render())
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram(
+            "latency", "Latency.", ["mode"], buckets=(0.1, 1.0), registry=self.registry
+        )
+        histogram.observe(0.05, "batched")
+        histogram.observe(0.5, "batched", count=3)
+        histogram.observe(5, "batched")
+
+        lines = self.registry.render().splitlines()
+
+        self.assertIn('latency_bucket{mode="batched",le="0.1"} 1', lines)
+        self.assertIn('latency_bucket{mode="batched",le="1.0"} 4', lines)
+        self.assertIn('latency_bucket{mode="batched",le="+Inf"} 5', lines)
+        self.assertIn('latency_count{mode="batched"} 5', lines)
+        self.assertIn('latency_sum{mode="batched"} 6.55', lines)
+
+    def test_histogram_time(self):
+        histogram = Histogram("duration", "Duration.", registry=self.registry)
+        with histogram.time():
+            pass
+
+        self.assertIn("duration_count 1", self.registry.render())
+
+    def test_serve_metrics(self):
+        Gauge("depth", "Depth.", registry=self.registry).set(3)
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        async def scrape():
+            server = asyncio.create_task(serve_metrics(port, self.registry))
+            for _ in range(100):
+                try:
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                    break
+                except OSError:
+                    await asyncio.sleep(0.01)
+            writer.write(b"GET /metrics HTTP/1.1\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            server.cancel()
+            return response.decode()
+
+        response = asyncio.run(scrape())
+
+        self.assertTrue(response.startswith("HTTP/1.1 200 OK"))
+        self.assertIn(f"Content-Type: {CONTENT_TYPE}", response)
+        self.assertTrue(response.endswith("depth 3\n"))
+
+    def test_serve_metrics_on_a_taken_port(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            sock.listen()
+            port = sock.getsockname()[1]
+
+            with self.assertLogs("metrics_logger", level="ERROR"):
+                asyncio.run(serve_metrics(port, self.registry))
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def test_get_metrics(self):
+        headers = {"Authorization": f"Bearer {API_TOKEN}"}
+        client.get("/status/unknown", headers=headers)
+
+        response = client.get("/metrics", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], CONTENT_TYPE)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", response.text)
+        self.assertIn('route="unmatched",status="404"', response.text)
+
+    def test_get_metrics_unauthorized(self):
+        response = client.get("/metrics")
+
+        self.assertEqual(response.status_code, 401)
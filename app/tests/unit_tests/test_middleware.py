@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from models import Directions, Statuses
+from settings import API_TOKEN, REQUEST_ID
+
+from app import app
+
+client = TestClient(app)
+
+HEADERS = {"Authorization": f"Bearer {API_TOKEN}"}
+STATE = (1, 2, Directions.NORTH, Statuses.COMPLETED, None)
+
+
+@patch("app.robot_state_cache.get", return_value=STATE)
+class TestRequestMiddleware(unittest.TestCase):
+
+    def test_missing_header(self, _mock_get):
+        response = client.get("/status")
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(
+            response.json(), {"detail": "Authorization header missing or invalid"}
+        )
+
+    def test_invalid_token(self, _mock_get):
+        response = client.get("/status", headers={"Authorization": "Bearer nope"})
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"detail": "Invalid token"})
+        self.assertIn("x-request-id", response.headers)
+
+    def test_docs_are_public(self, _mock_get):
+        response = client.get("/openapi.json")
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_generates_request_id(self, _mock_get):
+        first = client.get("/status", headers=HEADERS).headers["x-request-id"]
+        second = client.get("/status", headers=HEADERS).headers["x-request-id"]
+
+        self.assertEqual(len(first), 32)
+        self.assertNotEqual(first, second)
+
+    def test_propagates_request_id(self, _mock_get):
+        headers = {**HEADERS, "X-Request-ID": "abc-123"}
+
+        with self.assertLogs("api_logger", level="INFO") as logs:
+            response = client.get("/status", headers=headers)
+
+        self.assertEqual(response.headers["x-request-id"], "abc-123")
+        self.assertEqual(logs.records[-1].request_id, "abc-123")
+        self.assertIn("GET /status completed with status 200", logs.output[-1])
+
+    @patch("app.add_command", new_callable=AsyncMock)
+    def test_request_id_visible_to_endpoints(self, mock_add_command, _mock_get):
+        seen = []
+
+        async def add_command(*args):
+            seen.append(REQUEST_ID.get())
+            return Mock(id=uuid4())
+
+        mock_add_command.side_effect = add_command
+        headers = {**HEADERS, "X-Request-ID": "abc-123"}
+
+        client.post("/command", json={"command": "F"}, headers=headers)
+
+        self.assertEqual(seen, ["abc-123"])
+        self.assertEqual(REQUEST_ID.get(), "-")
+
+    @patch("middleware.ACCESS_LOG_SAMPLE_RATE", 0)
+    def test_sampling_skips_successful_requests(self, _mock_get):
+        with patch("middleware.logger") as mock_logger:
+            client.get("/status", headers=HEADERS)
+
+        mock_logger.info.assert_not_called()
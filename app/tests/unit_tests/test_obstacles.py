@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import obstacles
+from obstacles import ObstacleMap, load_obstacle_map, reload_obstacles
+
+
+class ObstacleMapTests(unittest.TestCase):
+
+    def test_from_cells(self):
+        cells = {(1, 4), (-3, 5), (7, -4), (-100, -100), (64, 64)}
+        obstacle_map = ObstacleMap.from_cells(cells, tile_bits=3)
+
+        for cell in cells:
+            self.assertIn(cell, obstacle_map)
+        for cell in [(0, 0), (1, 5), (-3, 4), (63, 64), (2**40, 0)]:
+            self.assertNotIn(cell, obstacle_map)
+        self.assertEqual(len(obstacle_map), len(cells))
+
+    def test_from_bitmap_matches_cells(self):
+        rng = np.random.default_rng(1)
+        bitmap = rng.random((37, 53)) < 0.1
+        origin = (-11, 6)
+        cells = {(origin[0] + c, origin[1] + r) for r, c in np.argwhere(bitmap)}
+
+        obstacle_map = ObstacleMap.from_bitmap(bitmap, origin, tile_bits=3)
+
+        self.assertEqual(len(obstacle_map), len(cells))
+        for x in range(-15, 50):
+            for y in range(0, 50):
+                self.assertEqual((x, y) in obstacle_map, (x, y) in cells)
+
+    def test_contains_many(self):
+        rng = np.random.default_rng(2)
+        cells = {tuple(cell) for cell in rng.integers(-40, 40, size=(200, 2))}
+        obstacle_map = ObstacleMap.from_cells(cells, tile_bits=3)
+        xs = rng.integers(-50, 50, size=5000)
+        ys = rng.integers(-50, 50, size=5000)
+
+        blocked = obstacle_map.contains_many(xs, ys)
+
+        expected = [(int(x), int(y)) in cells for x, y in zip(xs, ys)]
+        self.assertEqual(blocked.tolist(), expected)
+
+    def test_contains_many_empty(self):
+        obstacle_map = ObstacleMap.from_cells([(1, 1)])
+
+        self.assertEqual(obstacle_map.contains_many([], []).tolist(), [])
+        self.assertEqual(ObstacleMap().contains_many([1], [1]).tolist(), [False])
+
+    def test_empty_tiles_are_not_stored(self):
+        bitmap = np.zeros((64, 64), dtype=bool)
+        bitmap[0, 0] = True
+
+        obstacle_map = ObstacleMap.from_bitmap(bitmap, tile_bits=3)
+
+        self.assertEqual(obstacle_map.tiles, 1)
+
+    def test_replace(self):
+        obstacle_map = ObstacleMap.from_cells([(1, 1)])
+        obstacle_map.replace(ObstacleMap.from_cells([(2, 2)]))
+
+        self.assertNotIn((1, 1), obstacle_map)
+        self.assertIn((2, 2), obstacle_map)
+
+
+class LoadObstacleMapTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_load_text(self):
+        path = os.path.join(self.directory.name, "obstacles.txt")
+        with open(path, "w") as file:
+            file.write("1, 4\n-3,5\n\n")
+
+        obstacle_map = load_obstacle_map(path)
+
+        self.assertIn((1, 4), obstacle_map)
+        self.assertIn((-3, 5), obstacle_map)
+        self.assertEqual(len(obstacle_map), 2)
+
+    def test_load_bitmap(self):
+        path = os.path.join(self.directory.name, "obstacles.npy")
+        bitmap = np.zeros((3, 3), dtype=np.uint8)
+        bitmap[2, 1] = 1
+        np.save(path, bitmap)
+
+        obstacle_map = load_obstacle_map(path, origin=(10, 20))
+
+        self.assertIn((11, 22), obstacle_map)
+        self.assertEqual(len(obstacle_map), 1)
+
+    def test_reload_when_file_changes(self):
+        path = os.path.join(self.directory.name, "obstacles.txt")
+        with open(path, "w") as file:
+            file.write("1,1\n")
+        obstacle_map = ObstacleMap()
+
+        with (
+            patch("obstacles.obstacle_map", obstacle_map),
+            patch("obstacles._loaded_mtime", None),
+        ):
+            reload_obstacles(path)
+            self.assertIn((1, 1), obstacle_map)
+
+            with open(path, "w") as file:
+                file.write("2,2\n")
+            os.utime(path, (0, obstacles._loaded_mtime + 1))
+            reload_obstacles(path)
+
+        self.assertNotIn((1, 1), obstacle_map)
+        self.assertIn((2, 2), obstacle_map)
@@ -0,0 +1,139 @@
+import random
+import unittest
+from collections import deque
+from unittest.mock import patch
+
+from exceptions import NoPathFound
+from models import Directions
+from obstacles import ObstacleMap
+from planner import _cached_detour, compress, plan_command, plan_detour, plan_path
+from simulation import HEADINGS, simulate_command
+
+
+def shortest_length(x, y, direction, target, obstacle_map, radius):
+    """Breadth-first search over the poses of a small square, as a reference."""
+    start = (x, y, HEADINGS.index(direction))
+    seen = {start: 0}
+    queue = deque([start])
+    while queue:
+        x, y, heading = queue.popleft()
+        if (x, y) == target:
+            return seen[(x, y, heading)]
+        dx, dy = [(0, 1), (1, 0), (0, -1), (-1, 0)][heading]
+        for pose in (
+            (x + dx, y + dy, heading),
+            (x - dx, y - dy, heading),
+            (x, y, (heading + 1) % 4),
+            (x, y, (heading - 1) % 4),
+        ):
+            px, py, _ = pose
+            if pose in seen or (px, py) in obstacle_map:
+                continue
+            if max(abs(px), abs(py)) > radius:
+                continue
+            seen[pose] = seen[(x, y, heading)] + 1
+            queue.append(pose)
+    return None
+
+
+class PlannerTests(unittest.TestCase):
+
+    def test_straight_lines(self):
+        obstacle_map = ObstacleMap()
+
+        self.assertEqual(
+            plan_command(0, 0, Directions.NORTH, 0, 5, None, obstacle_map), ("F5", 5)
+        )
+        self.assertEqual(
+            plan_command(0, 0, Directions.NORTH, 0, -3, None, obstacle_map), ("B3", 3)
+        )
+
+    def test_target_direction(self):
+        command, actions = plan_command(
+            0, 0, Directions.NORTH, 3, 0, Directions.WEST, ObstacleMap()
+        )
+
+        self.assertEqual((command, actions), ("LB3", 4))
+        command, actions = plan_command(
+            2, 2, Directions.NORTH, 2, 2, Directions.SOUTH, ObstacleMap()
+        )
+        self.assertEqual(actions, 2)
+        self.assertEqual(
+            simulate_command(command, 2, 2, Directions.NORTH, ObstacleMap()),
+            (2, 2, Directions.SOUTH, None),
+        )
+
+    def test_detour_is_collision_free_and_optimal(self):
+        rng = random.Random(1)
+        for _ in range(20):
+            obstacle_map = ObstacleMap.from_cells(
+                (rng.randint(-6, 6), rng.randint(-6, 6)) for _ in range(40)
+            )
+            target = (rng.randint(-5, 5), rng.randint(-5, 5))
+            if (0, 0) in obstacle_map or target in obstacle_map:
+                continue
+            expected = shortest_length(
+                0, 0, Directions.NORTH, target, obstacle_map, radius=30
+            )
+
+            try:
+                actions = plan_path(
+                    0, 0, Directions.NORTH, *target, None, obstacle_map, margin=20
+                )
+            except NoPathFound:
+                self.assertIsNone(expected)
+                continue
+
+            self.assertEqual(len(actions), expected)
+            x, y, _direction, collision = simulate_command(
+                compress(actions), 0, 0, Directions.NORTH, obstacle_map
+            )
+            self.assertEqual(((x, y), collision), (target, None))
+
+    def test_compress(self):
+        self.assertEqual(compress(list("FFFRBBL")), "F3RB2L")
+        self.assertEqual(compress([]), "")
+
+    def test_blocked_target(self):
+        obstacle_map = ObstacleMap.from_cells([(0, 3)])
+
+        with self.assertRaisesRegex(NoPathFound, "obstacle"):
+            plan_path(0, 0, Directions.NORTH, 0, 3, None, obstacle_map)
+
+    def test_enclosed_target(self):
+        walls = [(x, y) for x in range(-1, 2) for y in (4, 6)] + [(-1, 5), (1, 5)]
+
+        with self.assertRaisesRegex(NoPathFound, "unreachable"):
+            plan_path(0, 0, Directions.NORTH, 0, 5, None, ObstacleMap.from_cells(walls))
+
+    def test_search_limits(self):
+        with self.assertRaisesRegex(NoPathFound, "too far"):
+            plan_path(0, 0, Directions.NORTH, 10**6, 10**6, None, ObstacleMap())
+        with self.assertRaisesRegex(NoPathFound, "budget"):
+            plan_path(
+                0, 0, Directions.NORTH, 50, 50, None, ObstacleMap(), max_expansions=10
+            )
+
+
+class PlanDetourTests(unittest.TestCase):
+
+    def setUp(self):
+        self.obstacle_map = ObstacleMap.from_cells([(0, 2)])
+        patcher = patch("planner.obstacle_map", self.obstacle_map)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        _cached_detour.cache_clear()
+
+    def test_cached_until_the_map_is_reloaded(self):
+        pose = (0, 1, Directions.NORTH, 0, 3, Directions.NORTH)
+
+        self.assertEqual(len(plan_detour(*pose)), len(plan_detour(*pose)))
+        self.assertEqual(_cached_detour.cache_info().hits, 1)
+
+        self.obstacle_map.replace(ObstacleMap())
+        self.assertEqual(plan_detour(*pose), "F2")
+
+    def test_missing_path_is_cached(self):
+        self.assertIsNone(plan_detour(0, 1, Directions.NORTH, 0, 2, Directions.NORTH))
+        self.assertIsNone(plan_detour(0, 1, Directions.NORTH, 0, 2, Directions.NORTH))
+        self.assertEqual(_cached_detour.cache_info().hits, 1)
@@ -1,8 +1,11 @@
+import random
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
+from exceptions import ObstacleDetected
 from models import Action, ActionTypes, Directions
-from robot import Robot
+from robot import ACTION_CODES, TRANSITIONS, Robot
+from simulation import HEADINGS
 
 
 class RobotRotateLeftTests(unittest.TestCase):
@@ -10,6 +13,7 @@ class RobotRotateLeftTests(unittest.TestCase):
     def setUp(self):
         self.action = Mock(spec=Action)
         self.action.type = ActionTypes("L")
+        self.action.count = 1
 
     def test_rotate_left_north(self):
         robot = Robot(0, 0, Directions("N"))
@@ -37,26 +41,27 @@ class RobotRotateRightTests(unittest.TestCase):
     def setUp(self):
         self.action = Mock(spec=Action)
         self.action.type = ActionTypes("R")
+        self.action.count = 1
 
     def test_rotate_right_north(self):
         robot = Robot(0, 0, Directions("N"))
         robot.process_action(self.action)
-        self.assertEqual(robot._direction, Directions("E"))
+        self.assertEqual(robot.direction, Directions("E"))
 
     def test_rotate_right_east(self):
         robot = Robot(0, 0, Directions("E"))
         robot.process_action(self.action)
-        self.assertEqual(robot._direction, Directions("S"))
+        self.assertEqual(robot.direction, Directions("S"))
 
     def test_rotate_right_south(self):
         robot = Robot(0, 0, Directions("S"))
         robot.process_action(self.action)
-        self.assertEqual(robot._direction, Directions("W"))
+        self.assertEqual(robot.direction, Directions("W"))
 
     def test_rotate_right_west(self):
         robot = Robot(0, 0, Directions("W"))
         robot.process_action(self.action)
-        self.assertEqual(robot._direction, Directions("N"))
+        self.assertEqual(robot.direction, Directions("N"))
 
 
 class RobotMoveForwardTests(unittest.TestCase):
@@ -64,6 +69,7 @@ class RobotMoveForwardTests(unittest.TestCase):
     def setUp(self):
         self.action = Mock(spec=Action)
         self.action.type = ActionTypes("F")
+        self.action.count = 1
 
     def test_move_forward_north(self):
         robot = Robot(0, 0, Directions("N"))
@@ -99,31 +105,151 @@ class RobotMoveBackwardTests(unittest.TestCase):
     def setUp(self):
         self.action = Mock(spec=Action)
         self.action.type = ActionTypes("B")
+        self.action.count = 1
 
     def test_move_backward_north(self):
         robot = Robot(0, 0, Directions("N"))
         robot.process_action(self.action)
-        self.assertEqual(robot._direction, Directions("N"))
+        self.assertEqual(robot.direction, Directions("N"))
         self.assertEqual(robot._x, 0)
         self.assertEqual(robot._y, -1)
 
     def test_move_backward_east(self):
         robot = Robot(0, 0, Directions("E"))
         robot.process_action(self.action)
-        self.assertEqual(robot._direction, Directions("E"))
+        self.assertEqual(robot.direction, Directions("E"))
         self.assertEqual(robot._x, -1)
         self.assertEqual(robot._y, 0)
 
     def test_move_backward_south(self):
         robot = Robot(0, 0, Directions("S"))
         robot.process_action(self.action)
-        self.assertEqual(robot._direction, Directions("S"))
+        self.assertEqual(robot.direction, Directions("S"))
         self.assertEqual(robot._x, 0)
         self.assertEqual(robot._y, 1)
 
     def test_move_backward_west(self):
         robot = Robot(0, 0, Directions("W"))
         robot.process_action(self.action)
-        self.assertEqual(robot._direction, Directions("W"))
+        self.assertEqual(robot.direction, Directions("W"))
         self.assertEqual(robot._x, 1)
         self.assertEqual(robot._y, 0)
+
+
+class RobotRunTests(unittest.TestCase):
+
+    def make_action(self, action_type, count):
+        action = Mock(spec=Action)
+        action.type = ActionTypes(action_type)
+        action.count = count
+        return action
+
+    def test_move_forward_run(self):
+        robot = Robot(0, 0, Directions("N"))
+        robot.process_action(self.make_action("F", 5))
+        self.assertEqual((robot.x, robot.y), (0, 5))
+
+    def test_move_backward_run(self):
+        robot = Robot(0, 0, Directions("E"))
+        robot.process_action(self.make_action("B", 3))
+        self.assertEqual((robot.x, robot.y), (-3, 0))
+
+    def test_rotate_run(self):
+        robot = Robot(0, 0, Directions("N"))
+        robot.process_action(self.make_action("R", 7))
+        self.assertEqual(robot.direction, Directions("W"))
+
+    @patch("robot.obstacle_map", {(0, 4)})
+    def test_run_stops_before_obstacle(self):
+        robot = Robot(0, 0, Directions("N"))
+
+        with self.assertRaises(ObstacleDetected) as context:
+            robot.process_action(self.make_action("F", 10))
+
+        self.assertEqual(context.exception.steps, 3)
+        self.assertEqual((robot.x, robot.y), (0, 3))
+
+
+class RobotSimulateTests(unittest.TestCase):
+
+    def make_action(self, action_type):
+        action = Mock(spec=Action)
+        action.type = ActionTypes(action_type)
+        action.count = 1
+        return action
+
+    def test_simulate_returns_pose_per_action(self):
+        robot = Robot(0, 0, Directions("N"))
+
+        poses, error = robot.simulate([self.make_action(c) for c in "FRF"])
+
+        self.assertIsNone(error)
+        self.assertEqual(
+            poses,
+            [
+                (0, 1, Directions("N")),
+                (0, 1, Directions("E")),
+                (1, 1, Directions("E")),
+            ],
+        )
+
+    @patch("robot.obstacle_map", {(0, 2)})
+    def test_simulate_stops_at_first_failure(self):
+        robot = Robot(0, 0, Directions("N"))
+
+        poses, error = robot.simulate([self.make_action(c) for c in "FFFF"])
+
+        self.assertIsInstance(error, ObstacleDetected)
+        self.assertEqual(len(poses) - 1, 1)
+        self.assertEqual(poses[-1], (0, 1, Directions("N")))
+
+
+class RobotExecuteManyTests(unittest.TestCase):
+
+    def make_action(self, action_type, count=1):
+        action = Mock(spec=Action)
+        action.type = ActionTypes(action_type)
+        action.count = count
+        return action
+
+    def test_matches_process_action(self):
+        rng = random.Random(0)
+        actions = [
+            self.make_action(rng.choice("FFBLR"), rng.randint(1, 6)) for _ in range(200)
+        ]
+        robot = Robot(0, 0, Directions("N"))
+        for action in actions:
+            robot.process_action(action)
+
+        result = Robot(0, 0, Directions("N")).execute_many(actions)
+
+        self.assertEqual(result, (robot.x, robot.y, robot.direction, None))
+
+    @patch("robot.obstacle_map", {(2, 1)})
+    def test_stops_at_first_failure(self):
+        robot = Robot(0, 0, Directions("N"))
+        actions = [self.make_action(c, n) for c, n in [("F", 1), ("R", 5), ("F", 4)]]
+
+        result = robot.execute_many(actions + [self.make_action("L")])
+
+        self.assertEqual(result, (1, 1, Directions("E"), 2))
+        self.assertEqual((robot.x, robot.y, robot.direction), (1, 1, Directions("E")))
+
+    def test_unknown_action(self):
+        action = Mock(spec=Action, type="X", count=1)
+
+        result = Robot(0, 0, Directions("N")).execute_many([action])
+
+        self.assertEqual(result, (0, 0, Directions("N"), 0))
+
+    def test_transitions_follow_rotation_and_move_tables(self):
+        for heading, direction in enumerate(HEADINGS):
+            forward = TRANSITIONS[heading << 2 | ACTION_CODES[ActionTypes("F")]]
+            left = TRANSITIONS[heading << 2 | ACTION_CODES[ActionTypes("L")]]
+
+            self.assertEqual(forward[:2], tuple(Robot.MOVE_FORWARD[direction].values()))
+            self.assertEqual(HEADINGS[left[2]], Robot.LEFT_ROTATION[direction])
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Robot(0, 0, Directions("N")).speed = 1
@@ -0,0 +1,929 @@
+import asyncio
+import datetime
+import tracemalloc
+import unittest
+from contextlib import asynccontextmanager
+from itertools import cycle, islice
+from types import SimpleNamespace
+from unittest.mock import ANY, AsyncMock, MagicMock, Mock, call, patch
+from uuid import uuid4
+
+from archive import unpack_trajectory
+from exceptions import ObstacleDetected
+from models import Action, ActionTypes, Directions, Statuses
+from obstacles import ObstacleMap
+from planner import _cached_detour
+from robot import Robot
+from scheduler import (
+    QUEUE_DEPTH,
+    RobotExecutors,
+    _action_rows,
+    _process_actions_batched,
+    _process_actions_durable,
+    _process_robot_actions,
+    _queued_actions_query,
+    parse_commands,
+    pipeline_worker,
+    process_actions,
+    update_queue_depth,
+)
+from settings import DEFAULT_ROBOT_ID, REQUEST_ID
+from sqlalchemy.dialects.postgresql import dialect as postgresql_dialect
+from sqlalchemy.sql.dml import Insert, Update
+
+dialect = postgresql_dialect()
+
+
+def session_factory(session):
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+
+class StreamedResult:
+    """Stands in for the AsyncResult of a query streamed with yield_per."""
+
+    def __init__(self, rows, size):
+        self.rows = iter(rows)
+        self.size = size
+        self.close = AsyncMock()
+
+    async def partitions(self):
+        while chunk := list(islice(self.rows, self.size)):
+            yield chunk
+
+
+def advisory_lock(acquired=True):
+    @asynccontextmanager
+    async def lock(*_keys):
+        yield acquired
+
+    return lock
+
+
+class ActionRowsTests(unittest.TestCase):
+
+    def test_rows_follow_command_order(self):
+        first = SimpleNamespace(
+            id=uuid4(),
+            robot_id="rover-1",
+            command="FL",
+            created=datetime.datetime(2024, 12, 1),
+            position=1,
+        )
+        second = SimpleNamespace(
+            id=uuid4(),
+            robot_id="rover-2",
+            command="B",
+            created=datetime.datetime(2024, 12, 2),
+            position=2,
+        )
+        created = datetime.datetime(2025, 1, 1)
+
+        rows = list(_action_rows([first, second], created))
+
+        self.assertEqual(
+            [(row["command_id"], row["robot_id"], row["type"]) for row in rows],
+            [
+                (first.id, "rover-1", ActionTypes.MOVE_FORWARD),
+                (first.id, "rover-1", ActionTypes.ROTATE_LEFT),
+                (second.id, "rover-2", ActionTypes.MOVE_BACKWARD),
+            ],
+        )
+        self.assertEqual(
+            [row["command_created"] for row in rows],
+            [first.created, first.created, second.created],
+        )
+        self.assertEqual([row["command_position"] for row in rows], [1, 1, 2])
+        timestamps = [row["created"] for row in rows]
+        self.assertEqual(timestamps[0], created)
+        self.assertEqual(timestamps, sorted(set(timestamps)))
+
+    def test_compact_rows_collapse_runs(self):
+        command = SimpleNamespace(
+            id=uuid4(),
+            robot_id="rover-1",
+            command="FFF3RR1F",
+            created=datetime.datetime.now(),
+            position=1,
+        )
+
+        rows = list(_action_rows([command], datetime.datetime.now(), compact=True))
+
+        self.assertEqual(
+            [(row["type"].value, row["count"]) for row in rows],
+            [("F", 5), ("R", 2), ("F", 1)],
+        )
+
+    def test_compact_rows_merge_groups(self):
+        command = SimpleNamespace(
+            id=uuid4(),
+            robot_id="rover-1",
+            command="F (F)4 R2 F",
+            created=datetime.datetime.now(),
+            position=1,
+        )
+
+        rows = list(_action_rows([command], datetime.datetime.now(), compact=True))
+
+        self.assertEqual(
+            [(row["type"].value, row["count"]) for row in rows],
+            [("F", 5), ("R", 2), ("F", 1)],
+        )
+
+    def test_repeat_counts_expand_without_compaction(self):
+        command = SimpleNamespace(
+            id=uuid4(),
+            robot_id="rover-1",
+            command="F3R",
+            created=datetime.datetime.now(),
+            position=1,
+        )
+
+        rows = list(_action_rows([command], datetime.datetime.now()))
+
+        self.assertEqual(
+            [(row["type"].value, row["count"]) for row in rows],
+            [("F", 1), ("F", 1), ("F", 1), ("R", 1)],
+        )
+
+
+class ParseCommandsTests(unittest.IsolatedAsyncioTestCase):
+
+    @patch("scheduler.PARSE_INSERT_CHUNK_SIZE", 2)
+    async def test_bulk_inserts_in_chunks(self):
+        commands = [
+            SimpleNamespace(
+                id=uuid4(),
+                robot_id="rover-1",
+                command="FFF",
+                created=datetime.datetime.now(),
+                position=1,
+            ),
+            SimpleNamespace(
+                id=uuid4(),
+                robot_id="rover-1",
+                command="RB",
+                created=datetime.datetime.now(),
+                position=2,
+            ),
+        ]
+        batches = [commands, []]
+        inserted = []
+        updates = []
+
+        async def execute(statement, params=None):
+            if isinstance(statement, Insert):
+                inserted.append(params)
+            elif isinstance(statement, Update):
+                updates.append(statement)
+            else:
+                return Mock(all=Mock(return_value=batches.pop(0)))
+
+        session = Mock(execute=AsyncMock(side_effect=execute), commit=AsyncMock())
+
+        with patch("scheduler.async_sessionmaker", session_factory(session)):
+            await parse_commands()
+
+        self.assertEqual([len(chunk) for chunk in inserted], [2, 2, 1])
+        claim = str(session.execute.await_args_list[0].args[0].compile(dialect=dialect))
+        self.assertIn("FOR UPDATE SKIP LOCKED", claim)
+        self.assertEqual(len(updates), 1)
+        session.commit.assert_awaited_once()
+
+    async def test_quarantines_invalid_commands(self):
+        valid = SimpleNamespace(
+            id=uuid4(),
+            robot_id="rover-1",
+            command="F2",
+            created=datetime.datetime.now(),
+            position=1,
+        )
+        invalid = SimpleNamespace(
+            id=uuid4(),
+            robot_id="rover-1",
+            command="FXF",
+            created=datetime.datetime.now(),
+            position=1,
+        )
+        batches = [[invalid, valid], []]
+        inserted = []
+        updates = []
+
+        async def execute(statement, params=None):
+            if isinstance(statement, Insert):
+                inserted.extend(params)
+            elif isinstance(statement, Update):
+                updates.append(statement.compile(dialect=dialect).params)
+            else:
+                return Mock(all=Mock(return_value=batches.pop(0)))
+
+        session = Mock(execute=AsyncMock(side_effect=execute), commit=AsyncMock())
+
+        with (
+            patch("scheduler.async_sessionmaker", session_factory(session)),
+            self.assertLogs("worker_logger", level="ERROR"),
+        ):
+            await parse_commands()
+
+        self.assertEqual({row["command_id"] for row in inserted}, {valid.id})
+        self.assertEqual(
+            [(params["status"], params["id_1"]) for params in updates],
+            [(Statuses.COMPLETED, [valid.id]), (Statuses.FAILED, [invalid.id])],
+        )
+
+
+class QueueDepthTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_reports_every_status(self):
+        counts = [
+            [(Statuses.QUEUED, 3), (Statuses.FAILED, 1)],
+            [(Statuses.QUEUED, 7), (Statuses.RUNNING, 1), (Statuses.COMPLETED, 5)],
+        ]
+        session = Mock(
+            execute=AsyncMock(
+                side_effect=[Mock(all=Mock(return_value=rows)) for rows in counts]
+            )
+        )
+
+        with patch("scheduler.async_sessionmaker", session_factory(session)):
+            await update_queue_depth()
+
+        query = str(session.execute.await_args_list[1].args[0].compile(dialect=dialect))
+        self.assertIn("GROUP BY actions.status", query)
+        samples = set(QUEUE_DEPTH.samples())
+        self.assertIn(
+            'scheduler_queue_depth{table="commands",status="QUEUED"} 3', samples
+        )
+        self.assertIn(
+            'scheduler_queue_depth{table="commands",status="RUNNING"} 0', samples
+        )
+        self.assertIn(
+            'scheduler_queue_depth{table="actions",status="QUEUED"} 7', samples
+        )
+        self.assertIn(
+            'scheduler_queue_depth{table="actions",status="COMPLETED"} 5', samples
+        )
+
+
+class PipelineWorkerTests(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.executors = Mock()
+        robots = Mock(all=Mock(return_value=["rover-1", "rover-2"]))
+        result = Mock(scalars=Mock(return_value=robots))
+        session = Mock(execute=AsyncMock(return_value=result))
+        patcher = patch("scheduler.async_sessionmaker", session_factory(session))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _run_worker(self, wake_up, request_ids=None):
+        task = asyncio.create_task(
+            pipeline_worker(wake_up, self.executors, request_ids)
+        )
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+    @patch("scheduler.parse_commands", new_callable=AsyncMock)
+    async def test_parses_then_wakes_robots_on_wake_up(self, mock_parse):
+        wake_up = asyncio.Event()
+        wake_up.set()
+
+        await self._run_worker(wake_up)
+
+        mock_parse.assert_awaited_once()
+        self.assertEqual(
+            self.executors.wake.call_args_list,
+            [call("rover-1", set()), call("rover-2", set())],
+        )
+        self.assertFalse(wake_up.is_set())
+
+    @patch("scheduler.parse_commands", new_callable=AsyncMock)
+    async def test_idle_without_wake_up(self, mock_parse):
+        await self._run_worker(asyncio.Event())
+
+        mock_parse.assert_not_awaited()
+        self.executors.wake.assert_not_called()
+
+    @patch("scheduler.parse_commands", new_callable=AsyncMock)
+    async def test_survives_pipeline_errors(self, mock_parse):
+        wake_up = asyncio.Event()
+        mock_parse.side_effect = [RuntimeError("boom"), None]
+
+        async def wake_twice():
+            wake_up.set()
+            await asyncio.sleep(0.001)
+            wake_up.set()
+
+        with self.assertLogs("worker_logger", level="ERROR"):
+            await asyncio.gather(wake_twice(), self._run_worker(wake_up))
+
+        self.assertEqual(mock_parse.await_count, 2)
+
+    @patch("scheduler.parse_commands", new_callable=AsyncMock)
+    async def test_logs_carry_waking_request_ids(self, mock_parse):
+        seen = []
+        mock_parse.side_effect = lambda: seen.append(REQUEST_ID.get())
+        wake_up = asyncio.Event()
+        wake_up.set()
+        request_ids = {"b", "a", "e", "c", "d"}
+
+        await self._run_worker(wake_up, request_ids)
+
+        self.assertEqual(seen, ["a,b,c,+2"])
+        self.assertEqual(request_ids, set())
+        self.executors.wake.assert_any_call("rover-1", {"a", "b", "c", "d", "e"})
+
+    @patch("scheduler.parse_commands", new_callable=AsyncMock)
+    async def test_parsing_does_not_wait_for_execution(self, mock_parse):
+        released = asyncio.Event()
+        self.executors = RobotExecutors(mode="durable")
+        self.addAsyncCleanup(self.executors.close)
+        wake_up = asyncio.Event()
+
+        async def wake_twice():
+            wake_up.set()
+            await asyncio.sleep(0.001)
+            wake_up.set()
+
+        async def process(robot_id, mode):
+            await released.wait()
+
+        with patch("scheduler._process_robot_actions", side_effect=process) as mock:
+            await asyncio.gather(wake_twice(), self._run_worker(wake_up))
+
+        self.assertEqual(mock_parse.await_count, 2)
+        self.assertEqual(mock.await_count, 2)
+        self.assertFalse(released.is_set())
+
+
+class RobotExecutorsTests(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.executors = RobotExecutors(mode="durable")
+        self.addAsyncCleanup(self.executors.close)
+
+    async def test_slow_robot_does_not_delay_others(self):
+        released = asyncio.Event()
+        processed = []
+
+        async def process(robot_id, mode):
+            if robot_id == "slow":
+                await released.wait()
+            processed.append(robot_id)
+
+        with patch("scheduler._process_robot_actions", side_effect=process):
+            self.executors.wake("slow")
+            self.executors.wake("fast")
+            await asyncio.sleep(0.01)
+            self.assertEqual(processed, ["fast"])
+
+            released.set()
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(processed, ["fast", "slow"])
+
+    async def test_wake_ups_during_a_run_are_coalesced(self):
+        released = asyncio.Event()
+
+        async def process(robot_id, mode):
+            await released.wait()
+
+        with patch("scheduler._process_robot_actions", side_effect=process) as mock:
+            self.executors.wake("rover-1")
+            await asyncio.sleep(0.001)
+            self.executors.wake("rover-1")
+            self.executors.wake("rover-1")
+            released.set()
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(mock.await_count, 2)
+        self.assertEqual(list(self.executors.tasks), ["rover-1"])
+
+    @patch("scheduler.EXECUTOR_CONCURRENCY", 2)
+    async def test_robots_run_concurrently_up_to_limit(self):
+        executors = RobotExecutors(mode="batched")
+        self.addAsyncCleanup(executors.close)
+        running = []
+        peak = 0
+
+        async def process(robot_id, mode):
+            nonlocal peak
+            running.append(robot_id)
+            peak = max(peak, len(running))
+            await asyncio.sleep(0.001)
+            running.remove(robot_id)
+
+        with patch("scheduler._process_robot_actions", side_effect=process) as mock:
+            for robot_id in "abcd":
+                executors.wake(robot_id)
+            await asyncio.sleep(0.02)
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(
+            sorted(c.args for c in mock.await_args_list),
+            [(r, "batched") for r in "abcd"],
+        )
+
+    async def test_survives_robot_errors(self):
+        with (
+            patch(
+                "scheduler._process_robot_actions",
+                side_effect=[RuntimeError("boom"), None],
+            ) as mock,
+            self.assertLogs("worker_logger", level="ERROR"),
+        ):
+            self.executors.wake("rover-1")
+            await asyncio.sleep(0.001)
+            self.executors.wake("rover-1")
+            await asyncio.sleep(0.001)
+
+        self.assertEqual(mock.await_count, 2)
+
+    async def test_logs_carry_waking_request_ids(self):
+        seen = []
+
+        async def process(robot_id, mode):
+            seen.append(REQUEST_ID.get())
+
+        with patch("scheduler._process_robot_actions", side_effect=process):
+            token = REQUEST_ID.set("parse-run")
+            self.executors.wake("rover-1", {"a", "b"})
+            REQUEST_ID.reset(token)
+            await asyncio.sleep(0.001)
+            self.executors.wake("rover-1")
+            await asyncio.sleep(0.001)
+
+        self.assertEqual(seen, ["a,b", REQUEST_ID.get()])
+
+    def test_unknown_mode(self):
+        with self.assertRaisesRegex(ValueError, "batch"):
+            RobotExecutors(mode="batch")
+
+
+class ProcessActionsBatchedTests(unittest.IsolatedAsyncioTestCase):
+
+    def make_session(self, actions):
+        self.bulk_updates = []
+        self.withdrawals = []
+        robots = Mock(all=Mock(return_value=[DEFAULT_ROBOT_ID]))
+
+        async def execute(statement, params=None):
+            if isinstance(statement, Update) and params is not None:
+                self.bulk_updates.append(params)
+            elif isinstance(statement, Update):
+                self.withdrawals.append(statement)
+            else:
+                return Mock(scalars=Mock(return_value=robots))
+
+        return Mock(
+            execute=AsyncMock(side_effect=execute),
+            stream=AsyncMock(return_value=StreamedResult(actions, 3)),
+            commit=AsyncMock(),
+        )
+
+    def make_actions(self, command):
+        return [
+            SimpleNamespace(
+                id=uuid4(),
+                created=datetime.datetime(2026, 10, 18),
+                command_id=self.command_id,
+                type=ActionTypes(action),
+                count=1,
+            )
+            for action in command
+        ]
+
+    def setUp(self):
+        self.command_id = uuid4()
+        self.save_robot_state = AsyncMock()
+        patcher = patch("scheduler.store_trajectories", new_callable=AsyncMock)
+        self.store_trajectories = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def run_batched(self, session):
+        position = (0, 0, Directions.NORTH, Statuses.COMPLETED, None)
+        with (
+            patch("scheduler.async_sessionmaker", session_factory(session)),
+            patch("scheduler.get_current_position", AsyncMock(return_value=position)),
+            patch("scheduler.save_robot_state", self.save_robot_state),
+            patch("scheduler.advisory_lock", advisory_lock()),
+        ):
+            await process_actions(mode="batched")
+
+    async def test_writes_results_in_bulk_updates(self):
+        actions = self.make_actions("FFRF")
+        session = self.make_session(actions)
+
+        await self.run_batched(session)
+
+        self.assertEqual([len(rows) for rows in self.bulk_updates], [3, 1])
+        rows = [row for chunk in self.bulk_updates for row in chunk]
+        # Both primary key columns, as actions are partitioned by `created`.
+        self.assertEqual(
+            [(row["id"], row["created"]) for row in rows],
+            [(a.id, a.created) for a in actions],
+        )
+        self.assertTrue(all(row["status"] == Statuses.COMPLETED for row in rows))
+        self.assertEqual((rows[-1]["x_coord"], rows[-1]["y_coord"]), (1, 2))
+        updated = [row["updated"] for row in rows]
+        self.assertEqual(updated, sorted(set(updated)))
+        self.assertEqual(self.withdrawals, [])
+        self.save_robot_state.assert_awaited_once_with(
+            session,
+            DEFAULT_ROBOT_ID,
+            1,
+            2,
+            Directions.EAST,
+            Statuses.COMPLETED,
+            self.command_id,
+        )
+        self.store_trajectories.assert_awaited_once_with(session, [self.command_id])
+        session.commit.assert_awaited_once()
+
+    @patch("robot.obstacle_map", {(0, 2)})
+    async def test_failure_withdraws_remaining_queue(self):
+        actions = self.make_actions("FFFF")
+        session = self.make_session(actions)
+
+        await self.run_batched(session)
+
+        rows = [row for chunk in self.bulk_updates for row in chunk]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[-1]["status"], Statuses.FAILED)
+        self.assertEqual(len(self.withdrawals), 2)
+        self.save_robot_state.assert_awaited_once_with(
+            session,
+            DEFAULT_ROBOT_ID,
+            0,
+            1,
+            Directions.NORTH,
+            Statuses.FAILED,
+            self.command_id,
+        )
+        self.store_trajectories.assert_awaited_once_with(session, [self.command_id])
+        session.commit.assert_awaited_once()
+
+
+class ObstacleRecoveryTests(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.command_id = uuid4()
+        self.save_robot_state = AsyncMock()
+        self.inserts = []
+        obstacle_map = ObstacleMap.from_cells([(0, 2)])
+        for patcher in (
+            patch("scheduler.OBSTACLE_RECOVERY", "replan"),
+            patch("robot.obstacle_map", obstacle_map),
+            patch("scheduler.obstacle_map", obstacle_map),
+            patch("planner.obstacle_map", obstacle_map),
+            patch("scheduler.save_robot_state", self.save_robot_state),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch("scheduler.store_trajectories", new_callable=AsyncMock)
+        self.store_trajectories = patcher.start()
+        self.addCleanup(patcher.stop)
+        _cached_detour.cache_clear()
+        self.submitted = datetime.datetime(2026, 10, 18, 12)
+
+    def make_actions(self, command, command_id=None):
+        return [
+            SimpleNamespace(
+                id=uuid4(),
+                created=datetime.datetime(2026, 10, 18),
+                command_id=command_id or self.command_id,
+                type=ActionTypes(action),
+                count=1,
+                status=Statuses.QUEUED,
+            )
+            for action in command
+        ]
+
+    async def execute(self, statement, params=None):
+        if isinstance(statement, Insert):
+            self.inserts.append((statement, params))
+        elif isinstance(statement, Update) and params is not None:
+            self.bulk_updates.extend(params)
+
+    def assert_detour(self, robot, command_id=None):
+        self.assertEqual((robot.x, robot.y, robot.direction), (0, 4, Directions.NORTH))
+        command = self.inserts[0][0].compile().params
+        self.assertEqual(command["status"], Statuses.COMPLETED)
+        # Listed right after the blocked command, by the position assigned on insert.
+        self.assertEqual(command["created"], self.submitted)
+        self.assertNotIn("position", command)
+        detour = self.inserts[1][1]
+        self.assertEqual(len(detour), 8)
+        self.assertEqual(
+            unpack_trajectory(command["trajectory"])["y"].tolist(),
+            [row["y_coord"] for row in detour],
+        )
+        self.assertEqual(
+            (detour[-1]["x_coord"], detour[-1]["y_coord"], detour[-1]["direction"]),
+            (0, 3, Directions.NORTH),
+        )
+        self.assertTrue(all(row["status"] == Statuses.COMPLETED for row in detour))
+        self.save_robot_state.assert_awaited_with(
+            ANY,
+            DEFAULT_ROBOT_ID,
+            0,
+            4,
+            Directions.NORTH,
+            Statuses.COMPLETED,
+            command_id or self.command_id,
+        )
+
+    async def test_batched_detour_rejoins_queue(self):
+        self.bulk_updates = []
+        actions = self.make_actions("FFFF")
+        session = Mock(
+            execute=AsyncMock(side_effect=self.execute),
+            scalar=AsyncMock(return_value=self.submitted),
+            stream=AsyncMock(return_value=StreamedResult(actions, 10)),
+            commit=AsyncMock(),
+        )
+        robot = Robot(0, 0, Directions.NORTH)
+
+        await _process_actions_batched(session, DEFAULT_ROBOT_ID, robot)
+
+        # The blocked action and the one ending on the obstacle made no step.
+        self.assertEqual([row["count"] for row in self.bulk_updates], [1, 0, 0, 1])
+        self.assertEqual(
+            (self.bulk_updates[2]["x_coord"], self.bulk_updates[2]["y_coord"]), (0, 1)
+        )
+        self.assert_detour(robot)
+        session.commit.assert_awaited_once()
+
+    async def test_durable_detour_rejoins_queue(self):
+        # The detour replaces the second action of the first command and the first
+        # action of the next one.
+        next_command_id = uuid4()
+        actions = self.make_actions("FF") + self.make_actions("FF", next_command_id)
+        chunks = [actions, []]
+
+        async def execute(statement, params=None):
+            if isinstance(statement, Insert):
+                return await self.execute(statement, params)
+            return Mock(
+                scalars=Mock(return_value=Mock(all=Mock(return_value=chunks.pop(0))))
+            )
+
+        session = Mock(
+            execute=AsyncMock(side_effect=execute),
+            scalar=AsyncMock(return_value=self.submitted),
+            commit=AsyncMock(),
+            expunge_all=Mock(),
+        )
+        robot = Robot(0, 0, Directions.NORTH)
+
+        await _process_actions_durable(session, DEFAULT_ROBOT_ID, robot)
+
+        self.assertTrue(all(a.status == Statuses.COMPLETED for a in actions))
+        self.assertEqual([a.count for a in actions], [1, 0, 0, 1])
+        # Each command's path joins the detour's without a jump.
+        self.assertEqual(
+            [(a.x_coord, a.y_coord) for a in actions[1:3]], [(0, 1), (0, 3)]
+        )
+        self.assert_detour(robot, next_command_id)
+        # Each command's trajectory is stored with its last action.
+        self.assertEqual(
+            [c.args[1] for c in self.store_trajectories.await_args_list],
+            [[self.command_id], [next_command_id]],
+        )
+
+    async def test_withdraws_without_free_pose(self):
+        self.bulk_updates = []
+        actions = self.make_actions("FF")
+        session = Mock(
+            execute=AsyncMock(side_effect=self.execute),
+            stream=AsyncMock(return_value=StreamedResult(actions, 10)),
+            commit=AsyncMock(),
+        )
+        robot = Robot(0, 0, Directions.NORTH)
+
+        with (
+            patch("robot.obstacle_map", ObstacleMap.from_cells([(0, 1), (0, 2)])),
+            patch("scheduler.obstacle_map", ObstacleMap.from_cells([(0, 1), (0, 2)])),
+            self.assertRaises(ObstacleDetected),
+        ):
+            await _process_actions_batched(session, DEFAULT_ROBOT_ID, robot)
+
+        self.assertEqual(self.bulk_updates[0]["status"], Statuses.FAILED)
+        self.assertEqual(self.inserts, [])
+
+
+class StreamingExecutionTests(unittest.IsolatedAsyncioTestCase):
+
+    def make_actions(self, count):
+        command_id = uuid4()
+        return (
+            SimpleNamespace(
+                id=uuid4(),
+                created=None,
+                command_id=command_id,
+                type=ActionTypes(action),
+                count=1,
+                status=Statuses.QUEUED,
+            )
+            for action in islice(cycle("FBLR"), count)
+        )
+
+    def setUp(self):
+        patcher = patch("scheduler.store_trajectories", new_callable=AsyncMock)
+        self.store_trajectories = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def run_batched(self, actions):
+        async def execute(statement, params=None):
+            pass  # Unlike an AsyncMock, does not keep the rows alive.
+
+        session = Mock(
+            execute=execute,
+            stream=AsyncMock(return_value=StreamedResult(actions, 1000)),
+            commit=AsyncMock(),
+        )
+        robot = Robot(0, 0, Directions.NORTH)
+        with patch("scheduler.save_robot_state", AsyncMock()):
+            await _process_actions_batched(session, DEFAULT_ROBOT_ID, robot)
+        return session
+
+    async def peak_memory(self, count):
+        tracemalloc.start()
+        try:
+            await self.run_batched(self.make_actions(count))
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    async def test_batched_memory_does_not_grow_with_queue(self):
+        small = await self.peak_memory(2_000)
+        large = await self.peak_memory(20_000)
+
+        self.assertLess(large, small * 1.5)
+
+    async def test_batched_streams_with_yield_per(self):
+        session = await self.run_batched(self.make_actions(10))
+
+        query = session.stream.await_args.args[0]
+        self.assertEqual(query.get_execution_options()["yield_per"], 1000)
+        session.stream.return_value.close.assert_awaited_once()
+        session.commit.assert_awaited_once()
+
+    @patch("scheduler.EXECUTION_CHUNK_SIZE", 2)
+    async def test_durable_loads_actions_in_chunks(self):
+        actions = list(self.make_actions(5))
+        # Each chunk is read with the first Action of the next one.
+        chunks = [actions[0:3], actions[2:5], actions[4:], []]
+        queries = []
+
+        async def execute(statement, params=None):
+            queries.append(statement)
+            return Mock(
+                scalars=Mock(return_value=Mock(all=Mock(return_value=chunks.pop(0))))
+            )
+
+        session = Mock(
+            execute=AsyncMock(side_effect=execute),
+            commit=AsyncMock(),
+            expunge_all=Mock(),
+        )
+        robot = Robot(0, 0, Directions.NORTH)
+        with patch("scheduler.save_robot_state", AsyncMock()):
+            await _process_actions_durable(session, DEFAULT_ROBOT_ID, robot)
+
+        self.assertTrue(all(a.status == Statuses.COMPLETED for a in actions))
+        self.assertEqual(len(queries), 4)
+        self.assertTrue(all(query._limit == 3 for query in queries))
+        self.assertEqual(session.expunge_all.call_count, 3)
+        # The Command only ends with the last Action, not with the first chunks.
+        self.store_trajectories.assert_awaited_once_with(
+            session, [actions[0].command_id]
+        )
+
+
+class ProcessActionsFleetTests(unittest.IsolatedAsyncioTestCase):
+
+    def make_session(self, robot_ids):
+        robots = Mock(all=Mock(return_value=robot_ids))
+        result = Mock(scalars=Mock(return_value=robots))
+        return Mock(execute=AsyncMock(return_value=result))
+
+    @patch("scheduler.EXECUTOR_CONCURRENCY", 2)
+    async def test_robots_run_concurrently_up_to_limit(self):
+        running = []
+        peak = 0
+
+        async def process(robot_id, mode):
+            nonlocal peak
+            running.append(robot_id)
+            peak = max(peak, len(running))
+            await asyncio.sleep(0.001)
+            running.remove(robot_id)
+
+        session = self.make_session(["a", "b", "c", "d"])
+        with (
+            patch("scheduler.async_sessionmaker", session_factory(session)),
+            patch("scheduler._process_robot_actions", side_effect=process) as mock,
+        ):
+            await process_actions(mode="batched")
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(
+            sorted(c.args for c in mock.await_args_list),
+            [(r, "batched") for r in "abcd"],
+        )
+
+    async def test_failing_robot_does_not_stop_the_fleet(self):
+        processed = []
+
+        async def process(robot_id, mode):
+            if robot_id == "a":
+                raise RuntimeError("boom")
+            processed.append(robot_id)
+
+        session = self.make_session(["a", "b"])
+        with (
+            patch("scheduler.async_sessionmaker", session_factory(session)),
+            patch("scheduler._process_robot_actions", side_effect=process),
+            self.assertLogs("worker_logger", level="ERROR"),
+        ):
+            await process_actions()
+
+        self.assertEqual(processed, ["b"])
+
+    async def test_unknown_mode(self):
+        with (
+            patch("scheduler._process_robot_actions") as mock,
+            self.assertRaisesRegex(ValueError, "batch"),
+        ):
+            await process_actions(mode="batch")
+
+        mock.assert_not_called()
+
+
+class ProcessActionsLockTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_skips_without_executor_lock(self):
+        factory = Mock()
+
+        with (
+            patch("scheduler.advisory_lock", advisory_lock(acquired=False)),
+            patch("scheduler.async_sessionmaker", factory),
+        ):
+            await _process_robot_actions("rover-1", "durable")
+
+        factory.assert_not_called()
+
+    def test_waits_for_older_commands_to_be_parsed(self):
+        query = _queued_actions_query("rover-1", Action)
+        query = str(query.compile(dialect=dialect))
+
+        self.assertIn("min(commands.created)", query)
+        self.assertIn("commands.robot_id = ", query)
+        self.assertIn("actions.command_created < coalesce(", query)
+        self.assertNotIn("JOIN", query)
+        self.assertIn(
+            "ORDER BY actions.command_created ASC, actions.command_position ASC, "
+            "actions.created ASC, actions.id ASC",
+            query,
+        )
+
+    def test_older_command_parsed_later_runs_first(self):
+        submitted = datetime.datetime(2026, 10, 1, 12)
+        step = datetime.timedelta(microseconds=1)
+        minute = datetime.timedelta(minutes=1)
+        # Newer commands are parsed before the older one. "tied" shares the older
+        # command's creation time and only follows it by position.
+        batches = [
+            ("older", submitted, 1, submitted + 3 * minute),
+            ("tied", submitted, 2, submitted + 2 * minute),
+            ("newer", submitted + step, 3, submitted + minute),
+        ]
+        rows = [
+            {
+                "actions.command_created": created,
+                "actions.command_position": position,
+                "actions.created": parsed + index * step,
+                "actions.id": uuid4(),
+                "name": f"{name}-{index}",
+            }
+            for name, created, position, parsed in batches
+            for index in range(2)
+        ]
+        order = _queued_actions_query("rover-1", Action)._order_by_clauses
+
+        rows.sort(
+            key=lambda row: [
+                row[f"{clause.element.table.name}.{clause.element.name}"]
+                for clause in order
+            ]
+        )
+
+        self.assertEqual(
+            [row["name"] for row in rows],
+            ["older-0", "older-1", "tied-0", "tied-1", "newer-0", "newer-1"],
+        )
@@ -0,0 +1,81 @@
+import random
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from exceptions import UnknownAction
+from models import ActionTypes, Directions
+from obstacles import ObstacleMap
+from robot import Robot
+from simulation import simulate_command
+
+
+class SimulateCommandTests(unittest.TestCase):
+
+    def test_empty_command(self):
+        result = simulate_command("", 4, 2, Directions("W"), ObstacleMap())
+        self.assertEqual(result, (4, 2, Directions("W"), None))
+
+    def test_moves_and_rotations(self):
+        result = simulate_command("FFRFFLB", 0, 0, Directions("N"), ObstacleMap())
+        self.assertEqual(result, (2, 1, Directions("N"), None))
+
+    def test_collision(self):
+        obstacle_map = ObstacleMap.from_cells([(1, 4)])
+
+        result = simulate_command("FFFRFF", 4, 2, Directions("W"), obstacle_map)
+
+        self.assertEqual(result, (1, 3, Directions("N"), 5))
+
+    def test_collision_on_first_action(self):
+        obstacle_map = ObstacleMap.from_cells([(0, 1)])
+
+        result = simulate_command("FF", 0, 0, Directions("N"), obstacle_map)
+
+        self.assertEqual(result, (0, 0, Directions("N"), 0))
+
+    def test_repeat_counts(self):
+        obstacle_map = ObstacleMap.from_cells([(1, 4)])
+
+        result = simulate_command("F3RF2", 4, 2, Directions("W"), obstacle_map)
+
+        self.assertEqual(result, (1, 3, Directions("N"), 5))
+
+    def test_groups(self):
+        result = simulate_command(
+            "(F R)2 (L)2 F2", 0, 0, Directions("N"), ObstacleMap()
+        )
+
+        self.assertEqual(result, (1, 3, Directions("N"), None))
+
+    def test_invalid_repeat_count(self):
+        with self.assertRaises(UnknownAction):
+            simulate_command("F0", 0, 0, Directions("N"), ObstacleMap())
+
+    def test_unknown_action(self):
+        with self.assertRaises(UnknownAction):
+            simulate_command("FFX", 0, 0, Directions("N"), ObstacleMap())
+
+    def test_matches_robot(self):
+        rng = random.Random(7)
+        cells = {(rng.randint(-15, 15), rng.randint(-15, 15)) for _ in range(60)}
+        cells.discard((0, 0))
+        obstacle_map = ObstacleMap.from_cells(cells)
+
+        for _ in range(100):
+            command = "".join(rng.choices("FFFBLR", k=rng.randint(1, 80)))
+            with patch("robot.obstacle_map", obstacle_map):
+                robot = Robot(0, 0, Directions("N"))
+                poses, error = robot.simulate(
+                    [SimpleNamespace(type=ActionTypes(a), count=1) for a in command]
+                )
+            expected = (
+                robot.x,
+                robot.y,
+                robot.direction,
+                len(poses) - 1 if error else None,
+            )
+
+            result = simulate_command(command, 0, 0, Directions("N"), obstacle_map)
+
+            self.assertEqual(result, expected, command)
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+from uuid import uuid4
+
+from models import Directions, Statuses
+from streams import StateBroadcaster, sse_events
+from utils import encode_state
+
+
+class StateBroadcasterTests(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.broadcaster = StateBroadcaster()
+
+    async def test_fans_out_to_robot_subscribers(self):
+        first = self.broadcaster.subscribe("rover-1")
+        second = self.broadcaster.subscribe("rover-1")
+        other = self.broadcaster.subscribe("rover-2")
+        command_id = uuid4()
+
+        self.broadcaster.publish(
+            encode_state("rover-1", 1, 2, Directions.EAST, Statuses.RUNNING, command_id)
+        )
+
+        message = json.loads(first.get_nowait())
+        self.assertEqual(message["x"], 1)
+        self.assertEqual(message["command_id"], str(command_id))
+        self.assertEqual(json.loads(second.get_nowait()), message)
+        self.assertTrue(other.empty())
+
+    async def test_slow_subscriber_keeps_latest_state(self):
+        queue = self.broadcaster.subscribe("rover-1")
+
+        for x in range(3):
+            self.broadcaster.publish(
+                encode_state("rover-1", x, 0, Directions.EAST, Statuses.RUNNING, None)
+            )
+
+        self.assertEqual(queue.qsize(), 1)
+        self.assertEqual(json.loads(queue.get_nowait())["x"], 2)
+
+    async def test_unsubscribe(self):
+        queue = self.broadcaster.subscribe("rover-1")
+
+        self.broadcaster.unsubscribe("rover-1", queue)
+
+        self.assertEqual(len(self.broadcaster), 0)
+
+
+class SseEventsTests(unittest.IsolatedAsyncioTestCase):
+
+    @patch("streams.STREAM_KEEPALIVE_INTERVAL", 0.001)
+    async def test_sends_initial_state_updates_and_keep_alives(self):
+        broadcaster = StateBroadcaster()
+        queue = broadcaster.subscribe("rover-1")
+        queue.put_nowait('{"x": 1}')
+
+        with patch("streams.state_broadcaster", broadcaster):
+            events = sse_events("rover-1", queue, '{"x": 0}')
+            received = [await anext(events) for _ in range(3)]
+            await events.aclose()
+
+        self.assertEqual(
+            received, ['data: {"x": 0}\n\n', 'data: {"x": 1}\n\n', ": keep-alive\n\n"]
+        )
+        self.assertEqual(len(broadcaster), 0)
@@ -0,0 +1,378 @@
+import datetime
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import uuid4
+
+from archive import pack_trajectory
+from data_classes import CommandRequest
+from exceptions import CommandArchived
+from models import ActionTypes, Directions, Statuses
+from settings import COMMANDS_CHANNEL, REQUEST_ID, ROBOT_STATE_CHANNEL
+from sqlalchemy.dialects.postgresql import dialect as postgresql_dialect
+from utils import (
+    _command_status,
+    add_command,
+    add_commands,
+    decode_cursor,
+    decode_state,
+    encode_cursor,
+    encode_state,
+    get_command_actions,
+    get_command_progress,
+    get_robot_trajectory,
+    has_pending_commands,
+    save_robot_state,
+)
+
+
+class AddCommandTests(unittest.IsolatedAsyncioTestCase):
+
+    @patch("utils.notify", new_callable=AsyncMock)
+    async def test_notifies_before_commit(self, mock_notify):
+        session = Mock()
+        session.commit = AsyncMock()
+        session.refresh = AsyncMock()
+        calls = Mock()
+        calls.attach_mock(mock_notify, "notify")
+        calls.attach_mock(session.commit, "commit")
+
+        token = REQUEST_ID.set("request-1")
+        try:
+            command = await add_command(session, CommandRequest(command="FFF"))
+        finally:
+            REQUEST_ID.reset(token)
+
+        self.assertIsNotNone(command.id)
+        mock_notify.assert_awaited_once_with(session, COMMANDS_CHANNEL, "request-1")
+        self.assertEqual([c[0] for c in calls.mock_calls], ["notify", "commit"])
+
+    @patch("utils.notify", new_callable=AsyncMock)
+    async def test_assigns_robot(self, mock_notify):
+        session = Mock(commit=AsyncMock(), refresh=AsyncMock())
+
+        command = await add_command(session, CommandRequest(command="F"), "rover-1")
+
+        self.assertEqual(command.robot_id, "rover-1")
+
+
+class AddCommandsTests(unittest.IsolatedAsyncioTestCase):
+
+    @patch("utils.notify", new_callable=AsyncMock)
+    async def test_single_insert_returning_ids_in_order(self, mock_notify):
+        ids = [uuid4(), uuid4(), uuid4()]
+        result = Mock(scalars=Mock(return_value=iter(ids)))
+        session = Mock(execute=AsyncMock(return_value=result), commit=AsyncMock())
+        commands = [CommandRequest(command=c) for c in ("F", "RR", "B")]
+
+        self.assertEqual(await add_commands(session, commands, "rover-1"), ids)
+
+        session.execute.assert_awaited_once()
+        statement, rows = session.execute.await_args.args
+        self.assertTrue(statement._sort_by_parameter_order)
+        self.assertEqual([row["command"] for row in rows], ["F", "RR", "B"])
+        self.assertTrue(all(row["robot_id"] == "rover-1" for row in rows))
+        created = [row["created"] for row in rows]
+        self.assertEqual(created, sorted(set(created)))
+        mock_notify.assert_awaited_once()
+        session.commit.assert_awaited_once()
+
+
+class RobotStateTests(unittest.IsolatedAsyncioTestCase):
+
+    def test_payload_round_trip(self):
+        for state in [
+            (1, -2, Directions.EAST, Statuses.RUNNING, uuid4()),
+            (0, 0, Directions.SOUTH, Statuses.COMPLETED, None),
+        ]:
+            self.assertEqual(
+                decode_state(encode_state("rover-1", *state)), ("rover-1", state)
+            )
+
+    @patch("utils.notify", new_callable=AsyncMock)
+    async def test_save_upserts_and_notifies(self, mock_notify):
+        session = Mock(execute=AsyncMock())
+        state = ("rover-1", 3, 4, Directions.WEST, Statuses.COMPLETED, uuid4())
+
+        await save_robot_state(session, *state)
+
+        statement = session.execute.await_args.args[0]
+        self.assertIn("ON CONFLICT", str(statement.compile()))
+        mock_notify.assert_awaited_once_with(
+            session, ROBOT_STATE_CHANNEL, encode_state(*state)
+        )
+
+
+class CommandProgressTests(unittest.TestCase):
+
+    def test_status_of_unparsed_command(self):
+        self.assertEqual(_command_status(Statuses.QUEUED, {}), Statuses.QUEUED)
+
+    def test_status_from_action_counts(self):
+        for counts, expected in [
+            ({Statuses.QUEUED: 3}, Statuses.QUEUED),
+            ({Statuses.COMPLETED: 1, Statuses.QUEUED: 2}, Statuses.RUNNING),
+            ({Statuses.COMPLETED: 1, Statuses.FAILED: 1}, Statuses.FAILED),
+            ({Statuses.WITHDRAWN: 3}, Statuses.WITHDRAWN),
+            ({Statuses.COMPLETED: 3}, Statuses.COMPLETED),
+        ]:
+            self.assertEqual(_command_status(Statuses.COMPLETED, counts), expected)
+
+
+class PendingCommandsTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_checks_unparsed_commands_and_unexecuted_actions(self):
+        session = Mock(scalar=AsyncMock(return_value=True))
+
+        self.assertTrue(await has_pending_commands(session, "rover-1"))
+        query = session.scalar.await_args.args[0]
+        query = str(query.compile(dialect=postgresql_dialect()))
+        self.assertEqual(query.count("EXISTS"), 2)
+        self.assertIn("commands.robot_id", query)
+        self.assertIn("actions.status IN", query)
+
+
+class CompactCommandProgressTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_counts_steps_of_repeated_actions(self):
+        command = SimpleNamespace(
+            robot_id="rover-1", status=Statuses.COMPLETED, archived=None
+        )
+        # "F5LF2" stored compactly: three Action rows for eight steps.
+        counts = [(Statuses.COMPLETED, 2, 6), (Statuses.QUEUED, 1, 2)]
+        session = Mock(
+            execute=AsyncMock(
+                side_effect=[
+                    Mock(one_or_none=Mock(return_value=command)),
+                    Mock(all=Mock(return_value=counts)),
+                    Mock(one_or_none=Mock(return_value=(0, 5, Directions.WEST))),
+                ]
+            )
+        )
+
+        progress = await get_command_progress(session, uuid4())
+
+        self.assertEqual(progress.status, Statuses.RUNNING)
+        self.assertEqual(progress.actions, {Statuses.COMPLETED: 6, Statuses.QUEUED: 2})
+
+
+class ArchivedCommandProgressTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_progress_from_archive(self):
+        command_id = uuid4()
+        actions = [
+            SimpleNamespace(
+                type=ActionTypes.MOVE_FORWARD,
+                count=1,
+                status=status,
+                x_coord=x,
+                y_coord=3,
+                direction=Directions.WEST,
+            )
+            for status, x in [(Statuses.COMPLETED, 3), (Statuses.FAILED, 2)]
+        ]
+        command = SimpleNamespace(
+            robot_id="rover-1",
+            status=Statuses.COMPLETED,
+            archived=datetime.datetime(2026, 10, 18),
+        )
+        session = Mock(
+            execute=AsyncMock(
+                return_value=Mock(one_or_none=Mock(return_value=command))
+            ),
+            scalar=AsyncMock(return_value=pack_trajectory(actions).tobytes()),
+        )
+
+        progress = await get_command_progress(session, command_id)
+
+        session.execute.assert_awaited_once()
+        self.assertEqual(progress.status, Statuses.FAILED)
+        self.assertEqual(progress.actions, {Statuses.COMPLETED: 1, Statuses.FAILED: 1})
+        self.assertEqual(
+            (progress.x, progress.y, progress.direction), (2, 3, Directions.WEST)
+        )
+
+
+class CommandActionsTests(unittest.IsolatedAsyncioTestCase):
+
+    def make_rows(self, count):
+        created = datetime.datetime(2025, 1, 1)
+        return [
+            SimpleNamespace(
+                id=uuid4(),
+                type=ActionTypes.MOVE_FORWARD,
+                count=1,
+                status=Statuses.QUEUED,
+                x_coord=None,
+                y_coord=None,
+                direction=None,
+                created=created + datetime.timedelta(microseconds=i),
+                updated=None,
+            )
+            for i in range(count)
+        ]
+
+    def test_cursor_round_trip(self):
+        position = (datetime.datetime(2025, 1, 1, 12, 0, 0, 5), uuid4())
+
+        self.assertEqual(decode_cursor(encode_cursor(*position)), position)
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    async def test_page_continues_after_cursor(self):
+        rows = self.make_rows(3)
+        session = Mock(
+            execute=AsyncMock(return_value=Mock(all=Mock(return_value=rows)))
+        )
+        after = (datetime.datetime(2024, 1, 1), uuid4())
+
+        page = await get_command_actions(session, uuid4(), 2, after)
+
+        self.assertEqual([item.id for item in page.items], [r.id for r in rows[:2]])
+        self.assertEqual(decode_cursor(page.next_cursor), (rows[1].created, rows[1].id))
+        query = session.execute.await_args.args[0]
+        query = str(query.compile(dialect=postgresql_dialect()))
+        self.assertIn("(actions.created, actions.id) >", query)
+        self.assertNotIn("OFFSET", query)
+
+    async def test_last_page_has_no_cursor(self):
+        rows = self.make_rows(2)
+        session = Mock(
+            execute=AsyncMock(return_value=Mock(all=Mock(return_value=rows)))
+        )
+
+        page = await get_command_actions(session, uuid4(), 2)
+
+        self.assertEqual(len(page.items), 2)
+        self.assertIsNone(page.next_cursor)
+
+    async def test_unknown_command(self):
+        result = Mock(all=Mock(return_value=[]), one_or_none=Mock(return_value=None))
+        session = Mock(execute=AsyncMock(return_value=result))
+
+        self.assertIsNone(await get_command_actions(session, uuid4(), 10))
+
+    async def test_archived_command(self):
+        command = SimpleNamespace(archived=datetime.datetime(2026, 10, 18))
+        result = Mock(all=Mock(return_value=[]), one_or_none=Mock(return_value=command))
+        session = Mock(execute=AsyncMock(return_value=result))
+
+        with self.assertRaisesRegex(CommandArchived, "archived on 2026-10-18"):
+            await get_command_actions(session, uuid4(), 10)
+
+
+class RobotTrajectoryTests(unittest.IsolatedAsyncioTestCase):
+
+    def make_action(self, command_id, status, x):
+        return SimpleNamespace(
+            command_id=command_id,
+            type=ActionTypes.MOVE_FORWARD,
+            count=1,
+            status=status,
+            x_coord=x,
+            y_coord=0,
+            direction=Directions.EAST,
+        )
+
+    @patch("utils.TRAJECTORY_MAX_COMMANDS", 3)
+    async def test_stored_archived_and_live_commands(self):
+        stored, archived, live, left_out = uuid4(), uuid4(), uuid4(), uuid4()
+        start = datetime.datetime(2026, 10, 18)
+        trajectory = pack_trajectory(
+            [self.make_action(stored, Statuses.COMPLETED, x) for x in (2, 3)]
+        ).tobytes()
+        minute = datetime.timedelta(minutes=1)
+        commands = [
+            SimpleNamespace(
+                id=stored, created=start, archived=None, trajectory=trajectory
+            ),
+            SimpleNamespace(
+                id=archived, created=start + minute, archived=start, trajectory=None
+            ),
+            SimpleNamespace(
+                id=live, created=start + 2 * minute, archived=None, trajectory=None
+            ),
+            SimpleNamespace(
+                id=left_out, created=start + 3 * minute, archived=None, trajectory=None
+            ),
+        ]
+        packed = pack_trajectory(
+            [
+                self.make_action(archived, Statuses.COMPLETED, 1),
+                self.make_action(archived, Statuses.WITHDRAWN, None),
+            ]
+        ).tobytes()
+        results = [commands, [(archived, packed)]]
+        session = Mock(
+            execute=AsyncMock(
+                side_effect=lambda _query: Mock(all=Mock(return_value=results.pop(0)))
+            )
+        )
+
+        segments, next_from = await get_robot_trajectory(session, "rover-1")
+
+        self.assertEqual(
+            [command_id for command_id, _ in segments], [stored, archived, live]
+        )
+        self.assertEqual(segments[0][1]["x"].tolist(), [2, 3])
+        self.assertEqual(segments[1][1]["x"].tolist(), [1])
+        self.assertEqual(len(segments[2][1]), 0)
+        self.assertEqual(next_from, start + 3 * minute)
+        # Live commands are not read from their actions.
+        self.assertEqual(session.execute.await_count, 2)
+
+    @patch("utils.TRAJECTORY_MAX_COMMANDS", 3)
+    async def test_commands_sharing_creation_stay_on_one_page(self):
+        start = datetime.datetime(2026, 10, 18)
+        blocked = start + datetime.timedelta(minutes=1)
+        commands = [
+            SimpleNamespace(id=uuid4(), created=created, archived=None, trajectory=None)
+            for created in (start, blocked, blocked, blocked)
+        ]
+        session = Mock(
+            execute=AsyncMock(return_value=Mock(all=Mock(return_value=commands)))
+        )
+
+        segments, next_from = await get_robot_trajectory(session, "rover-1")
+
+        # The detour must not be served apart from the command it bypasses.
+        self.assertEqual([command_id for command_id, _ in segments], [commands[0].id])
+        self.assertEqual(next_from, blocked)
+
+    @patch("utils.TRAJECTORY_MAX_COMMANDS", 2)
+    async def test_page_sharing_one_creation_is_served_whole(self):
+        start = datetime.datetime(2026, 10, 18)
+        following = start + datetime.timedelta(minutes=1)
+        commands = [
+            SimpleNamespace(id=uuid4(), created=start, archived=None, trajectory=None)
+            for _ in range(4)
+        ]
+        results = [commands[:3], commands]
+        session = Mock(
+            execute=AsyncMock(
+                side_effect=lambda _query: Mock(all=Mock(return_value=results.pop(0)))
+            ),
+            scalar=AsyncMock(return_value=following),
+        )
+
+        segments, next_from = await get_robot_trajectory(session, "rover-1", start)
+
+        self.assertEqual(
+            [command_id for command_id, _ in segments], [c.id for c in commands]
+        )
+        self.assertEqual(next_from, following)
+        query = session.scalar.await_args.args[0]
+        query = str(query.compile(dialect=postgresql_dialect()))
+        self.assertIn("commands.created > ", query)
+        self.assertNotIn("commands.created >= ", query)
+
+    async def test_segments_follow_command_creation(self):
+        # Detours share the creation of the command they bypass and follow it by
+        # position, see _record_detour.
+        session = Mock(execute=AsyncMock(return_value=Mock(all=Mock(return_value=[]))))
+
+        await get_robot_trajectory(session, "rover-1")
+
+        query = session.execute.await_args_list[0].args[0]
+        query = str(query.compile(dialect=postgresql_dialect()))
+        self.assertIn("ORDER BY commands.created, commands.position", query)
@@ -1,63 +1,520 @@
-from data_classes import CommandRequest
-from models import Action, Command, Directions, Statuses
-from settings import START_DIRECTION, START_POSITION
-from sqlalchemy import desc, select
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+
+import numpy as np
+from archive import (
+    TRAJECTORY_DTYPE,
+    executed_poses,
+    summarize_trajectory,
+    unpack_trajectory,
+)
+from data_classes import ActionItem, ActionPage, CommandProgress, CommandRequest
+from exceptions import CommandArchived
+from models import Action, ActionArchive, Command, Directions, RobotState, Statuses
+from notifications import notify
+from settings import (
+    COMMANDS_CHANNEL,
+    DEFAULT_ROBOT_ID,
+    REQUEST_ID,
+    ROBOT_STATE_CHANNEL,
+    START_DIRECTION,
+    START_POSITION,
+    TRAJECTORY_MAX_COMMANDS,
+)
+from sqlalchemy import desc, exists, func, insert, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
-async def get_current_position(async_session: AsyncSession):
+def encode_state(robot_id, x, y, direction, status, command_id) -> str:
+    """
+    Serializes a robot state into a notification payload.
+    """
+    return json.dumps(
+        {
+            "robot_id": robot_id,
+            "x": x,
+            "y": y,
+            "direction": direction.value,
+            "status": status.value,
+            "command_id": str(command_id) if command_id else None,
+        }
+    )
+
+
+def decode_state(payload: str):
+    """
+    Deserializes a notification payload produced by `encode_state`.
+
+    Returns:
+        tuple: (robot_id, (x_coord, y_coord, direction, status, command_id)).
+    """
+    state = json.loads(payload)
+    return state["robot_id"], (
+        state["x"],
+        state["y"],
+        Directions(state["direction"]),
+        Statuses(state["status"]),
+        UUID(state["command_id"]) if state["command_id"] else None,
+    )
+
+
+async def get_current_position(
+    async_session: AsyncSession, robot_id: str = DEFAULT_ROBOT_ID
+):
     """
-    Retrieves the most recent Action with status RUNNING, FAILED, or COMPLETED,
-    ordered by the latest update time, and returns its position and state.
+    Retrieves a robot's position and state from its robot_state row.
 
-    If no such Action exists, returns the default start position, direction, and status.
+    If the robot has not executed anything yet, returns the default start position,
+    direction, and status.
 
     Args:
         async_session: The asynchronous SQLAlchemy session for database access.
+        robot_id: The ID of the robot.
 
     Returns:
-        tuple: A tuple containing (x_coord: int, y_coord: int, direction: Directions, status: Statuses).
+        tuple: A tuple containing (x_coord: int, y_coord: int, direction: Directions, status: Statuses, command_id: UUID).
     """
-    x, y, direction, status, command_id = None, None, None, None, None
+    query = select(
+        RobotState.x_coord,
+        RobotState.y_coord,
+        RobotState.direction,
+        RobotState.status,
+        RobotState.command_id,
+    ).where(RobotState.robot_id == robot_id)
+    result = await async_session.execute(query)
+    state = result.one_or_none()
+    if state:
+        return tuple(state)
 
-    query = (
-        select(Action)
-        .where(
-            Action.status.in_([Statuses.RUNNING, Statuses.FAILED, Statuses.COMPLETED])
-        )
-        .order_by(desc(Action.updated))
-        .limit(1)
+    return (
+        START_POSITION[0],
+        START_POSITION[1],
+        Directions(START_DIRECTION),
+        Statuses.COMPLETED,
+        None,
     )
-    result = await async_session.execute(query)
-    action = result.scalar_one_or_none()
-    if action:
-        x = action.x_coord
-        y = action.y_coord
-        direction = action.direction
-        status = action.status
-        command_id = action.command_id
 
-    x = x if x is not None else START_POSITION[0]
-    y = y if y is not None else START_POSITION[1]
-    direction = direction or Directions(START_DIRECTION)
-    status = status or Statuses.COMPLETED
 
-    return x, y, direction, status, command_id
+async def has_pending_commands(async_session: AsyncSession, robot_id: str) -> bool:
+    """
+    Checks whether a robot has Commands that are not parsed or not fully executed.
+
+    Args:
+        async_session: The asynchronous SQLAlchemy session for database access.
+        robot_id: The ID of the robot.
+
+    Returns:
+        bool: True if a Command is QUEUED or an Action is QUEUED or RUNNING.
+    """
+    unparsed = exists().where(
+        Command.robot_id == robot_id, Command.status == Statuses.QUEUED
+    )
+    unexecuted = exists().where(
+        Action.robot_id == robot_id,
+        Action.status.in_([Statuses.QUEUED, Statuses.RUNNING]),
+    )
+    return bool(await async_session.scalar(select(or_(unparsed, unexecuted))))
+
+
+async def save_robot_state(
+    async_session: AsyncSession,
+    robot_id: str,
+    x: int,
+    y: int,
+    direction: Directions,
+    status: Statuses,
+    command_id: Optional[UUID],
+):
+    """
+    Upserts a robot's robot_state row and notifies listeners about the new state.
+
+    Both take effect when the caller commits, together with the Action changes
+    that led to this state.
+
+    Args:
+        async_session: The SQLAlchemy asynchronous session used for DB operations.
+        robot_id: The ID of the robot.
+        x: The x coordinate of the robot.
+        y: The y coordinate of the robot.
+        direction: The direction the robot faces.
+        status: The status of the Action the robot is executing or executed last.
+        command_id: The ID of the Command that Action belongs to.
+
+    Returns:
+        None
+    """
+    values = {
+        "x_coord": x,
+        "y_coord": y,
+        "direction": direction,
+        "status": status,
+        "command_id": command_id,
+        "updated": datetime.now(),
+    }
+    query = (
+        pg_insert(RobotState)
+        .values(robot_id=robot_id, **values)
+        .on_conflict_do_update(index_elements=[RobotState.robot_id], set_=values)
+    )
+    await async_session.execute(query)
+
+    payload = encode_state(robot_id, x, y, direction, status, command_id)
+    await notify(async_session, ROBOT_STATE_CHANNEL, payload)
 
 
-async def add_command(async_session: AsyncSession, command: CommandRequest) -> Command:
+async def add_command(
+    async_session: AsyncSession,
+    command: CommandRequest,
+    robot_id: str = DEFAULT_ROBOT_ID,
+) -> Command:
     """
-    Adds a new Command record to the database.
+    Adds a new Command record for a robot to the database.
+
+    A notification carrying the ID of the current request is sent on the commands
+    channel in the same transaction, waking up the scheduler as soon as the command
+    is committed.
 
     Args:
         async_session: The SQLAlchemy asynchronous session used for DB operations.
         command: The data object containing command details to be saved.
+        robot_id: The ID of the robot the command is addressed to.
 
     Returns:
         Command: The newly created Command instance with updated fields from the database.
     """
-    command = Command(command=command.command)
+    command = Command(id=uuid4(), robot_id=robot_id, command=command.command)
     async_session.add(command)
+    await notify(async_session, COMMANDS_CHANNEL, REQUEST_ID.get())
     await async_session.commit()
     await async_session.refresh(command)
     return command
+
+
+async def add_commands(
+    async_session: AsyncSession,
+    commands: List[CommandRequest],
+    robot_id: str = DEFAULT_ROBOT_ID,
+) -> List[UUID]:
+    """
+    Adds several Command records for a robot with a single multi-row INSERT.
+
+    IDs are read back with INSERT ... RETURNING in the order of `commands`, so no
+    refresh SELECT is needed. Creation timestamps are assigned explicitly and
+    increase by one microsecond per command, which makes the commands execute in
+    the order they were submitted. One notification wakes up the scheduler for
+    the whole batch.
+
+    Args:
+        async_session: The SQLAlchemy asynchronous session used for DB operations.
+        commands: The commands to be saved, in execution order.
+        robot_id: The ID of the robot the commands are addressed to.
+
+    Returns:
+        list: The IDs of the new Commands, in the order of `commands`.
+    """
+    created = datetime.now()
+    step = timedelta(microseconds=1)
+    rows = []
+    for command in commands:
+        rows.append(
+            {"robot_id": robot_id, "command": command.command, "created": created}
+        )
+        created += step
+
+    query = insert(Command).returning(Command.id, sort_by_parameter_order=True)
+    result = await async_session.execute(query, rows)
+    ids = list(result.scalars())
+    await notify(async_session, COMMANDS_CHANNEL, REQUEST_ID.get())
+    await async_session.commit()
+    return ids
+
+
+def encode_cursor(created: datetime, action_id: UUID) -> str:
+    """
+    Encodes the position of an Action as an opaque pagination cursor.
+    """
+    raw = f"{created.isoformat()}|{action_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        created, action_id = base64.urlsafe_b64decode(cursor).decode().split("|")
+        return datetime.fromisoformat(created), UUID(action_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _command_status(status: Statuses, counts: dict) -> Statuses:
+    # Command.status only tracks parsing; once parsed, progress is in the actions.
+    if status != Statuses.COMPLETED:
+        return status
+    for final in (Statuses.FAILED, Statuses.WITHDRAWN):
+        if counts.get(final):
+            return final
+    if counts.get(Statuses.RUNNING):
+        return Statuses.RUNNING
+    if counts.get(Statuses.QUEUED):
+        return Statuses.RUNNING if counts.get(Statuses.COMPLETED) else Statuses.QUEUED
+    return Statuses.COMPLETED
+
+
+async def get_command_progress(
+    async_session: AsyncSession, command_id: UUID
+) -> Optional[CommandProgress]:
+    """
+    Computes how far the execution of a Command went.
+
+    Step counts per status come from one aggregate query and the last pose from
+    the latest executed Action, so the actions of the command are never loaded.
+    Once the command is archived, both are computed from its packed trajectory.
+    Steps are single-step actions, so an Action repeated `count` times, as stored
+    with COMPACT_ACTIONS, counts `count` times.
+
+    Args:
+        async_session: The asynchronous SQLAlchemy session for database access.
+        command_id: The ID of the Command.
+
+    Returns:
+        CommandProgress: The progress, or None if the Command does not exist.
+    """
+    query = select(Command.robot_id, Command.status, Command.archived).where(
+        Command.id == command_id
+    )
+    result = await async_session.execute(query)
+    command = result.one_or_none()
+    if command is None:
+        return None
+
+    if command.archived is not None:
+        query = select(ActionArchive.trajectory).where(
+            ActionArchive.command_id == command_id
+        )
+        trajectory = unpack_trajectory(await async_session.scalar(query))
+        counts, steps, pose = summarize_trajectory(trajectory)
+        x, y, direction = pose or (None, None, None)
+    else:
+        query = (
+            select(Action.status, func.count(), func.sum(Action.count))
+            .where(Action.command_id == command_id)
+            .group_by(Action.status)
+        )
+        result = await async_session.execute(query)
+        rows = result.all()
+        counts = {status: count for status, count, _steps in rows}
+        steps = {status: int(total) for status, _count, total in rows}
+
+        query = (
+            select(Action.x_coord, Action.y_coord, Action.direction)
+            .where(
+                Action.command_id == command_id,
+                Action.status.in_([Statuses.COMPLETED, Statuses.FAILED]),
+            )
+            .order_by(desc(Action.created), desc(Action.id))
+            .limit(1)
+        )
+        result = await async_session.execute(query)
+        x, y, direction = result.one_or_none() or (None, None, None)
+
+    return CommandProgress(
+        id=command_id,
+        robot_id=command.robot_id,
+        status=_command_status(command.status, counts),
+        actions=steps,
+        x=x,
+        y=y,
+        direction=direction,
+    )
+
+
+async def get_command_actions(
+    async_session: AsyncSession,
+    command_id: UUID,
+    limit: int,
+    after: Optional[Tuple[datetime, UUID]] = None,
+) -> Optional[ActionPage]:
+    """
+    Lists the Actions of a Command in execution order, one page at a time.
+
+    Pages are delimited by the (created, id) of their last Action rather than by an
+    offset, so every page is an index range scan no matter how deep it is.
+
+    Args:
+        async_session: The asynchronous SQLAlchemy session for database access.
+        command_id: The ID of the Command.
+        limit: The maximum number of Actions in the page.
+        after: The (created, id) of the last Action of the previous page.
+
+    Returns:
+        ActionPage: The page, or None if the Command does not exist.
+
+    Raises:
+        CommandArchived: If the Actions of the Command were archived, which only
+            keeps their poses.
+    """
+    query = select(
+        Action.id,
+        Action.type,
+        Action.count,
+        Action.status,
+        Action.x_coord,
+        Action.y_coord,
+        Action.direction,
+        Action.created,
+        Action.updated,
+    ).where(Action.command_id == command_id)
+    if after is not None:
+        query = query.where(tuple_(Action.created, Action.id) > tuple_(*after))
+    query = query.order_by(Action.created, Action.id).limit(limit + 1)
+    result = await async_session.execute(query)
+    rows = result.all()
+
+    if not rows:
+        query = select(Command.archived).where(Command.id == command_id)
+        command = (await async_session.execute(query)).one_or_none()
+        if command is None:
+            return None
+        if command.archived is not None:
+            raise CommandArchived(
+                f"The actions of command {command_id} were archived on "
+                f"{command.archived:%Y-%m-%d %H:%M:%S}."
+            )
+
+    items = [
+        ActionItem(
+            id=row.id,
+            type=row.type,
+            count=row.count,
+            status=row.status,
+            x=row.x_coord,
+            y=row.y_coord,
+            direction=row.direction,
+            created=row.created,
+            updated=row.updated,
+        )
+        for row in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created, last.id)
+    return ActionPage(items=items, next_cursor=next_cursor)
+
+
+async def _load_trajectories(
+    async_session: AsyncSession, commands: Sequence
+) -> List[np.ndarray]:
+    # Trajectories are stored when commands finish. Commands archived before that
+    # have theirs in the archive only; live commands have none yet.
+    trajectories = {
+        command.id: unpack_trajectory(command.trajectory)
+        for command in commands
+        if command.trajectory is not None
+    }
+    archived = [
+        command.id
+        for command in commands
+        if command.trajectory is None and command.archived is not None
+    ]
+    if archived:
+        query = select(ActionArchive.command_id, ActionArchive.trajectory).where(
+            ActionArchive.command_id.in_(archived)
+        )
+        for command_id, data in (await async_session.execute(query)).all():
+            trajectories[command_id] = executed_poses(unpack_trajectory(data))
+
+    empty = np.empty(0, dtype=TRAJECTORY_DTYPE)
+    return [trajectories.get(command.id, empty) for command in commands]
+
+
+async def get_command_trajectory(
+    async_session: AsyncSession, command_id: UUID
+) -> Optional[Tuple[str, np.ndarray]]:
+    """
+    Retrieves the poses a Command moved its robot through.
+
+    The trajectory is stored packed when the command finishes, so this is a single
+    row read however many actions it had. Commands still executing have none yet.
+
+    Args:
+        async_session: The asynchronous SQLAlchemy session for database access.
+        command_id: The ID of the Command.
+
+    Returns:
+        tuple: (robot_id, poses as an array of TRAJECTORY_DTYPE), or None if the
+        Command does not exist.
+    """
+    query = select(
+        Command.id, Command.robot_id, Command.archived, Command.trajectory
+    ).where(Command.id == command_id)
+    command = (await async_session.execute(query)).one_or_none()
+    if command is None:
+        return None
+
+    (trajectory,) = await _load_trajectories(async_session, [command])
+    return command.robot_id, trajectory
+
+
+async def get_robot_trajectory(
+    async_session: AsyncSession,
+    robot_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Tuple[List[Tuple[UUID, np.ndarray]], Optional[datetime]]:
+    """
+    Retrieves the poses a robot moved through, command by command.
+
+    Commands are selected by creation time, then by position, at most
+    TRAJECTORY_MAX_COMMANDS of them; the creation time of the first one left out
+    lets callers continue. Commands sharing a creation time (a detour and the
+    Command it bypasses) are never split across pages, since a creation time
+    alone cannot tell them apart.
+
+    Args:
+        async_session: The asynchronous SQLAlchemy session for database access.
+        robot_id: The ID of the robot.
+        start: Only include Commands created at or after this time.
+        end: Only include Commands created before this time.
+
+    Returns:
+        tuple: ([(command_id, poses), ...] in execution order, creation time of the
+        next Command or None if the range was exhausted).
+    """
+    query = select(
+        Command.id, Command.created, Command.archived, Command.trajectory
+    ).where(Command.robot_id == robot_id)
+    if end is not None:
+        query = query.where(Command.created < end)
+    query = query.order_by(Command.created, Command.position)
+    page = query if start is None else query.where(Command.created >= start)
+    commands = (
+        await async_session.execute(page.limit(TRAJECTORY_MAX_COMMANDS + 1))
+    ).all()
+
+    next_start = None
+    if len(commands) > TRAJECTORY_MAX_COMMANDS:
+        next_start = commands.pop().created
+        ended = [c for c in commands if c.created < next_start]
+        if ended:
+            commands = ended
+        else:
+            # The whole page shares one creation time: serve all of it, and
+            # continue after it.
+            commands = (
+                await async_session.execute(query.where(Command.created == next_start))
+            ).all()
+            following = query.where(Command.created > next_start).limit(1)
+            following = following.with_only_columns(Command.created)
+            next_start = await async_session.scalar(following)
+    trajectories = await _load_trajectories(async_session, commands)
+    return [(c.id, t) for c, t in zip(commands, trajectories)], next_start